@@ -6,7 +6,7 @@
 import sys, os
 from datetime import datetime, timedelta
 import locale
-from flask import Flask
+from flask import Flask, jsonify, request
 from flask_mail import Mail
 from flask_moment import Moment
 from dotenv import load_dotenv
@@ -25,9 +25,12 @@ from routes.admin import admin_bp
 from routes.wisdom import wisdom_bp
 from routes.programs import programs_bp
 from routes.photos import photos_bp
-from routes.japa import japa_bp  # ✅ Newly added blueprint
+from routes.japa import japa_bp, mantra_patterns, japa_janitor  # ✅ Newly added blueprint
 from routes.utils import send_email
 from middleware.auth_middleware import login_required
+import db_config
+from utils import query_metrics, write_behind, live_events, progress_engine, japa_sessions
+from utils.etags import etag_cache
 from routes.japa_auth import japa_auth_bp
 from routes.harijap_auth import harijap_auth_bp, require_harijap_auth
 from routes.guru_mantra_auth import guru_mantra_auth_bp
@@ -61,6 +64,7 @@ def create_app():
     })
 
     # 🔌 Initialize Extensions
+    db_config.init_app(app)  # one pooled DB connection per request
     mail = Mail(app)
     moment = Moment(app)
     app.mail = mail
@@ -87,6 +91,9 @@ def create_app():
     # 🧪 Debug Route
     register_debug_route(app)
 
+    # 🩺 Health / Monitoring Route
+    register_health_route(app)
+
     # 🧭 Print All Routes
     print("\n📍 Registered routes:")
     for rule in app.url_map.iter_rules():
@@ -167,6 +174,37 @@ def register_debug_route(app):
         except Exception as e:
             return f"Debug error: {str(e)}"
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 🩺 Health & Monitoring Route
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def register_health_route(app):
+    @app.route('/health')
+    def health():
+        # Never touches MySQL - reports this worker's pool, write buffers, japa sessions, live streams and ETag hit ratio only
+        return jsonify({
+            'status': 'healthy',
+            'timestamp': datetime.now().isoformat(),
+            'db_pool': db_config.get_pool_stats(),
+            'write_buffers': write_behind.all_stats(),
+            'progress': progress_engine.all_stats(),
+            'japa_sessions': japa_sessions.all_stats(),
+            'japa_mantra': mantra_patterns.stats(),
+            'japa_janitor': japa_janitor.stats(),
+            'live_streams': live_events.all_stats(),
+            'etags': etag_cache.stats()
+        }), 200
+
+    @app.route('/health/slow_queries')
+    def slow_queries():
+        # Per-worker top-N statement fingerprints by worst latency
+        limit = request.args.get('limit', 20, type=int)
+        return jsonify({
+            'success': True,
+            'pid': os.getpid(),
+            'slow_queries': query_metrics.dump_slow_queries(limit)
+        }), 200
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 🔥 Launch App
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+🔁 Round trips per request for the Hari Jap state and save endpoints
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Runs GET /harijap/api/state and POST /harijap/api/save against a fake
+connection that counts statements and COMMITs, for the interesting row
+states (new user, same IST day, first request after IST midnight).
+
+    PYTHONPATH=. python benchmarks/bench_harijap_round_trips.py
+
+Before the rollover was folded into the statements (SELECT today_date,
+compare in Python, then UPDATE/upsert):
+
+    scenario                                 statements  commits  round trips
+    GET state: new user                               2        1            3
+    GET state: same IST day                           1        0            1
+    GET state: first read after midnight              2        1            3
+    POST save: same IST day                           2        1            3
+    POST save: first save after midnight              2        1            3
+
+After: every state read is one SELECT, every synchronous save is one
+upsert plus its COMMIT, and a write-behind save (the default) costs the
+request no DB round trip at all. With the city rollup on, each save batch
+adds a locked read of the old totals and one rollup upsert; the global
+counter shares that read and adds one shard increment. The daily
+history adds two statements to a user's first save of an IST day only.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+
+import db_config
+import routes.harijap_auth as harijap
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+class CountingCursor:
+    rowcount = 0
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(' '.join(sql.split())[:60])
+
+    def fetchone(self):
+        return dict(self.conn.row) if self.conn.row else None
+
+    def fetchall(self):
+        return [self.fetchone()] if self.conn.row else []
+
+    def close(self):
+        pass
+
+
+class CountingConnection:
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self, cursor=None):
+        return CountingCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    @property
+    def round_trips(self):
+        return len(self.statements) + self.commits
+
+
+def progress_row(today_date):
+    return {
+        'bhaktgan_id': 1, 'city': 'Pune',
+        'count': 1080, 'total_malas': 10, 'current_mala_pronunciations': 12,
+        'total_pronunciations': 216, 'last_spoken_at': None,
+        'today_words': 540, 'today_pronunciations': 108, 'today_malas': 5,
+        'today_date': today_date, 'todays_count': 540,
+    }
+
+
+def build_client():
+    app = Flask(__name__)
+    app.secret_key = 'bench'
+    db_config.init_app(app)
+    app.register_blueprint(harijap.harijap_auth_bp)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['user_id'] = 'bhaktgan:1'
+        sess['user_name'] = 'Bench'
+        sess['user_mobile'] = '9876543210'
+    return client
+
+
+def measure(client, method, url, row, payload=None):
+    conn = CountingConnection(row)
+    original = harijap.get_db_connection
+    harijap.get_db_connection = lambda: conn
+    try:
+        response = client.open(url, method=method, json=payload)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    finally:
+        harijap.get_db_connection = original
+    return conn
+
+
+def run():
+    today = datetime.now(IST).date()
+    yesterday = today - timedelta(days=1)
+    save_payload = {
+        'count': 1085, 'totalMalas': 10, 'currentMalaPronunciations': 13,
+        'totalPronunciations': 217, 'todayWords': 545, 'todayPronunciations': 109,
+        'todayMalas': 5, 'todayDate': today.isoformat(), 'todaysCount': 545,
+    }
+    scenarios = [
+        ('GET state: new user', 'GET', '/harijap/api/state', None),
+        ('GET state: same IST day', 'GET', '/harijap/api/state', progress_row(today)),
+        ('GET state: first read after midnight', 'GET', '/harijap/api/state', progress_row(yesterday)),
+        ('POST save: same IST day', 'POST', '/harijap/api/save', progress_row(today)),
+        ('POST save: first save after midnight', 'POST', '/harijap/api/save', progress_row(yesterday)),
+    ]
+
+    client = build_client()
+    results = []
+    write_behind = harijap.progress_engine.write_behind
+    refresh_seconds = harijap.leaderboard_cache.refresh_seconds
+    city_rollup = harijap.city_rollup.enabled
+    daily_history = harijap.daily_history.enabled
+    today_counter = harijap.today_counter.enabled
+    harijap.progress_engine.write_behind = False  # measure the synchronous save path
+    harijap.city_rollup.enabled = False   # core statement first, rollup and history cost separately
+    harijap.daily_history.enabled = False
+    harijap.today_counter.enabled = False
+    harijap.leaderboard_cache.refresh_seconds = float('inf')  # periodic, not per request
+    try:
+        for name, method, url, row in scenarios:
+            payload = save_payload if method == 'POST' else None
+            conn = measure(client, method, url, row, payload)
+            results.append((name, len(conn.statements), conn.commits, conn.round_trips))
+
+        harijap.city_rollup.enabled = True
+        conn = measure(client, 'POST', '/harijap/api/save', progress_row(today), save_payload)
+        results.append(('POST save: sync + city rollup', len(conn.statements), conn.commits, conn.round_trips))
+        harijap.city_rollup.enabled = False
+
+        harijap.today_counter.enabled = True
+        conn = measure(client, 'POST', '/harijap/api/save', progress_row(today), save_payload)
+        results.append(('POST save: sync + global counter', len(conn.statements), conn.commits, conn.round_trips))
+        harijap.today_counter.enabled = False
+
+        harijap.daily_history.enabled = True
+        harijap.daily_history.mark_current([], None)  # forget which users are already on today
+        conn = measure(client, 'POST', '/harijap/api/save', progress_row(yesterday), save_payload)
+        results.append(('POST save: after midnight + history', len(conn.statements), conn.commits, conn.round_trips))
+        conn = measure(client, 'POST', '/harijap/api/save', progress_row(today), save_payload)
+        results.append(('POST save: same day + history', len(conn.statements), conn.commits, conn.round_trips))
+
+        harijap.progress_engine.write_behind = True
+        conn = measure(client, 'POST', '/harijap/api/save', progress_row(today), save_payload)
+        harijap.progress_engine.buffer.pop(1)  # never let the flush thread reach a real database
+        results.append(('POST save: write-behind (default)', len(conn.statements), conn.commits, conn.round_trips))
+    finally:
+        harijap.progress_engine.write_behind = write_behind
+        harijap.leaderboard_cache.refresh_seconds = refresh_seconds
+        harijap.city_rollup.enabled = city_rollup
+        harijap.daily_history.enabled = daily_history
+        harijap.today_counter.enabled = today_counter
+    return results
+
+
+def main():
+    print(f"{'scenario':<40} {'statements':>10} {'commits':>8} {'round trips':>12}")
+    for name, statements, commits, round_trips in run():
+        print(f"{name:<40} {statements:>10} {commits:>8} {round_trips:>12}")
+
+
+if __name__ == '__main__':
+    main()
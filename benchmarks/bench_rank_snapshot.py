@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+📊 "My rank" at 100k+ progress rows
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Compares RankSnapshot.rank() (binary search over the sorted key array)
+with the linear scan a COUNT(*) WHERE count > mine amounts to, and times
+building the snapshot from (count, bhaktgan_id) tuples as the index scan
+returns them.
+
+    PYTHONPATH=. python benchmarks/bench_rank_snapshot.py [users]
+"""
+
+import sys
+import time
+import random
+from array import array
+
+from utils.leaderboard import RankSnapshot
+
+
+def build(users, seed=108):
+    rng = random.Random(seed)
+    rows = sorted((int(rng.paretovariate(1.2) * 100), bhaktgan_id) for bhaktgan_id in range(1, users + 1))
+    return rows
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = build(users)
+    snapshot = RankSnapshot('harijap_progress')
+
+    start = time.perf_counter()
+    snapshot.replace(array('q', (RankSnapshot.key(c, i) for c, i in rows)))
+    load_ms = (time.perf_counter() - start) * 1000
+
+    probes = random.Random(1).sample(rows, 1000)
+
+    start = time.perf_counter()
+    for count, bhaktgan_id in probes:
+        snapshot.rank(count, bhaktgan_id)
+    bisect_us = (time.perf_counter() - start) / len(probes) * 1e6
+
+    start = time.perf_counter()
+    for count, bhaktgan_id in probes[:50]:
+        sum(1 for c, i in rows if c > count or (c == count and i > bhaktgan_id))
+    scan_us = (time.perf_counter() - start) / 50 * 1e6
+
+    print(f"users:                {users:,}")
+    print(f"snapshot build:       {load_ms:.1f} ms ({len(snapshot._keys) * 8 / 1024:.0f} KiB)")
+    print(f"rank via bisect:      {bisect_us:.2f} µs/lookup")
+    print(f"rank via full scan:   {scan_us:.0f} µs/lookup")
+
+
+if __name__ == '__main__':
+    main()
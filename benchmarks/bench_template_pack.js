@@ -0,0 +1,71 @@
+/**
+ * 🎼 Acoustic templates: client-side load time, templates.json versus template packs
+ * ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ * Times what MantraTemplateMatcher.loadTemplates() does after the fetch
+ * (decode + parse + typed arrays), and checks that DTW distances against
+ * a pack match the JSON ones.
+ *
+ *     python build_template_pack.py static/js/templates.json /tmp/templates.int8.bin --int8
+ *     node benchmarks/bench_template_pack.js static/js/templates.json \
+ *         static/js/templates.bin /tmp/templates.int8.bin
+ *
+ * Node 20 (no Float16Array, so float16 frames are widened once), 1 core,
+ * median of 20 loads. DTW delta is the largest change in a template's
+ * distance to the same probe window (match threshold 2.4):
+ *
+ *     file             bytes   load ms   max |DTW delta|
+ *     json         3,230,540      ~40          -
+ *     float16        336,576       ~2.5     0.0005
+ *     int8           183,256       ~0.8     0.0167
+ */
+
+const fs = require('fs');
+const path = require('path');
+const MantraTemplateMatcher = require(path.join(__dirname, '..', 'static', 'js', 'templateMatcher.js'));
+
+function load(buffer) {
+    return MantraTemplateMatcher.isTemplatePack(buffer)
+        ? MantraTemplateMatcher.parseTemplatePack(buffer)
+        : MantraTemplateMatcher.parseTemplateJSON(JSON.parse(new TextDecoder().decode(buffer)));
+}
+
+function median(xs) {
+    const s = xs.slice().sort((a, b) => a - b);
+    return s[Math.floor(s.length / 2)];
+}
+
+function main(files) {
+    const matcher = new MantraTemplateMatcher();
+    let reference = null;
+    console.log('file'.padEnd(28) + 'bytes'.padStart(12) + 'load ms'.padStart(10) + 'max |DTW delta|'.padStart(18));
+    for (const file of files) {
+        const bytes = fs.readFileSync(file);
+        const buffer = bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength);
+        const times = [];
+        let data;
+        for (let i = 0; i < 20; i++) {
+            const start = process.hrtime.bigint();
+            data = load(buffer);
+            times.push(Number(process.hrtime.bigint() - start) / 1e6);
+        }
+
+        // Match every template against the first JSON template, as _tryMatch() would
+        let delta = '-';
+        if (reference === null) {
+            reference = data;
+        } else {
+            const probe = reference.templates[0];
+            let worst = 0;
+            for (let t = 0; t < data.templates.length; t++) {
+                const a = matcher._dtwDistance(reference.templates[t], probe, 0.3, reference.templateScales[t]);
+                const b = matcher._dtwDistance(data.templates[t], probe, 0.3, data.templateScales[t]);
+                worst = Math.max(worst, Math.abs(a - b));
+            }
+            delta = worst.toFixed(4);
+        }
+        console.log(path.basename(file).padEnd(28) + bytes.length.toLocaleString('en-US').padStart(12)
+            + median(times).toFixed(2).padStart(10) + delta.padStart(18));
+    }
+}
+
+main(process.argv.slice(2));
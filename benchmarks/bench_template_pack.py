@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+🎼 Acoustic templates: download size and parse time, JSON versus template packs
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Builds the float16 and int8 packs of static/js/templates.json in memory
+and compares what a client downloads (raw and gzip -6, as a proxy would
+serve it) and how long Python takes to parse each back into frames.
+
+    PYTHONPATH=. python benchmarks/bench_template_pack.py
+
+For the browser side (typed-array views, DTW agreement) see
+benchmarks/bench_template_pack.js. On a 1-core container:
+
+    format        bytes      gzip   parse ms   max frame error
+    json      3,230,540    1424k       ~95           -
+    float16     336,576     282k       ~17        0.0019
+    int8        183,256     151k       ~37        0.0212
+
+(read_pack() dequantizes int8 in Python; the browser keeps int8 frames
+as they are and scales inside the distance.)
+"""
+
+import gzip
+import json
+import time
+
+from utils.template_pack import DTYPES, build_pack, read_pack
+
+SRC = 'static/js/templates.json'
+
+
+def _timed(parse, payload, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = parse(payload)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return data, best
+
+
+def run(src=SRC, repeat=3):
+    """Return [(format, bytes, gzip bytes, parse seconds, max frame error)], JSON first."""
+    with open(src, 'rb') as f:
+        raw = f.read()
+    data, seconds = _timed(json.loads, raw, repeat)
+    results = [('json', len(raw), len(gzip.compress(raw, 6)), seconds, 0.0)]
+    for dtype in DTYPES:
+        pack = build_pack(data, dtype)
+        decoded, seconds = _timed(read_pack, pack, repeat)
+        error = max(abs(a - b)
+                    for t_a, t_b in zip(data['templates'], decoded['templates'])
+                    for f_a, f_b in zip(t_a, t_b)
+                    for a, b in zip(f_a, f_b))
+        results.append((dtype, len(pack), len(gzip.compress(pack, 6)), seconds, error))
+    return results
+
+
+def main():
+    print(f"{'format':<8} {'bytes':>11} {'gzip':>9} {'parse ms':>10} {'max frame error':>16}")
+    for name, size, zipped, seconds, error in run():
+        print(f"{name:<8} {size:>11,} {zipped // 1000:>8}k {seconds * 1000:>10.0f} {error:>16.4f}")
+
+
+if __name__ == '__main__':
+    main()
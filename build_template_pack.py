@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Build the compact binary template pack that templateMatcher.js loads
+(format in utils/template_pack.py) from the acoustic templates.json.
+
+    python build_template_pack.py                # float16 -> static/js/templates.bin
+    python build_template_pack.py --int8         # int8 frames + per-band scales
+    python build_template_pack.py SRC.json OUT.bin [--int8]
+
+Re-run it whenever templates.json is rebuilt from a new reference
+recording; the pack is read back and checked before it is written.
+"""
+
+import os
+import sys
+import json
+
+from utils.template_pack import build_pack, read_pack
+
+DEFAULT_SRC = 'static/js/templates.json'
+DEFAULT_OUT = 'static/js/templates.bin'
+
+# Largest acceptable frame error after decoding (frames are z-scored)
+TOLERANCE = {'float16': 0.01, 'int8': 0.05}
+
+
+def max_frame_error(data, decoded):
+    return max((abs(a - b)
+                for t_a, t_b in zip(data['templates'], decoded['templates'])
+                for f_a, f_b in zip(t_a, t_b)
+                for a, b in zip(f_a, f_b)), default=0.0)
+
+
+def main(argv):
+    dtype = 'int8' if '--int8' in argv else 'float16'
+    paths = [a for a in argv if not a.startswith('--')]
+    src = paths[0] if len(paths) > 0 else DEFAULT_SRC
+    out = paths[1] if len(paths) > 1 else DEFAULT_OUT
+
+    try:
+        with open(src, encoding='utf-8') as f:
+            data = json.load(f)
+        pack = build_pack(data, dtype)
+        decoded = read_pack(pack)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Could not build the template pack from {src}: {e}")
+        return 1
+
+    error = max_frame_error(data, decoded)
+    if len(decoded['templates']) != len(data['templates']) or error > TOLERANCE[dtype]:
+        print(f"❌ Pack does not round-trip: max frame error {error:.4f} (limit {TOLERANCE[dtype]})")
+        return 1
+
+    with open(out, 'wb') as f:
+        f.write(pack)
+    before = os.path.getsize(src)
+    print(f"✅ {out}: {len(data['templates'])} templates, {dtype}, "
+          f"{before:,} -> {len(pack):,} bytes ({len(pack) / before:.1%}), max frame error {error:.4f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
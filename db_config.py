@@ -1,11 +1,29 @@
 import os
+import time
+import atexit
+import logging
+import threading
+from collections import deque
 import pymysql
 from dotenv import load_dotenv
 from contextlib import contextmanager
+from flask import g, has_app_context, request, has_request_context
+from utils import query_metrics
 
 load_dotenv("database.env")  # or just load_dotenv() if renamed to `.env`
 
-def get_db_connection():
+logger = logging.getLogger(__name__)
+
+# 🔌 Pool settings (per worker process)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))                   # connections kept idle
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 10))  # extra connections under load
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))          # seconds to wait for a free connection
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))          # reconnect connections older than this
+POOL_IDLE_TIMEOUT = int(os.getenv("DB_POOL_IDLE_TIMEOUT", 300))  # close connections idle longer than this
+POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", 5))     # ping on checkout after this much idle time
+
+
+def _connect():
     return pymysql.connect(
         host=os.getenv("MYSQL_HOST"),
         port=int(os.getenv("MYSQL_PORT")),
@@ -18,6 +36,329 @@ def get_db_connection():
         write_timeout=60,
     )
 
+
+class PoolTimeoutError(pymysql.err.OperationalError):
+    """Raised when no pooled connection becomes free within POOL_TIMEOUT"""
+    pass
+
+
+class PooledConnection:
+    """
+    Thin proxy around a pymysql connection checked out from the pool.
+    Everything is delegated to the real connection except close(), which
+    hands the connection back to the pool instead of dropping it.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, cursor=None):
+        """Cursor whose execute() is timed by utils.query_metrics"""
+        return self._raw.cursor(query_metrics.instrumented(cursor or self._raw.cursorclass))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        # A handle dropped without close() (early return, exception) must
+        # still give its slot back, otherwise the pool slowly starves.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool._checkin(self._raw, self._created_at)
+        self._raw = None
+
+
+class ConnectionPool:
+    """
+    Bounded pymysql connection pool.
+
+    Holds up to `size` idle connections and allows `max_overflow` extra ones
+    under load; callers beyond that wait up to `timeout` seconds. Idle
+    connections are reaped after `idle_timeout`, recycled after `recycle`
+    seconds and pinged on checkout when they have sat idle for a while.
+    """
+
+    def __init__(self, creator=_connect, size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW,
+                 timeout=POOL_TIMEOUT, recycle=POOL_RECYCLE, idle_timeout=POOL_IDLE_TIMEOUT,
+                 ping_after=POOL_PING_AFTER):
+        self._creator = creator
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self._idle = deque()  # (raw, created_at, last_used)
+        self._open = 0
+        self._lock = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'connects': 0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'timeouts': 0,
+            'recycled': 0,
+            'reaped': 0,
+            'ping_failures': 0,
+        }
+
+    # ---------- checkout / checkin ----------
+    def connect(self):
+        """Check out a connection, reusing an idle one when possible."""
+        waited_since = None
+        with self._lock:
+            while True:
+                self._reap_idle()
+                if self._idle:
+                    raw, created_at, last_used = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    raw = None
+                    break
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._stats['waits'] += 1
+                remaining = self.timeout - (time.monotonic() - waited_since)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    self._record_wait(waited_since)
+                    raise PoolTimeoutError(
+                        2013, f"Connection pool exhausted ({self._open} open), waited {self.timeout}s"
+                    )
+                self._lock.wait(remaining)
+            if waited_since is not None:
+                self._record_wait(waited_since)
+            self._stats['checkouts'] += 1
+
+        if raw is not None:
+            raw, created_at = self._validate(raw, created_at, last_used)
+        if raw is None:
+            try:
+                raw = self._creator()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                    self._lock.notify()
+                raise
+            created_at = time.monotonic()
+            with self._lock:
+                self._stats['connects'] += 1
+        return PooledConnection(self, raw, created_at)
+
+    def _validate(self, raw, created_at, last_used):
+        """Recycle stale connections and ping ones that have been idle."""
+        now = time.monotonic()
+        if self.recycle and now - created_at > self.recycle:
+            self._close_quietly(raw)
+            with self._lock:
+                self._stats['recycled'] += 1
+            return None, None
+        if now - last_used > self.ping_after:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(raw)
+                with self._lock:
+                    self._stats['ping_failures'] += 1
+                return None, None
+        return raw, created_at
+
+    def _checkin(self, raw, created_at):
+        healthy = bool(getattr(raw, 'open', False))
+        if healthy:
+            try:
+                # Never hand an open transaction or autocommit change to the next caller
+                raw.rollback()
+                if raw.get_autocommit():
+                    raw.autocommit(False)
+            except Exception:
+                healthy = False
+        with self._lock:
+            if healthy and len(self._idle) < self.size:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+                self._close_quietly(raw)
+            self._lock.notify()
+
+    # ---------- housekeeping ----------
+    def _reap_idle(self):
+        """Close idle connections past idle_timeout (caller holds the lock)."""
+        if not self.idle_timeout:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][2] < cutoff:
+            raw, _, _ = self._idle.popleft()
+            self._open -= 1
+            self._stats['reaped'] += 1
+            self._close_quietly(raw)
+
+    def _record_wait(self, waited_since):
+        self._stats['wait_time_ms'] += (time.monotonic() - waited_since) * 1000
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def dispose(self):
+        """Close every idle connection (checked-out ones close on return)."""
+        with self._lock:
+            while self._idle:
+                raw, _, _ = self._idle.pop()
+                self._open -= 1
+                self._close_quietly(raw)
+            self._lock.notify_all()
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+            return dict(
+                self._stats,
+                wait_time_ms=round(self._stats['wait_time_ms'], 2),
+                size=self.size,
+                max_overflow=self.max_overflow,
+                open=self._open,
+                idle=idle,
+                checked_out=self._open - idle,
+            )
+
+
+# One pool per worker process: gunicorn forks after import, so a pool
+# inherited from the master is discarded rather than shared.
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ConnectionPool()
+                _pool_pid = pid
+    return _pool
+
+
+def get_pool_stats():
+    """Pool statistics for monitoring (checked out, waits, wait time, ...)"""
+    with _request_stats_lock:
+        request_stats = dict(_request_stats)
+    return dict(get_pool().stats(), pid=os.getpid(), requests=request_stats)
+
+
+@atexit.register
+def _dispose_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.dispose()
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 🧵 Request-scoped connection
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Inside an app context every get_db_connection() call shares one pooled
+# connection stored on flask.g. It is acquired lazily on first use and
+# returned to the pool in teardown_appcontext, so the view, its helpers
+# and context processors (e.g. krishna_lila's category stats) cost at
+# most one checkout per request.
+
+_request_stats = {'requests_with_db': 0, 'multi_connection_requests': 0}
+_request_stats_lock = threading.Lock()
+
+
+class RequestConnection:
+    """
+    Handle on the request's shared connection. close() is a no-op so
+    existing `finally: conn.close()` blocks don't release it early.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def close(self):
+        pass
+
+
+def checkout_connection():
+    """Check out a dedicated pooled connection (background jobs, scripts)."""
+    conn = get_pool().connect()
+    if has_app_context():
+        g._db_checkouts = g.get('_db_checkouts', 0) + 1
+        if has_request_context() and '_db_endpoint' not in g:
+            g._db_endpoint = request.endpoint or request.path
+    return conn
+
+
+def _request_connection():
+    conn = g.get('_db_conn')
+    if conn is None:
+        conn = checkout_connection()
+        g._db_conn = conn
+    return RequestConnection(conn)
+
+
+def release_request_connection(exc=None):
+    """teardown_appcontext hook: return the request's connection to the pool."""
+    conn = g.pop('_db_conn', None)
+    checkouts = g.pop('_db_checkouts', 0)
+    endpoint = g.pop('_db_endpoint', None)
+    if conn is not None:
+        conn.close()
+    if not checkouts:
+        return
+    with _request_stats_lock:
+        _request_stats['requests_with_db'] += 1
+        if checkouts > 1:
+            _request_stats['multi_connection_requests'] += 1
+    if checkouts > 1:
+        logger.warning(f"Request {endpoint} opened {checkouts} DB connections (expected at most 1)")
+
+
+def init_app(app):
+    """Register request-scoped connection and query instrumentation hooks."""
+    app.teardown_appcontext(release_request_connection)
+    query_metrics.init_app(app)
+
+
+def get_db_connection():
+    """
+    Get a DB connection. Inside a request this is the request's shared
+    connection; elsewhere a pooled one whose close() returns it to the pool.
+    """
+    if has_app_context():
+        return _request_connection()
+    return checkout_connection()
+
 @contextmanager
 def get_db_cursor():
     """Context manager for database cursor operations"""
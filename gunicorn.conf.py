@@ -0,0 +1,22 @@
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 🦄 Gunicorn hooks (picked up automatically from the working directory)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Worker count, bind address and log files stay on the command line
+# (Procfile / prod.sh); this file sets the worker class and lifecycle hooks.
+
+import os
+
+# Live update streams (/harijap/api/live) stay open for minutes. With the
+# default sync worker each one would pin a whole process, so use threads
+# (or GUNICORN_WORKER_CLASS=gevent after `pip install gevent`).
+# Keep HARIJAP_LIVE_MAX_STREAMS below GUNICORN_THREADS so normal requests
+# always find a free thread.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", 64))
+
+
+def worker_exit(server, worker):
+    # Graceful restart / shutdown: write out coalesced saves before the worker dies
+    from utils import write_behind, japa_sessions
+    write_behind.flush_all()
+    japa_sessions.flush_all()
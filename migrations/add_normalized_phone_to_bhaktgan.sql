@@ -0,0 +1,11 @@
+-- Migration: Add indexed normalized phone / name key to bhaktgan
+-- Date: 2026-10-17
+-- Description: OTP login used to match RIGHT(REGEXP_REPLACE(phone ...), 10) and
+-- LOWER(TRIM(name)) per row, a full table scan. These stored keys make it an index seek.
+-- Backfill existing rows with: python run_phone_key_migration.py
+
+ALTER TABLE bhaktgan
+ADD COLUMN normalized_phone CHAR(10) NULL DEFAULT NULL AFTER phone,
+ADD COLUMN name_key VARCHAR(100) COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL AFTER name;
+
+CREATE INDEX idx_bhaktgan_phone_name_key ON bhaktgan(normalized_phone, name_key);
@@ -0,0 +1,9 @@
+-- Migration: Extra accepted spellings per mantra word
+-- Date: 2026-10-17
+-- Description: Comma-separated spellings the word matcher accepts exactly, on top of the
+-- word itself and its Devanagari (e.g. 'radhey,राधेय'). Only needed where japa_mantra_words
+-- was created before the column was added to create_japa_mantras.sql. Bump the mantra's
+-- version after editing spellings so every worker recompiles it.
+
+ALTER TABLE `japa_mantra_words`
+  ADD COLUMN `spellings` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL COMMENT 'Extra accepted spellings, comma-separated' AFTER `repetitions`;
@@ -0,0 +1,15 @@
+-- Migration: Pre-aggregated Guru Mantra city statistics
+-- Date: 2026-10-17
+-- Description: Backs /guru-mantra/api/city_stats. Save batches add their deltas to
+-- this table instead of the endpoint grouping every progress row by city.
+-- Create and fill it with: python run_city_rollup_reconcile.py
+
+CREATE TABLE IF NOT EXISTS `guru_mantra_city_rollup` (
+  `city` varchar(255) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `user_count` int(11) NOT NULL DEFAULT 0,
+  `total_count` bigint(20) NOT NULL DEFAULT 0,
+  `total_malas` bigint(20) NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`city`),
+  KEY `idx_city_rollup_total` (`total_count`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
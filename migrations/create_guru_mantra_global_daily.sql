@@ -0,0 +1,13 @@
+-- Migration: Sharded per-day Guru Mantra total
+-- Date: 2026-10-17
+-- Description: Backs /guru-mantra/api/daily_total. Each save batch adds its count to one
+-- random shard row of the IST day; readers sum the day's shards.
+-- Or run: python run_global_counter_migration.py
+
+CREATE TABLE IF NOT EXISTS `guru_mantra_global_daily` (
+  `day` date NOT NULL COMMENT 'IST date',
+  `shard` smallint(6) NOT NULL,
+  `words` bigint(20) NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`day`, `shard`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
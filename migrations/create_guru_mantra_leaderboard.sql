@@ -0,0 +1,20 @@
+-- Migration: Materialised top-K Guru Mantra leaderboard
+-- Date: 2026-10-17
+-- Description: Backs /guru-mantra/api/leaderboard. The save path keeps the top K in
+-- this table, so the first page never sorts guru_mantra_progress.
+-- Create and fill it with: python run_leaderboard_rebuild.py
+
+CREATE TABLE IF NOT EXISTS `guru_mantra_leaderboard` (
+  `rank_pos` int(11) NOT NULL,
+  `bhaktgan_id` int(11) NOT NULL,
+  `name` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  `city` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  `count` int(11) NOT NULL DEFAULT 0,
+  `total_malas` int(11) NOT NULL DEFAULT 0,
+  `last_spoken_at` datetime DEFAULT NULL,
+  `refreshed_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`rank_pos`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Top K (and later keyset pages) walk this index instead of sorting the table
+CREATE INDEX idx_guru_mantra_count_id ON guru_mantra_progress(count, bhaktgan_id);
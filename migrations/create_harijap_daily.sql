@@ -0,0 +1,23 @@
+-- Migration: Per-day Hari Jap history and activity bitmap
+-- Date: 2026-10-17
+-- Description: harijap_progress only keeps the current IST day. The save that rolls a
+-- row over to a new date first copies the old day into harijap_daily and sets its bit
+-- in harijap_activity (one BIGINT per 64 days, bit i = 2020-01-01 + 64 * word_idx + i).
+-- Create the tables and archive existing rows with: python run_harijap_daily_rollover.py
+
+CREATE TABLE IF NOT EXISTS `harijap_daily` (
+  `bhaktgan_id` int(11) NOT NULL,
+  `day` date NOT NULL COMMENT 'IST date',
+  `words` int(11) NOT NULL DEFAULT 0,
+  `pronunciations` int(11) NOT NULL DEFAULT 0,
+  `malas` int(11) NOT NULL DEFAULT 0,
+  `todays_count` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`bhaktgan_id`, `day`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `harijap_activity` (
+  `bhaktgan_id` int(11) NOT NULL,
+  `word_idx` int(11) NOT NULL COMMENT 'days since 2020-01-01 DIV 64',
+  `bits` bigint(20) unsigned NOT NULL DEFAULT 0,
+  PRIMARY KEY (`bhaktgan_id`, `word_idx`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
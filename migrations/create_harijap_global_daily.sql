@@ -0,0 +1,13 @@
+-- Migration: Sharded global "chanted today" counter for Hari Jap
+-- Date: 2026-10-17
+-- Description: Each save batch adds its words to one random shard row of the IST day,
+-- so saves do not queue behind a single hot counter row. Readers sum the day's shards.
+-- Or run: python run_global_counter_migration.py
+
+CREATE TABLE IF NOT EXISTS `harijap_global_daily` (
+  `day` date NOT NULL COMMENT 'IST date',
+  `shard` smallint(6) NOT NULL,
+  `words` bigint(20) NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`day`, `shard`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,20 @@
+-- Migration: Materialised top-K Hari Jap leaderboard
+-- Date: 2026-10-17
+-- Description: /harijap/api/leaderboard used to join harijap_progress to bhaktgan and
+-- sort every row per request. The save path now keeps the top K in this table.
+-- Create and fill it with: python run_leaderboard_rebuild.py
+
+CREATE TABLE IF NOT EXISTS `harijap_leaderboard` (
+  `rank_pos` int(11) NOT NULL,
+  `bhaktgan_id` int(11) NOT NULL,
+  `name` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  `city` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  `count` int(11) NOT NULL DEFAULT 0,
+  `total_malas` int(11) NOT NULL DEFAULT 0,
+  `last_spoken_at` datetime DEFAULT NULL,
+  `refreshed_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`rank_pos`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Top K (and later keyset pages) walk this index instead of sorting the table
+CREATE INDEX idx_harijap_count_id ON harijap_progress(count, bhaktgan_id);
@@ -0,0 +1,31 @@
+-- Migration: Database-driven japa mantra patterns
+-- Date: 2026-10-17
+-- Description: The mantra served by /japa and the japa APIs. Each worker compiles the active
+-- mantra once and re-reads (slug, version) every JAPA_PATTERN_CHECK_SECONDS. After editing a
+-- mantra's words, bump its version:  UPDATE japa_mantras SET version = version + 1 WHERE slug = ...
+-- Replaces krasha_jap (flat 16-word list, never read by the app).
+-- Or run: python run_japa_mantra_migration.py (also seeds the built-in Radhe Krishna pattern)
+
+CREATE TABLE IF NOT EXISTS `japa_mantras` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `slug` varchar(64) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `name` varchar(255) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `version` int(11) NOT NULL DEFAULT 1 COMMENT 'Bump after editing japa_mantra_words',
+  `is_default` tinyint(1) NOT NULL DEFAULT 0 COMMENT 'Served when JAPA_MANTRA_SLUG is empty',
+  `active` tinyint(1) NOT NULL DEFAULT 1,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `unique_slug` (`slug`),
+  KEY `idx_active_default` (`active`, `is_default`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `japa_mantra_words` (
+  `mantra_id` int(11) NOT NULL,
+  `position` smallint(6) NOT NULL COMMENT '1-based word group in the round',
+  `word_english` varchar(50) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `word_devanagari` varchar(50) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `repetitions` smallint(6) NOT NULL DEFAULT 1,
+  `spellings` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL COMMENT 'Extra accepted spellings, comma-separated',
+  PRIMARY KEY (`mantra_id`, `position`),
+  CONSTRAINT `fk_japa_mantra_words_mantra` FOREIGN KEY (`mantra_id`) REFERENCES `japa_mantras` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
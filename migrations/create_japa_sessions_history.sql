@@ -0,0 +1,20 @@
+-- Migration: Compressed archive of closed japa sessions
+-- Date: 2026-10-17
+-- Description: The japa janitor (utils/japa_janitor.py) moves authenticated users' closed
+-- sessions here after JAPA_SESSION_ARCHIVE_DAYS and deletes closed anonymous sessions, so
+-- japa_sessions only holds recent rows. Written once, read rarely: ROW_FORMAT=COMPRESSED.
+-- Or run: python run_japa_janitor.py
+
+CREATE TABLE IF NOT EXISTS `japa_sessions_history` (
+  `id` int NOT NULL COMMENT 'japa_sessions.id',
+  `user_id` varchar(200) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `session_start` timestamp NULL DEFAULT NULL,
+  `session_end` datetime DEFAULT NULL,
+  `last_updated` timestamp NULL DEFAULT NULL,
+  `total_count` int DEFAULT '0',
+  `current_word_index` int DEFAULT '1',
+  `current_repetition_count` int DEFAULT '1',
+  `archived_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `idx_user_start` (`user_id`, `session_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
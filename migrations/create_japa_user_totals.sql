@@ -0,0 +1,18 @@
+-- Migration: Running japa totals per user
+-- Date: 2026-10-17
+-- Description: Lifetime and latest-day rounds/words per user, updated in the same transaction
+-- as the japa_daily_counts upsert, so /api/japa/get_stats reads one row by primary key instead
+-- of SUM() over every daily row of the user.
+-- Or run: python run_japa_user_totals_backfill.py (creates the table and backfills it from
+-- japa_daily_counts, safe to re-run). Restart the app afterwards.
+
+CREATE TABLE IF NOT EXISTS `japa_user_totals` (
+  `user_id` varchar(200) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `lifetime_rounds` int(11) NOT NULL DEFAULT 0,
+  `lifetime_words` bigint(20) NOT NULL DEFAULT 0,
+  `today_date` date DEFAULT NULL COMMENT 'Latest japa_date with rounds',
+  `today_rounds` int(11) NOT NULL DEFAULT 0 COMMENT 'Rounds on today_date',
+  `today_words` int(11) NOT NULL DEFAULT 0 COMMENT 'Words on today_date',
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,16 @@
+-- Migration: Per-device sequence numbers for the v2 delta save protocol
+-- Date: 2026-10-17
+-- Description: /harijap/api/v2/save and /guru-mantra/api/v2/save apply (client_id, seq, delta)
+-- ops idempotently; this table remembers the last applied seq per device.
+-- Or run: python run_progress_sync_migration.py
+
+CREATE TABLE IF NOT EXISTS `progress_sync_devices` (
+  `mantra` varchar(32) COLLATE utf8mb4_unicode_ci NOT NULL COMMENT 'harijap / guru_mantra',
+  `bhaktgan_id` int(11) NOT NULL,
+  `client_id` varchar(64) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `last_seq` bigint(20) NOT NULL DEFAULT 0,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`mantra`, `bhaktgan_id`, `client_id`),
+  KEY `idx_sync_devices_updated` (`updated_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,39 @@
+-- Migration: Monthly range partitions for japa_sessions and japa_daily_counts
+-- Date: 2026-10-17
+-- Description: Old months can then be dropped with ALTER TABLE ... DROP PARTITION instead of
+-- row-by-row DELETEs. The partition column must be part of every unique key, so the primary
+-- keys become (id, session_start) / (id, japa_date). japa_sessions.session_start becomes
+-- NOT NULL, and fetch_active_session gets a (user_id, session_active, session_start) index.
+-- The janitor adds partitions two months ahead (splitting pmax) and drops expired ones.
+-- Boundaries below are as of the migration date. Prefer: python run_japa_janitor.py --partition
+-- (generates them for the current month and skips tables that are already partitioned).
+
+UPDATE japa_sessions SET session_start = COALESCE(last_updated, NOW()) WHERE session_start IS NULL;
+
+ALTER TABLE japa_sessions
+  MODIFY `session_start` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`id`, `session_start`),
+  ADD KEY `idx_user_active_start` (`user_id`, `session_active`, `session_start`);
+
+ALTER TABLE japa_sessions
+PARTITION BY RANGE (UNIX_TIMESTAMP(session_start)) (
+    PARTITION p_old VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+ALTER TABLE japa_daily_counts
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`id`, `japa_date`);
+
+ALTER TABLE japa_daily_counts
+PARTITION BY RANGE COLUMNS (japa_date) (
+    PARTITION p_old VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
@@ -0,0 +1,8 @@
+-- Migration: Widen japa_user_totals.user_id to match japa_sessions / japa_daily_counts
+-- Date: 2026-10-17
+-- Description: The first create_japa_user_totals.sql declared user_id varchar(100) while the
+-- tables it is filled from use varchar(200), so a long user id could not get a totals row.
+-- Safe to re-run. python run_japa_user_totals_backfill.py applies it too.
+
+ALTER TABLE `japa_user_totals`
+  MODIFY `user_id` varchar(200) COLLATE utf8mb4_unicode_ci NOT NULL;
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Sign-in helpers shared by the mantra blueprints (harijap_auth, guru_mantra_auth):
+mobile/name validation, Fast2SMS OTP delivery and the signed-in bhakt in the
+Flask session. Each blueprint keeps its own routes and session keys.
+"""
+
+import os
+import re
+import random
+import requests
+import pymysql
+from functools import wraps
+from flask import session, redirect, url_for
+from dotenv import load_dotenv
+
+# Load environment variables from database.env
+load_dotenv('database.env')
+
+# Fast2SMS Configuration
+FAST2SMS_API_KEY = os.getenv("FAST2SMS_API_KEY")
+FAST2SMS_URL = "https://www.fast2sms.com/dev/bulkV2"
+
+
+def get_cursor(conn):
+    """Get database cursor with DictCursor"""
+    return conn.cursor(pymysql.cursors.DictCursor)
+
+
+def normalize_mobile(mobile: str) -> str:
+    """
+    Normalize mobile number to last 10 digits.
+    
+    Args:
+        mobile: Mobile number string
+        
+    Returns:
+        Normalized 10-digit mobile number
+    """
+    if not mobile:
+        return ''
+    digits = ''.join(ch for ch in str(mobile) if ch.isdigit())
+    return digits[-10:] if len(digits) >= 10 else digits
+
+
+def is_valid_mobile(mobile: str) -> bool:
+    """
+    Validate Indian mobile number (starts with 6-9, 10 digits total).
+    
+    Args:
+        mobile: Mobile number to validate
+        
+    Returns:
+        True if valid, False otherwise
+    """
+    return bool(re.fullmatch(r'[6-9]\d{9}', normalize_mobile(mobile)))
+
+
+def is_valid_name(name: str) -> bool:
+    """
+    Validate name (only alphabets and spaces, 2-50 characters).
+    
+    Args:
+        name: Name to validate
+        
+    Returns:
+        True if valid, False otherwise
+    """
+    if not name or len(name.strip()) < 2 or len(name.strip()) > 50:
+        return False
+    return bool(re.fullmatch(r'[A-Za-z\s]+', name.strip()))
+
+
+def send_otp_via_fast2sms(mobile, otp):
+    """
+    Send OTP via Fast2SMS API.
+    
+    Args:
+        mobile: Mobile number (10 digits)
+        otp: 6-digit OTP code
+        
+    Returns:
+        True if SMS sent successfully, False otherwise
+    """
+    if not FAST2SMS_API_KEY:
+        print("ERROR: FAST2SMS_API_KEY not configured")
+        return False
+    
+    try:
+        payload = {
+            'route': 'otp',
+            'variables_values': otp,
+            'flash': 0,
+            'numbers': mobile
+        }
+        
+        headers = {
+            'authorization': FAST2SMS_API_KEY,
+            'accept': "*/*",
+            'cache-control': "no-cache",
+            'content-type': "application/x-www-form-urlencoded"
+        }
+        
+        response = requests.post(FAST2SMS_URL, data=payload, headers=headers, timeout=30)
+        
+        if response.status_code == 200:
+            result = response.json()
+            print(f"DEBUG: Fast2SMS Response: {result}")
+            return result.get('return', False)
+        else:
+            print(f"ERROR: Fast2SMS API error - Status: {response.status_code}, Response: {response.text}")
+            return False
+    except Exception as e:
+        print(f"ERROR: Failed to send OTP via Fast2SMS: {e}")
+        return False
+
+
+def generate_otp():
+    """Generate a 6-digit OTP"""
+    return str(random.randint(100000, 999999))
+
+
+def session_user_info():
+    """
+    Get user info from session.
+    
+    Returns:
+        Tuple of (bhaktgan_id, name, phone) or (None, None, None) if not authenticated
+    """
+    print(f"DEBUG: _get_user_info - Session keys: {list(session.keys())}")
+    print(f"DEBUG: Authenticated: {session.get('authenticated')}, User ID: {session.get('user_id')}")
+    
+    if not session.get('authenticated'):
+        print("DEBUG: User not authenticated")
+        return None, None, None
+    
+    user_id = session.get('user_id', '')
+    
+    if user_id.startswith('bhaktgan:'):
+        bhaktgan_id = user_id.split(':', 1)[1]
+        print(f"DEBUG: Extracted bhaktgan_id: {bhaktgan_id}")
+        return int(bhaktgan_id), session.get('user_name'), session.get('user_mobile')
+    
+    print("DEBUG: User ID format not recognized")
+    return None, None, None
+
+
+def login_required(authenticated_key, user_key, auth_endpoint):
+    """
+    Decorator factory: the route runs only when session[authenticated_key]
+    and session[user_key] are set, otherwise it redirects to auth_endpoint.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            print(f"DEBUG: Checking auth for {f.__name__}")
+            
+            if not session.get(authenticated_key) or not session.get(user_key):
+                print("DEBUG: Not authenticated, redirecting to auth page")
+                return redirect(url_for(auth_endpoint))
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
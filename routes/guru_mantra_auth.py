@@ -1,12 +1,19 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
-from db_config import get_db_connection
+from db_config import get_db_connection, checkout_connection
+from routes.utils import find_bhakt_by_phone_and_name
+from routes.bhakt_auth import (
+    get_cursor, normalize_mobile, is_valid_mobile, is_valid_name, send_otp_via_fast2sms,
+    generate_otp, login_required
+)
+from utils import progress_sync
+from utils.etags import conditional_json
+from utils.progress_engine import ProgressEngine, state_from_payload
+from utils.rollups import CityRollup
+from utils.counters import ShardedCounter
+from utils.leaderboard import LeaderboardCache
 import pymysql
 from datetime import datetime, timedelta
-import re
 import os
-import random
-import requests
-from functools import wraps
 from dotenv import load_dotenv
 
 # Load environment variables from database.env
@@ -14,113 +21,59 @@ load_dotenv('database.env')
 
 guru_mantra_auth_bp = Blueprint('guru_mantra_auth', __name__)
 
-# Fast2SMS Configuration
-FAST2SMS_API_KEY = os.getenv("FAST2SMS_API_KEY")
-FAST2SMS_URL = "https://www.fast2sms.com/dev/bulkV2"
+# Same progress pipeline as Hari Jap (utils/progress_engine.py): saves are
+# coalesced per user and flushed as one multi-row upsert
+GURU_MANTRA_WRITE_BEHIND = os.getenv("GURU_MANTRA_WRITE_BEHIND", "true").lower() == "true"
+GURU_MANTRA_FLUSH_INTERVAL_MS = int(os.getenv("GURU_MANTRA_FLUSH_INTERVAL_MS", 500))
+GURU_MANTRA_FLUSH_MAX_USERS = int(os.getenv("GURU_MANTRA_FLUSH_MAX_USERS", 200))
+
+# Leaderboard, city and daily totals are kept up to date by the save path
+# (same components as Hari Jap), so reads never group the progress table
+GURU_MANTRA_LEADERBOARD_SIZE = int(os.getenv("GURU_MANTRA_LEADERBOARD_SIZE", 100))
+GURU_MANTRA_LEADERBOARD_REFRESH_SECONDS = float(os.getenv("GURU_MANTRA_LEADERBOARD_REFRESH_SECONDS", 15))
+GURU_MANTRA_CITY_ROLLUP = os.getenv("GURU_MANTRA_CITY_ROLLUP", "true").lower() == "true"
+GURU_MANTRA_DAILY_COUNTER = os.getenv("GURU_MANTRA_DAILY_COUNTER", "true").lower() == "true"
+GURU_MANTRA_DAILY_COUNTER_SHARDS = int(os.getenv("GURU_MANTRA_DAILY_COUNTER_SHARDS", 16))
+GURU_MANTRA_DAILY_COUNTER_CACHE_SECONDS = float(os.getenv("GURU_MANTRA_DAILY_COUNTER_CACHE_SECONDS", 5))
+DAILY_TOTAL_MAX_DAYS = 31
 
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
 
-def get_cursor(conn):
-    """Get database cursor with DictCursor"""
-    return conn.cursor(pymysql.cursors.DictCursor)
-
-
-def normalize_mobile(mobile: str) -> str:
-    """Normalize mobile number to last 10 digits."""
-    if not mobile:
-        return ''
-    digits = ''.join(ch for ch in str(mobile) if ch.isdigit())
-    return digits[-10:] if len(digits) >= 10 else digits
-
-
-def is_valid_mobile(mobile: str) -> bool:
-    """Validate Indian mobile number (starts with 6-9, 10 digits total)."""
-    return bool(re.fullmatch(r'[6-9]\d{9}', normalize_mobile(mobile)))
-
-
-def is_valid_name(name: str) -> bool:
-    """Validate name (only alphabets and spaces, 2-50 characters)."""
-    if not name or len(name.strip()) < 2 or len(name.strip()) > 50:
-        return False
-    return bool(re.fullmatch(r'[A-Za-z\s]+', name.strip()))
-
-
-def send_otp_via_fast2sms(mobile, otp):
-    """Send OTP via Fast2SMS API."""
-    if not FAST2SMS_API_KEY:
-        print("ERROR: FAST2SMS_API_KEY not configured")
-        return False
-    
-    try:
-        payload = {
-            'route': 'otp',
-            'variables_values': otp,
-            'flash': 0,
-            'numbers': mobile
-        }
-        
-        headers = {
-            'authorization': FAST2SMS_API_KEY,
-            'accept': "*/*",
-            'cache-control': "no-cache",
-            'content-type': "application/x-www-form-urlencoded"
-        }
-        
-        response = requests.post(FAST2SMS_URL, data=payload, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            print(f"DEBUG: Fast2SMS Response: {result}")
-            return result.get('return', False)
-        else:
-            print(f"ERROR: Fast2SMS API error - Status: {response.status_code}, Response: {response.text}")
-            return False
-    except Exception as e:
-        print(f"ERROR: Failed to send OTP via Fast2SMS: {e}")
-        return False
-
-
-def generate_otp():
-    """Generate a 6-digit OTP"""
-    return str(random.randint(100000, 999999))
-
-
-def _get_user_info():
-    """Get user info from session."""
-    print(f"DEBUG: _get_user_info - Session keys: {list(session.keys())}")
-    print(f"DEBUG: Authenticated: {session.get('authenticated')}, User ID: {session.get('user_id')}")
-    
-    if not session.get('authenticated'):
-        print("DEBUG: User not authenticated")
-        return None, None, None
-    
-    user_id = session.get('user_id', '')
-    
-    if user_id.startswith('bhaktgan:'):
-        bhaktgan_id = user_id.split(':', 1)[1]
-        print(f"DEBUG: Extracted bhaktgan_id: {bhaktgan_id}")
-        return int(bhaktgan_id), session.get('user_name'), session.get('user_mobile')
-    
-    print("DEBUG: User ID format not recognized")
-    return None, None, None
-
-
-def require_guru_mantra_auth(f):
-    """Decorator to require authentication for Guru Mantra routes."""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        print(f"DEBUG: Checking auth for {f.__name__}")
-        print(f"DEBUG: Session keys: {list(session.keys())}")
-        print(f"DEBUG: guru_mantra_authenticated: {session.get('guru_mantra_authenticated')}")
-        print(f"DEBUG: guru_mantra_user_id: {session.get('guru_mantra_user_id')}")
-        
-        if not session.get('guru_mantra_authenticated') or not session.get('guru_mantra_user_id'):
-            print("DEBUG: Not authenticated, redirecting to auth page")
-            return redirect(url_for('guru_mantra_auth.auth_page'))
-        return f(*args, **kwargs)
-    return decorated_function
+# Redirects to the auth page unless signed in to Guru Mantra
+require_guru_mantra_auth = login_required(
+    'guru_mantra_authenticated', 'guru_mantra_user_id', 'guru_mantra_auth.auth_page'
+)
+
+
+leaderboard_cache = LeaderboardCache(
+    'guru_mantra_progress',
+    'guru_mantra_leaderboard',
+    size=GURU_MANTRA_LEADERBOARD_SIZE,
+    refresh_seconds=GURU_MANTRA_LEADERBOARD_REFRESH_SECONDS,
+    connect=checkout_connection,
+)
+
+city_rollup = CityRollup('guru_mantra_progress', 'guru_mantra_city_rollup', enabled=GURU_MANTRA_CITY_ROLLUP)
+
+daily_counter = ShardedCounter(
+    'guru_mantra_global_daily',
+    shards=GURU_MANTRA_DAILY_COUNTER_SHARDS,
+    cache_seconds=GURU_MANTRA_DAILY_COUNTER_CACHE_SECONDS,
+    enabled=GURU_MANTRA_DAILY_COUNTER,
+)
+
+progress_engine = ProgressEngine(
+    progress_sync.GURU_MANTRA,
+    checkout_connection,
+    write_behind=GURU_MANTRA_WRITE_BEHIND,
+    flush_interval_ms=GURU_MANTRA_FLUSH_INTERVAL_MS,
+    flush_max_users=GURU_MANTRA_FLUSH_MAX_USERS,
+    leaderboard=leaderboard_cache,
+    rollup=city_rollup,
+    counter=daily_counter,
+)
 
 
 # ============================================================================
@@ -172,18 +125,7 @@ def send_otp():
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
-        cursor.execute("""
-            SELECT id, name, phone
-            FROM bhaktgan
-            WHERE RIGHT(REGEXP_REPLACE(
-                REPLACE(REPLACE(REPLACE(IFNULL(phone,''), ' ', ''), '-', ''), '+91', ''), 
-                '^0+', ''
-            ), 10) = %s
-            AND LOWER(TRIM(name)) = LOWER(TRIM(%s))
-            LIMIT 1
-        """, (mobile, name))
-        
-        row = cursor.fetchone()
+        row = find_bhakt_by_phone_and_name(cursor, mobile, name)
         print(f"DEBUG: Database query result: {row}")
 
         if not row:
@@ -383,119 +325,35 @@ def guru_mantra_get_state():
         return jsonify({'success': False, 'error': 'Invalid user ID'}), 401
     
     bhaktgan_id = int(user_id.split(':', 1)[1])
-    name = session.get('guru_mantra_user_name', '')
-    phone = session.get('guru_mantra_user_mobile', '')
+    current_ist_date = progress_sync.ist_today()
+
+    return conditional_json(
+        progress_engine.state_key(bhaktgan_id), current_ist_date,
+        lambda: _guru_mantra_state(bhaktgan_id, current_ist_date)
+    )
 
+
+def _guru_mantra_state(bhaktgan_id, current_ist_date):
+    """(payload, status) for guru_mantra_get_state; rebuilt only when the ETag cache misses."""
     conn = None
     cursor = None
     
     try:
-        # Get current IST date for comparison
-        from datetime import timezone, timedelta
-        ist = timezone(timedelta(hours=5, minutes=30))
-        current_ist_date = datetime.now(ist).strftime('%Y-%m-%d')
-        
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
-        # Get user progress
-        cursor.execute("""
-            SELECT count, total_malas, current_mala_pronunciations, 
-                   total_pronunciations, last_spoken_at,
-                   today_pronunciations, today_malas, today_date,
-                   todays_count
-            FROM guru_mantra_progress 
-            WHERE bhaktgan_id = %s
-        """, (bhaktgan_id,))
+        # One read, no write: today's counts from an earlier IST date read as 0
+        # and the stored row is rolled over by the next save. Total count NEVER resets.
+        state = progress_engine.read_state(cursor, bhaktgan_id, current_ist_date)
+        print(f"DEBUG: Returning state - today_date: {state['today_date']}")
         
-        row = cursor.fetchone()
-        print(f"DEBUG: Database result: {row}")
-
-        # Create new record if doesn't exist
-        if not row:
-            print(f"DEBUG: Creating new record for bhaktgan_id: {bhaktgan_id}")
-            cursor.execute("""
-                INSERT INTO guru_mantra_progress 
-                (bhaktgan_id, name, phone, count, total_malas, 
-                 current_mala_pronunciations, total_pronunciations,
-                 today_pronunciations, today_malas, today_date,
-                 todays_count)
-                VALUES (%s, %s, %s, 0, 0, 0, 0, 0, 0, %s, 0)
-            """, (bhaktgan_id, name, phone, current_ist_date))
-            conn.commit()
-            
-            row = {
-                'count': 0, 
-                'total_malas': 0, 
-                'current_mala_pronunciations': 0,
-                'total_pronunciations': 0,
-                'last_spoken_at': None,
-                'today_pronunciations': 0,
-                'today_malas': 0,
-                'today_date': current_ist_date,
-                'todays_count': 0
-            }
-        else:
-            # Check if date has changed (IST 12:00 AM passed)
-            stored_date = None
-            if row.get('today_date'):
-                if isinstance(row['today_date'], str):
-                    stored_date = row['today_date']
-                else:
-                    stored_date = row['today_date'].strftime('%Y-%m-%d') if hasattr(row['today_date'], 'strftime') else str(row['today_date'])
-            
-            # Reset today's count if date changed (IST midnight passed)
-            if stored_date != current_ist_date:
-                print(f"DEBUG: Date changed from {stored_date} to {current_ist_date} (IST). Resetting today's count.")
-                
-                cursor.execute("""
-                    UPDATE guru_mantra_progress 
-                    SET today_pronunciations = 0,
-                        today_malas = 0,
-                        today_date = %s,
-                        todays_count = 0,
-                        current_mala_pronunciations = 0
-                    WHERE bhaktgan_id = %s
-                """, (current_ist_date, bhaktgan_id))
-                conn.commit()
-                
-                row['today_pronunciations'] = 0
-                row['today_malas'] = 0
-                row['today_date'] = current_ist_date
-                row['todays_count'] = 0
-                row['current_mala_pronunciations'] = 0
-                
-                print(f"DEBUG: Today's count reset. Total count preserved: {row['count']}")
-
-        today_date_str = None
-        if row.get('today_date'):
-            if isinstance(row['today_date'], str):
-                today_date_str = row['today_date']
-            else:
-                today_date_str = row['today_date'].strftime('%Y-%m-%d') if hasattr(row['today_date'], 'strftime') else str(row['today_date'])
-        else:
-            today_date_str = current_ist_date
-        
-        print(f"DEBUG: Returning state - today_date: {today_date_str}")
-        
-        return jsonify({
-            'success': True, 
-            'count': row['count'],  # Total count - NEVER resets
-            'total_malas': row['total_malas'],  # Total malas - NEVER resets
-            'current_mala_pronunciations': row.get('current_mala_pronunciations', 0),
-            'total_pronunciations': row.get('total_pronunciations', 0),  # Total pronunciations - NEVER resets
-            'last_spoken_at': row['last_spoken_at'],
-            'today_pronunciations': row.get('today_pronunciations', 0),  # Today's pronunciations - resets daily
-            'today_malas': row.get('today_malas', 0),  # Today's malas - resets daily
-            'today_date': today_date_str,
-            'todays_count': row.get('todays_count', 0)  # Today's count - resets daily
-        }), 200
+        return {'success': True, **progress_engine.public_state(state)}, 200
         
     except Exception as e:
         print(f"ERROR: guru_mantra_get_state - {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'success': False, 'error': 'Server error'}), 500
+        return {'success': False, 'error': 'Server error'}, 500
         
     finally:
         if cursor:
@@ -527,99 +385,26 @@ def guru_mantra_save_state():
     
     try:
         data = request.get_json() or {}
+        state = state_from_payload(data, bhaktgan_id, name, phone)
         
-        count = int(data.get('count', 0))
-        total_malas = int(data.get('totalMalas', 0))
-        current_mala_pronunciations = int(data.get('currentMalaPronunciations', 0))
-        total_pronunciations = int(data.get('totalPronunciations', 0))
-        today_pronunciations = int(data.get('todayPronunciations', 0))
-        today_malas = int(data.get('todayMalas', 0))
-        today_date = data.get('todayDate')
-        todays_count = int(data.get('todaysCount', 0))
-        
-        # Convert JavaScript date string to MySQL date format if needed
-        if today_date and isinstance(today_date, str):
-            try:
-                from datetime import datetime, timezone, timedelta
-                if 'GMT' in today_date or 'UTC' in today_date:
-                    dt = datetime.fromisoformat(today_date.replace('Z', '+00:00'))
-                    today_date = dt.strftime('%Y-%m-%d')
-                elif 'T' in today_date:
-                    dt = datetime.fromisoformat(today_date.split('T')[0])
-                    today_date = dt.strftime('%Y-%m-%d')
-            except (ValueError, TypeError):
-                ist = timezone(timedelta(hours=5, minutes=30))
-                today_date = datetime.now(ist).strftime('%Y-%m-%d')
-        elif not today_date:
-            from datetime import datetime, timezone, timedelta
-            ist = timezone(timedelta(hours=5, minutes=30))
-            today_date = datetime.now(ist).strftime('%Y-%m-%d')
-        
-        print(f"DEBUG: Saving - count={count}, malas={total_malas}")
+        print(f"DEBUG: Saving - count={state['count']}, malas={state['total_malas']}")
+
+        if progress_engine.write_behind:
+            progress_engine.buffer_save(state)
+            return jsonify({'success': True, 'buffered': True}), 200
 
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
-        # Check if date has changed (IST 12:00 AM passed) before saving
-        cursor.execute("""
-            SELECT today_date, count as stored_count
-            FROM guru_mantra_progress 
-            WHERE bhaktgan_id = %s
-        """, (bhaktgan_id,))
-        existing_row = cursor.fetchone()
-        
-        stored_date = None
-        if existing_row and existing_row.get('today_date'):
-            if isinstance(existing_row['today_date'], str):
-                stored_date = existing_row['today_date']
-            else:
-                stored_date = existing_row['today_date'].strftime('%Y-%m-%d') if hasattr(existing_row['today_date'], 'strftime') else str(existing_row['today_date'])
-        
-        # If date changed (IST midnight passed), reset today's fields
-        if stored_date and stored_date != today_date:
-            print(f"DEBUG: Date changed from {stored_date} to {today_date} during save. Resetting today's fields.")
-            today_pronunciations = 0
-            today_malas = 0
-            todays_count = 0
-            current_mala_pronunciations = 0
-
-        # Insert or update with all fields
-        cursor.execute("""
-            INSERT INTO guru_mantra_progress 
-            (bhaktgan_id, name, phone, count, total_malas, 
-             current_mala_pronunciations, total_pronunciations, 
-             last_spoken_at, updated_at, today_pronunciations, 
-             today_malas, today_date, todays_count)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW(), %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                count = GREATEST(count, VALUES(count)),
-                total_malas = GREATEST(total_malas, VALUES(total_malas)),
-                current_mala_pronunciations = VALUES(current_mala_pronunciations),
-                total_pronunciations = GREATEST(total_pronunciations, VALUES(total_pronunciations)),
-                last_spoken_at = NOW(),
-                updated_at = NOW(),
-                today_pronunciations = CASE 
-                    WHEN today_date = VALUES(today_date) THEN GREATEST(COALESCE(today_pronunciations, 0), VALUES(today_pronunciations))
-                    ELSE VALUES(today_pronunciations)
-                END,
-                today_malas = CASE 
-                    WHEN today_date = VALUES(today_date) THEN GREATEST(COALESCE(today_malas, 0), VALUES(today_malas))
-                    ELSE VALUES(today_malas)
-                END,
-                today_date = VALUES(today_date),
-                todays_count = CASE 
-                    WHEN today_date = VALUES(today_date) THEN GREATEST(COALESCE(todays_count, 0), VALUES(todays_count))
-                    ELSE VALUES(todays_count)
-                END
-        """, (bhaktgan_id, name, phone, count, total_malas, 
-              current_mala_pronunciations, total_pronunciations,
-              today_pronunciations, today_malas, today_date, todays_count))
-        
-        conn.commit()
+        # GREATEST() keeps totals from decreasing; the IST rollover is part of the upsert
+        progress_engine.save(conn, cursor, [state])
+        progress_engine.after_saved(conn, cursor, [state])
         print("DEBUG: Successfully saved to database")
         
         return jsonify({'success': True}), 200
         
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         print(f"ERROR: guru_mantra_save_state - {e}")
         import traceback
@@ -633,6 +418,203 @@ def guru_mantra_save_state():
             conn.close()
 
 
+@guru_mantra_auth_bp.route('/guru-mantra/api/v2/save', methods=['POST'])
+def guru_mantra_save_ops():
+    """
+    Apply a batch of Guru Mantra progress deltas (v2 sync protocol).
+    
+    Same body and response as /harijap/api/v2/save; see utils/progress_sync.py.
+    """
+    # Check authentication
+    if not session.get('guru_mantra_authenticated') or not session.get('guru_mantra_user_id'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    user_id = session.get('guru_mantra_user_id', '')
+    if not user_id.startswith('bhaktgan:'):
+        return jsonify({'success': False, 'error': 'Invalid user ID'}), 401
+    
+    bhaktgan_id = int(user_id.split(':', 1)[1])
+    name = session.get('guru_mantra_user_name', '')
+    phone = session.get('guru_mantra_user_mobile', '')
+
+    try:
+        client_id, ops = progress_sync.parse_ops(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+
+        result = progress_engine.apply_ops(conn, cursor, bhaktgan_id, name, phone, client_id, ops)
+        print(f"DEBUG: v2 save - client={client_id}, applied={result['applied']}, "
+              f"duplicates={result['duplicates']}, last_seq={result['last_seq']}")
+
+        return jsonify({'success': True, **result}), 200
+        
+    except Exception as e:
+        print(f"ERROR: guru_mantra_save_ops - {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# ============================================================================
+# STATISTICS AND LEADERBOARD ROUTES
+# ============================================================================
+
+@guru_mantra_auth_bp.route('/guru-mantra/api/leaderboard', methods=['GET'])
+def guru_mantra_leaderboard():
+    """
+    Get leaderboard of users by total Guru Mantra count, one keyset page at a time.
+    
+    The first page is read from guru_mantra_leaderboard (top K, rebuilt by
+    the refresh timer after saves); later pages continue from the cursor on the
+    (count, bhaktgan_id) index, never with OFFSET.
+    
+    Query params:
+        limit: rows per page (default 50, max 100)
+        cursor: next_cursor from the previous page
+    
+    Returns:
+        JSON with one page of users and the cursor for the next page
+    """
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+        try:
+            leaderboard, next_cursor = progress_engine.leaderboard_page(
+                cursor, request.args.get('limit', 50, type=int), request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+
+        return jsonify({
+            'success': True,
+            'leaderboard': leaderboard,
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        print(f"ERROR: guru_mantra_leaderboard - {e}")
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+@guru_mantra_auth_bp.route('/guru-mantra/api/city_stats', methods=['GET'])
+def guru_mantra_city_stats():
+    """
+    Get aggregated Guru Mantra statistics by city.
+    
+    Read from guru_mantra_city_rollup, which every save batch updates in its
+    own transaction (see utils/rollups.py). Returns 503 until
+    run_city_rollup_reconcile.py has created and filled it.
+    
+    Returns:
+        JSON with city-wise statistics
+    """
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+
+        try:
+            city_stats = city_rollup.read(cursor)
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                raise
+            return jsonify({'success': False, 'error': 'City statistics not available yet'}), 503
+
+        return jsonify({
+            'success': True,
+            'city_stats': city_stats
+        }), 200
+        
+    except Exception as e:
+        print(f"ERROR: guru_mantra_city_stats - {e}")
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+@guru_mantra_auth_bp.route('/guru-mantra/api/daily_total', methods=['GET'])
+def guru_mantra_daily_total():
+    """
+    Get the total Guru Mantra count chanted by everyone on one IST day.
+    
+    Summed from the sharded daily counter (16 rows per day by default);
+    today's total is cached per worker for a few seconds.
+    
+    Query params:
+        date: YYYY-MM-DD, today (IST) by default, at most 31 days back
+    
+    Returns:
+        JSON with the date and its global count
+    """
+    today = progress_sync.ist_today()
+    day = request.args.get('date', today)
+    try:
+        day = datetime.strptime(day, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return jsonify({'success': False, 'error': 'date must be YYYY-MM-DD'}), 400
+    oldest = (datetime.strptime(today, '%Y-%m-%d') - timedelta(days=DAILY_TOTAL_MAX_DAYS)).strftime('%Y-%m-%d')
+    if not oldest <= day <= today:
+        return jsonify({'success': False,
+                        'error': f'date must be within the last {DAILY_TOTAL_MAX_DAYS} days'}), 400
+
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+
+        try:
+            total = daily_counter.read(cursor, day)
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                raise
+            return jsonify({'success': False, 'error': 'Daily totals not available yet'}), 503
+
+        return jsonify({
+            'success': True,
+            'date': day,
+            'total_count': total,
+        }), 200
+        
+    except Exception as e:
+        print(f"ERROR: guru_mantra_daily_total - {e}")
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
 @guru_mantra_auth_bp.route('/guru-mantra')
 @require_guru_mantra_auth
 def guru_mantra():
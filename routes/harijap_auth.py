@@ -1,12 +1,22 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
-from db_config import get_db_connection
+from flask import Blueprint, Response, render_template, request, jsonify, session, redirect, url_for
+from db_config import get_db_connection, checkout_connection
+from routes.utils import find_bhakt_by_phone_and_name
+from routes.bhakt_auth import (
+    get_cursor, normalize_mobile, is_valid_mobile, is_valid_name, send_otp_via_fast2sms,
+    generate_otp, session_user_info, login_required
+)
+from utils.live_events import Broadcaster, format_sse
+from utils.etags import conditional_json
+from utils.rollups import CityRollup
+from utils.counters import ShardedCounter
+from utils.progress_engine import ProgressEngine, state_from_payload
+from utils import daily_history as history
+from utils import progress_sync
+from utils.leaderboard import LeaderboardCache, RankSnapshot, neighbours
 import pymysql
-from datetime import datetime, timedelta
-import re
+from datetime import datetime, timedelta, timezone
 import os
-import random
-import requests
-from functools import wraps
+import time
 from dotenv import load_dotenv
 
 # Load environment variables from database.env
@@ -14,151 +24,124 @@ load_dotenv('database.env')
 
 harijap_auth_bp = Blueprint('harijap_auth', __name__)
 
-# Fast2SMS Configuration
-FAST2SMS_API_KEY = os.getenv("FAST2SMS_API_KEY")
-FAST2SMS_URL = "https://www.fast2sms.com/dev/bulkV2"
+# Write-behind for /harijap/api/save: the client autosaves its full state every
+# few seconds, so saves are coalesced per user and flushed as one multi-row upsert
+HARIJAP_WRITE_BEHIND = os.getenv("HARIJAP_WRITE_BEHIND", "true").lower() == "true"
+HARIJAP_FLUSH_INTERVAL_MS = int(os.getenv("HARIJAP_FLUSH_INTERVAL_MS", 500))
+HARIJAP_FLUSH_MAX_USERS = int(os.getenv("HARIJAP_FLUSH_MAX_USERS", 200))
+
+# Leaderboard table: top K rebuilt off-request at most every N seconds after saves that reach it
+HARIJAP_LEADERBOARD_SIZE = int(os.getenv("HARIJAP_LEADERBOARD_SIZE", 100))
+HARIJAP_LEADERBOARD_REFRESH_SECONDS = float(os.getenv("HARIJAP_LEADERBOARD_REFRESH_SECONDS", 15))
+HARIJAP_RANK_SNAPSHOT_SECONDS = float(os.getenv("HARIJAP_RANK_SNAPSHOT_SECONDS", 60))
+
+# Per-city totals maintained in the same transaction as each save batch
+HARIJAP_CITY_ROLLUP = os.getenv("HARIJAP_CITY_ROLLUP", "true").lower() == "true"
+
+# Per-day history (harijap_daily) and activity bitmap, archived at each user's IST rollover
+HARIJAP_DAILY_HISTORY = os.getenv("HARIJAP_DAILY_HISTORY", "true").lower() == "true"
+
+# Global "chanted today" total: N counter rows per IST day, read through a short cache
+HARIJAP_GLOBAL_COUNTER = os.getenv("HARIJAP_GLOBAL_COUNTER", "true").lower() == "true"
+HARIJAP_GLOBAL_COUNTER_SHARDS = int(os.getenv("HARIJAP_GLOBAL_COUNTER_SHARDS", 16))
+HARIJAP_GLOBAL_COUNTER_CACHE_SECONDS = float(os.getenv("HARIJAP_GLOBAL_COUNTER_CACHE_SECONDS", 5))
+
+# Live updates (/harijap/api/live): SSE stream with a long-poll fallback, per worker limits
+HARIJAP_LIVE_TICK_SECONDS = float(os.getenv("HARIJAP_LIVE_TICK_SECONDS", 15))
+HARIJAP_LIVE_STATE_REFRESH_SECONDS = float(os.getenv("HARIJAP_LIVE_STATE_REFRESH_SECONDS", 60))
+HARIJAP_LIVE_MAX_STREAM_SECONDS = float(os.getenv("HARIJAP_LIVE_MAX_STREAM_SECONDS", 300))
+HARIJAP_LIVE_MAX_STREAMS = int(os.getenv("HARIJAP_LIVE_MAX_STREAMS", 48))
+HARIJAP_LIVE_POLL_SECONDS = float(os.getenv("HARIJAP_LIVE_POLL_SECONDS", 25))
 
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
 
-def get_cursor(conn):
-    """Get database cursor with DictCursor"""
-    return conn.cursor(pymysql.cursors.DictCursor)
+def _ist_today():
+    return progress_sync.ist_today()
 
 
-def normalize_mobile(mobile: str) -> str:
-    """
-    Normalize mobile number to last 10 digits.
-    
-    Args:
-        mobile: Mobile number string
-        
-    Returns:
-        Normalized 10-digit mobile number
-    """
-    if not mobile:
-        return ''
-    digits = ''.join(ch for ch in str(mobile) if ch.isdigit())
-    return digits[-10:] if len(digits) >= 10 else digits
+# ============================================================================
+# PROGRESS ENGINE (upsert, write-behind buffer and derived tables)
+# ============================================================================
 
+leaderboard_cache = LeaderboardCache(
+    'harijap_progress',
+    'harijap_leaderboard',
+    size=HARIJAP_LEADERBOARD_SIZE,
+    refresh_seconds=HARIJAP_LEADERBOARD_REFRESH_SECONDS,
+    connect=checkout_connection,
+)
 
-def is_valid_mobile(mobile: str) -> bool:
-    """
-    Validate Indian mobile number (starts with 6-9, 10 digits total).
-    
-    Args:
-        mobile: Mobile number to validate
-        
-    Returns:
-        True if valid, False otherwise
-    """
-    return bool(re.fullmatch(r'[6-9]\d{9}', normalize_mobile(mobile)))
+rank_snapshot = RankSnapshot('harijap_progress', max_age=HARIJAP_RANK_SNAPSHOT_SECONDS,
+                             connect=checkout_connection)
 
+city_rollup = CityRollup('harijap_progress', 'harijap_city_rollup', enabled=HARIJAP_CITY_ROLLUP)
 
-def is_valid_name(name: str) -> bool:
-    """
-    Validate name (only alphabets and spaces, 2-50 characters).
-    
-    Args:
-        name: Name to validate
-        
-    Returns:
-        True if valid, False otherwise
-    """
-    if not name or len(name.strip()) < 2 or len(name.strip()) > 50:
-        return False
-    return bool(re.fullmatch(r'[A-Za-z\s]+', name.strip()))
+daily_history = history.DailyHistory(
+    'harijap_progress', 'harijap_daily', 'harijap_activity', enabled=HARIJAP_DAILY_HISTORY
+)
 
+today_counter = ShardedCounter(
+    'harijap_global_daily',
+    shards=HARIJAP_GLOBAL_COUNTER_SHARDS,
+    cache_seconds=HARIJAP_GLOBAL_COUNTER_CACHE_SECONDS,
+    enabled=HARIJAP_GLOBAL_COUNTER,
+)
 
-def send_otp_via_fast2sms(mobile, otp):
-    """
-    Send OTP via Fast2SMS API.
-    
-    Args:
-        mobile: Mobile number (10 digits)
-        otp: 6-digit OTP code
-        
-    Returns:
-        True if SMS sent successfully, False otherwise
-    """
-    if not FAST2SMS_API_KEY:
-        print("ERROR: FAST2SMS_API_KEY not configured")
-        return False
-    
-    try:
-        payload = {
-            'route': 'otp',
-            'variables_values': otp,
-            'flash': 0,
-            'numbers': mobile
-        }
-        
-        headers = {
-            'authorization': FAST2SMS_API_KEY,
-            'accept': "*/*",
-            'cache-control': "no-cache",
-            'content-type': "application/x-www-form-urlencoded"
-        }
-        
-        response = requests.post(FAST2SMS_URL, data=payload, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            print(f"DEBUG: Fast2SMS Response: {result}")
-            return result.get('return', False)
-        else:
-            print(f"ERROR: Fast2SMS API error - Status: {response.status_code}, Response: {response.text}")
-            return False
-    except Exception as e:
-        print(f"ERROR: Failed to send OTP via Fast2SMS: {e}")
-        return False
+
+def _server_time_payload():
+    """Current IST time in the /harijap/api/server_time shape."""
+    ist = timezone(timedelta(hours=5, minutes=30))
+    now = datetime.now(ist)
+    return {
+        'date': now.strftime('%Y-%m-%d'),
+        'datetime': now.isoformat(),
+        'timezone': 'IST',
+        'timestamp': now.timestamp(),
+        'hour': now.hour,
+        'minute': now.minute,
+        'second': now.second
+    }
+
+
+def _live_tick():
+    """Shared live payload, built once per tick per worker: server time + global total."""
+    payload = {'server_time': _server_time_payload(), 'global_today': None}
+    if today_counter.enabled:
+        conn = checkout_connection()
+        cursor = None
+        try:
+            cursor = get_cursor(conn)
+            payload['global_today'] = today_counter.read(cursor, payload['server_time']['date'])
+        except Exception as e:
+            print(f"ERROR: harijap live tick - {e}")
+        finally:
+            if cursor:
+                cursor.close()
+            conn.close()
+    return payload
 
 
-def generate_otp():
-    """Generate a 6-digit OTP"""
-    return str(random.randint(100000, 999999))
+live_updates = Broadcaster('harijap', tick_seconds=HARIJAP_LIVE_TICK_SECONDS, tick_func=_live_tick)
 
 
-def _get_user_info():
-    """
-    Get user info from session.
-    
-    Returns:
-        Tuple of (bhaktgan_id, name, phone) or (None, None, None) if not authenticated
-    """
-    print(f"DEBUG: _get_user_info - Session keys: {list(session.keys())}")
-    print(f"DEBUG: Authenticated: {session.get('authenticated')}, User ID: {session.get('user_id')}")
-    
-    if not session.get('authenticated'):
-        print("DEBUG: User not authenticated")
-        return None, None, None
-    
-    user_id = session.get('user_id', '')
-    
-    if user_id.startswith('bhaktgan:'):
-        bhaktgan_id = user_id.split(':', 1)[1]
-        print(f"DEBUG: Extracted bhaktgan_id: {bhaktgan_id}")
-        return int(bhaktgan_id), session.get('user_name'), session.get('user_mobile')
-    
-    print("DEBUG: User ID format not recognized")
-    return None, None, None
+progress_engine = ProgressEngine(
+    progress_sync.HARIJAP,
+    checkout_connection,
+    write_behind=HARIJAP_WRITE_BEHIND,
+    flush_interval_ms=HARIJAP_FLUSH_INTERVAL_MS,
+    flush_max_users=HARIJAP_FLUSH_MAX_USERS,
+    leaderboard=leaderboard_cache,
+    rollup=city_rollup,
+    history=daily_history,
+    counter=today_counter,
+    live=live_updates,
+)
 
 
-def require_harijap_auth(f):
-    """
-    Decorator to require authentication for Hari Jap routes.
-    Redirects to auth page if not authenticated.
-    """
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        print(f"DEBUG: Checking auth for {f.__name__}")
-        
-        if not session.get('authenticated') or not session.get('user_id'):
-            print("DEBUG: Not authenticated, redirecting to auth page")
-            return redirect(url_for('harijap_auth.auth_page'))
-        return f(*args, **kwargs)
-    return decorated_function
+# Redirects to the auth page unless signed in
+require_harijap_auth = login_required('authenticated', 'user_id', 'harijap_auth.auth_page')
 
 
 # ============================================================================
@@ -221,18 +204,7 @@ def send_otp():
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
-        cursor.execute("""
-            SELECT id, name, phone
-            FROM bhaktgan
-            WHERE RIGHT(REGEXP_REPLACE(
-                REPLACE(REPLACE(REPLACE(IFNULL(phone,''), ' ', ''), '-', ''), '+91', ''), 
-                '^0+', ''
-            ), 10) = %s
-            AND LOWER(TRIM(name)) = LOWER(TRIM(%s))
-            LIMIT 1
-        """, (mobile, name))
-        
-        row = cursor.fetchone()
+        row = find_bhakt_by_phone_and_name(cursor, mobile, name)
         print(f"DEBUG: Database query result: {row}")
 
         if not row:
@@ -453,131 +425,51 @@ def harijap_get_state():
     """
     print("DEBUG: harijap_get_state called")
     
-    bhaktgan_id, name, phone = _get_user_info()
+    bhaktgan_id, name, phone = session_user_info()
     
     if not bhaktgan_id:
         print("DEBUG: Unauthorized - no bhaktgan_id")
         return jsonify({'success': False, 'error': 'Unauthorized'}), 401
 
+    return conditional_json(progress_engine.state_key(bhaktgan_id), _ist_today(), lambda: _harijap_state(bhaktgan_id))
+
+
+def _harijap_state(bhaktgan_id):
+    """(payload, status) for harijap_get_state; rebuilt only when the ETag cache misses."""
     conn = None
     cursor = None
     
     try:
-        # Get current IST date for comparison
-        from datetime import timezone, timedelta
-        ist = timezone(timedelta(hours=5, minutes=30))
-        current_ist_date = datetime.now(ist).strftime('%Y-%m-%d')
-        
+        current_ist_date = _ist_today()
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
-        # Get user progress with all fields including today's data
-        cursor.execute("""
-            SELECT count, total_malas, current_mala_pronunciations, 
-                   total_pronunciations, last_spoken_at,
-                   today_words, today_pronunciations, today_malas, today_date,
-                   todays_count
-            FROM harijap_progress 
-            WHERE bhaktgan_id = %s
-        """, (bhaktgan_id,))
-        
-        row = cursor.fetchone()
-        print(f"DEBUG: Database result: {row}")
+        # One read, no write: today's fields from an earlier IST date read as 0,
+        # with a save still waiting in this worker's write-behind buffer overlaid.
+        # Total count (count, total_malas, total_pronunciations) NEVER resets.
+        state = progress_engine.read_state(cursor, bhaktgan_id, current_ist_date)
 
-        # Create new record if doesn't exist
-        if not row:
-            print(f"DEBUG: Creating new record for bhaktgan_id: {bhaktgan_id}")
-            cursor.execute("""
-                INSERT INTO harijap_progress 
-                (bhaktgan_id, name, phone, count, total_malas, 
-                 current_mala_pronunciations, total_pronunciations,
-                 today_words, today_pronunciations, today_malas, today_date,
-                 todays_count)
-                VALUES (%s, %s, %s, 0, 0, 0, 0, 0, 0, 0, %s, 0)
-            """, (bhaktgan_id, name, phone, current_ist_date))
-            conn.commit()
-            
-            row = {
-                'count': 0, 
-                'total_malas': 0, 
-                'current_mala_pronunciations': 0,
-                'total_pronunciations': 0,
-                'last_spoken_at': None,
-                'today_words': 0,
-                'today_pronunciations': 0,
-                'today_malas': 0,
-                'today_date': current_ist_date,
-                'todays_count': 0
-            }
-        else:
-            # CRITICAL FIX: Check if date has changed (IST 12:00 AM passed)
-            # If date changed, reset today's fields but PRESERVE total count
-            stored_date = None
-            if row.get('today_date'):
-                if isinstance(row['today_date'], str):
-                    stored_date = row['today_date']
-                else:
-                    stored_date = row['today_date'].strftime('%Y-%m-%d') if hasattr(row['today_date'], 'strftime') else str(row['today_date'])
-            
-            # Reset today's count if date changed (IST midnight passed)
-            if stored_date != current_ist_date:
-                print(f"DEBUG: Date changed from {stored_date} to {current_ist_date} (IST). Resetting today's count.")
-                
-                # CRITICAL: Only reset today's fields, NEVER reset total count
-                cursor.execute("""
-                    UPDATE harijap_progress 
-                    SET today_words = 0,
-                        today_pronunciations = 0,
-                        today_malas = 0,
-                        today_date = %s,
-                        todays_count = 0,
-                        current_mala_pronunciations = 0
-                    WHERE bhaktgan_id = %s
-                """, (current_ist_date, bhaktgan_id))
-                conn.commit()
-                
-                # Update row dict to reflect reset values
-                row['today_words'] = 0
-                row['today_pronunciations'] = 0
-                row['today_malas'] = 0
-                row['today_date'] = current_ist_date
-                row['todays_count'] = 0
-                row['current_mala_pronunciations'] = 0
-                
-                print(f"DEBUG: Today's count reset. Total count preserved: {row['count']}")
-
-        # CRITICAL FIX: Ensure today_date is always a string, never None
-        today_date_str = None
-        if row.get('today_date'):
-            if isinstance(row['today_date'], str):
-                today_date_str = row['today_date']
-            else:
-                today_date_str = row['today_date'].strftime('%Y-%m-%d') if hasattr(row['today_date'], 'strftime') else str(row['today_date'])
-        else:
-            # If today_date is None, use current IST date
-            today_date_str = current_ist_date
+        print(f"DEBUG: Returning state - today_date: {state['today_date']}, today_words: {state['today_words']}, todays_count: {state['todays_count']}")
         
-        print(f"DEBUG: Returning state - today_date: {today_date_str}, today_words: {row.get('today_words', 0)}, todays_count: {row.get('todays_count', 0)}")
-        
-        return jsonify({
+        return {
             'success': True, 
-            'count': row['count'],  # Total count - NEVER resets
-            'total_malas': row['total_malas'],  # Total malas - NEVER resets
-            'current_mala_pronunciations': row.get('current_mala_pronunciations', 0),
-            'total_pronunciations': row.get('total_pronunciations', 0),  # Total pronunciations - NEVER resets
-            'last_spoken_at': row['last_spoken_at'],
-            'today_words': row.get('today_words', 0),  # Today's count - resets daily at IST 12:00 AM
-            'today_pronunciations': row.get('today_pronunciations', 0),  # Today's pronunciations - resets daily
-            'today_malas': row.get('today_malas', 0),  # Today's malas - resets daily
-            'today_date': today_date_str,  # Current IST date - always a string
-            'todays_count': row.get('todays_count', 0)  # Today's count - resets daily
-        }), 200
+            'count': state['count'],  # Total count - NEVER resets
+            'total_malas': state['total_malas'],  # Total malas - NEVER resets
+            'current_mala_pronunciations': state['current_mala_pronunciations'],
+            'total_pronunciations': state['total_pronunciations'],  # Total pronunciations - NEVER resets
+            'last_spoken_at': state['last_spoken_at'],
+            'today_words': state['today_words'],  # Today's count - resets daily at IST 12:00 AM
+            'today_pronunciations': state['today_pronunciations'],  # Today's pronunciations - resets daily
+            'today_malas': state['today_malas'],  # Today's malas - resets daily
+            'today_date': state['today_date'],  # Current IST date - always a string
+            'todays_count': state['todays_count']  # Today's count - resets daily
+        }, 200
         
     except Exception as e:
         print(f"ERROR: harijap_get_state - {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'success': False, 'error': 'Server error'}), 500
+        return {'success': False, 'error': 'Server error'}, 500
         
     finally:
         if cursor:
@@ -604,7 +496,7 @@ def harijap_save_state():
     """
     print("DEBUG: harijap_save_state called")
     
-    bhaktgan_id, name, phone = _get_user_info()
+    bhaktgan_id, name, phone = session_user_info()
     
     if not bhaktgan_id:
         print("DEBUG: Unauthorized - no bhaktgan_id")
@@ -615,120 +507,30 @@ def harijap_save_state():
     
     try:
         data = request.get_json() or {}
+        state = state_from_payload(data, bhaktgan_id, name, phone)
         
-        # Extract all progress data including today's data
-        count = int(data.get('count', 0))
-        total_malas = int(data.get('totalMalas', 0))
-        current_mala_pronunciations = int(data.get('currentMalaPronunciations', 0))
-        total_pronunciations = int(data.get('totalPronunciations', 0))
-        today_words = int(data.get('todayWords', 0))
-        today_pronunciations = int(data.get('todayPronunciations', 0))
-        today_malas = int(data.get('todayMalas', 0))
-        today_date = data.get('todayDate')
-        todays_count = int(data.get('todaysCount', 0))
-        
-        # Convert JavaScript date string to MySQL date format if needed
-        if today_date and isinstance(today_date, str):
-            try:
-                from datetime import datetime, timezone, timedelta
-                # Handle different date formats from JavaScript
-                if 'GMT' in today_date or 'UTC' in today_date:
-                    # Parse ISO date string and convert to MySQL format
-                    dt = datetime.fromisoformat(today_date.replace('Z', '+00:00'))
-                    today_date = dt.strftime('%Y-%m-%d')
-                elif 'T' in today_date:
-                    # Handle ISO format dates
-                    dt = datetime.fromisoformat(today_date.split('T')[0])
-                    today_date = dt.strftime('%Y-%m-%d')
-            except (ValueError, TypeError):
-                # If parsing fails, use current date in IST timezone
-                ist = timezone(timedelta(hours=5, minutes=30))
-                today_date = datetime.now(ist).strftime('%Y-%m-%d')
-        elif not today_date:
-            # CRITICAL FIX: Use IST timezone for date consistency
-            from datetime import datetime, timezone, timedelta
-            ist = timezone(timedelta(hours=5, minutes=30))
-            today_date = datetime.now(ist).strftime('%Y-%m-%d')
-        
-        print(f"DEBUG: Saving - count={count}, malas={total_malas}, " 
-              f"current_mala={current_mala_pronunciations}, total_pron={total_pronunciations}, "
-              f"today_words={today_words}, today_malas={today_malas}, today_date={today_date}")
+        print(f"DEBUG: Saving - count={state['count']}, malas={state['total_malas']}, " 
+              f"current_mala={state['current_mala_pronunciations']}, total_pron={state['total_pronunciations']}, "
+              f"today_words={state['today_words']}, today_malas={state['today_malas']}, today_date={state['today_date']}")
+
+        if progress_engine.write_behind:
+            # Coalesced with this user's other pending saves and written by the flush thread
+            progress_engine.buffer_save(state)
+            return jsonify({'success': True, 'buffered': True}), 200
 
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
-        # CRITICAL: Check if date has changed (IST 12:00 AM passed) before saving
-        # Get current stored date to compare
-        cursor.execute("""
-            SELECT today_date, count as stored_count
-            FROM harijap_progress 
-            WHERE bhaktgan_id = %s
-        """, (bhaktgan_id,))
-        existing_row = cursor.fetchone()
-        
-        stored_date = None
-        if existing_row and existing_row.get('today_date'):
-            if isinstance(existing_row['today_date'], str):
-                stored_date = existing_row['today_date']
-            else:
-                stored_date = existing_row['today_date'].strftime('%Y-%m-%d') if hasattr(existing_row['today_date'], 'strftime') else str(existing_row['today_date'])
-        
-        # If date changed (IST midnight passed), reset today's fields
-        # CRITICAL: Total count (count, total_malas, total_pronunciations) NEVER resets
-        if stored_date and stored_date != today_date:
-            print(f"DEBUG: Date changed from {stored_date} to {today_date} during save. Resetting today's fields.")
-            today_words = 0
-            today_pronunciations = 0
-            today_malas = 0
-            todays_count = 0
-            current_mala_pronunciations = 0
-
-        # Insert or update with all fields including today's data
         # CRITICAL FIX: Use GREATEST() to ensure total count NEVER decreases
-        # This prevents data loss if client sends incorrect values
-        # Total count (count, total_malas, total_pronunciations) is NEVER reset
-        cursor.execute("""
-            INSERT INTO harijap_progress 
-            (bhaktgan_id, name, phone, count, total_malas, 
-             current_mala_pronunciations, total_pronunciations, 
-             last_spoken_at, updated_at, today_words, today_pronunciations, 
-             today_malas, today_date, todays_count)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW(), %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                count = GREATEST(count, VALUES(count)),
-                total_malas = GREATEST(total_malas, VALUES(total_malas)),
-                current_mala_pronunciations = VALUES(current_mala_pronunciations),
-                total_pronunciations = GREATEST(total_pronunciations, VALUES(total_pronunciations)),
-                last_spoken_at = NOW(),
-                updated_at = NOW(),
-                -- CRITICAL FIX: Use GREATEST for today's counts to prevent data loss
-                -- Only update if date matches, otherwise reset (handled by date check above)
-                today_words = CASE 
-                    WHEN today_date = VALUES(today_date) THEN GREATEST(COALESCE(today_words, 0), VALUES(today_words))
-                    ELSE VALUES(today_words)
-                END,
-                today_pronunciations = CASE 
-                    WHEN today_date = VALUES(today_date) THEN GREATEST(COALESCE(today_pronunciations, 0), VALUES(today_pronunciations))
-                    ELSE VALUES(today_pronunciations)
-                END,
-                today_malas = CASE 
-                    WHEN today_date = VALUES(today_date) THEN GREATEST(COALESCE(today_malas, 0), VALUES(today_malas))
-                    ELSE VALUES(today_malas)
-                END,
-                today_date = VALUES(today_date),
-                todays_count = CASE 
-                    WHEN today_date = VALUES(today_date) THEN GREATEST(COALESCE(todays_count, 0), VALUES(todays_count))
-                    ELSE VALUES(todays_count)
-                END
-        """, (bhaktgan_id, name, phone, count, total_malas, 
-              current_mala_pronunciations, total_pronunciations,
-              today_words, today_pronunciations, today_malas, today_date, todays_count))
-        
-        conn.commit()
+        # The IST date rollover is handled inside the upsert itself
+        progress_engine.save(conn, cursor, [state])
         print("DEBUG: Successfully saved to database")
+        progress_engine.after_saved(conn, cursor, [state])
         
         return jsonify({'success': True}), 200
         
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         print(f"ERROR: harijap_save_state - {e}")
         import traceback
@@ -742,6 +544,126 @@ def harijap_save_state():
             conn.close()
 
 
+@harijap_auth_bp.route('/harijap/api/v2/save', methods=['POST'])
+def harijap_save_ops():
+    """
+    Apply a batch of Hari Jap progress deltas (v2 sync protocol).
+    
+    Request JSON:
+        {
+            "client_id": "tab-3f9c",
+            "ops": [{"seq": 41, "words": 10, "pronunciations": 2, "malas": 0}]
+        }
+        
+    Ops at or below the device's last applied seq are acknowledged but not
+    re-applied, so retries are safe. See utils/progress_sync.py.
+        
+    Returns:
+        JSON with applied/duplicate op counts, last_seq and the authoritative state
+    """
+    bhaktgan_id, name, phone = session_user_info()
+    
+    if not bhaktgan_id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    try:
+        client_id, ops = progress_sync.parse_ops(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+
+        result = progress_engine.apply_ops(conn, cursor, bhaktgan_id, name, phone, client_id, ops)
+        print(f"DEBUG: v2 save - client={client_id}, applied={result['applied']}, "
+              f"duplicates={result['duplicates']}, last_seq={result['last_seq']}")
+
+        return jsonify({'success': True, **result}), 200
+        
+    except Exception as e:
+        print(f"ERROR: harijap_save_ops - {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+@harijap_auth_bp.route('/harijap/api/save_batch', methods=['POST'])
+def harijap_save_batch():
+    """
+    Save the progress snapshots a client queued while offline, in one request.
+    
+    Request JSON:
+        {
+            "events": [
+                {"count": 640, "todayWords": 600, ..., "todayDate": "2025-01-05"},
+                {"count": 665, "todayWords": 25, ..., "at": 1736101845000}
+            ]
+        }
+        
+    Each event is a /harijap/api/save payload; events without todayDate are
+    dated from "at" (epoch ms) in IST. The queue may cross IST midnight:
+    each day's last state is written against its own today_date, oldest
+    first, in one transaction.
+        
+    Returns:
+        JSON with the reconciled state (same fields as /harijap/api/state)
+    """
+    bhaktgan_id, name, phone = session_user_info()
+    
+    if not bhaktgan_id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({'success': False, 'error': 'events must be a non-empty list'}), 400
+    if len(events) > progress_sync.MAX_OPS_PER_REQUEST:
+        return jsonify({'success': False,
+                        'error': f'At most {progress_sync.MAX_OPS_PER_REQUEST} events per request'}), 400
+
+    current_ist_date = _ist_today()
+    try:
+        states = progress_engine.states_from_events(events, bhaktgan_id, name, phone, current_ist_date)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+
+        # A save still waiting in this worker's write-behind buffer joins the batch
+        day_states, state = progress_engine.save_events(conn, cursor, bhaktgan_id, states, current_ist_date)
+        print(f"DEBUG: save_batch - events={len(events)}, days={[s['today_date'] for s in day_states]}")
+
+        return jsonify({'success': True, 'events': len(events), 'days': len(day_states),
+                        **progress_engine.public_state(state)}), 200
+        
+    except Exception as e:
+        print(f"ERROR: harijap_save_batch - {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
 # ============================================================================
 # STATISTICS AND LEADERBOARD ROUTES
 # ============================================================================
@@ -754,11 +676,16 @@ def harijap_get_stats():
     Returns:
         JSON with user progress and personal info
     """
-    bhaktgan_id, name, phone = _get_user_info()
+    bhaktgan_id, name, phone = session_user_info()
     
     if not bhaktgan_id:
         return jsonify({'success': False, 'error': 'Unauthorized'}), 401
 
+    return conditional_json(progress_engine.stats_key(bhaktgan_id), _ist_today(), lambda: _harijap_stats(bhaktgan_id))
+
+
+def _harijap_stats(bhaktgan_id):
+    """(payload, status) for harijap_get_stats; rebuilt only when the ETag cache misses."""
     conn = None
     cursor = None
     
@@ -783,7 +710,7 @@ def harijap_get_stats():
         """, (bhaktgan_id,))
         user_info = cursor.fetchone()
 
-        return jsonify({
+        return {
             'success': True,
             'progress': progress or {
                 'count': 0, 
@@ -792,10 +719,119 @@ def harijap_get_stats():
                 'total_pronunciations': 0
             },
             'user_info': user_info or {}
-        }), 200
+        }, 200
         
     except Exception as e:
         print(f"ERROR: harijap_get_stats - {e}")
+        return {'success': False, 'error': 'Server error'}, 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+@harijap_auth_bp.route('/harijap/api/history', methods=['GET'])
+def harijap_history():
+    """
+    Get the user's per-day japa for the last N IST days (chart data).
+    
+    Query params:
+        days: number of days ending today (default 30, max 366)
+        
+    Returns:
+        JSON with one entry per day, oldest first; days without japa are zeros
+    """
+    bhaktgan_id, name, phone = session_user_info()
+    
+    if not bhaktgan_id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    days = request.args.get('days', 30, type=int)
+    days = max(1, min(days or 30, history.MAX_HISTORY_DAYS))
+
+    conn = None
+    cursor = None
+    
+    try:
+        today = datetime.strptime(_ist_today(), '%Y-%m-%d').date()
+        first_day = today - timedelta(days=days - 1)
+
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+
+        try:
+            recorded = daily_history.read_days(cursor, bhaktgan_id, first_day, today)
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:
+                raise
+            return jsonify({'success': False, 'error': 'History not available yet'}), 503
+
+        empty = {field: 0 for field in history.DAILY_FIELDS}
+        series = []
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            series.append({'date': day.isoformat(), **recorded.get(day, empty)})
+
+        return jsonify({'success': True, 'days': days, 'history': series}), 200
+        
+    except Exception as e:
+        print(f"ERROR: harijap_history - {e}")
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+@harijap_auth_bp.route('/harijap/api/streak', methods=['GET'])
+def harijap_streak():
+    """
+    Get the user's current and longest japa streak (consecutive IST days).
+    
+    The current streak stays alive until the end of today even if today
+    has no japa yet. Computed from the activity bitmap, 64 days per row.
+    
+    Returns:
+        JSON with current_streak, longest_streak, active_days and first_active_date
+    """
+    bhaktgan_id, name, phone = session_user_info()
+    
+    if not bhaktgan_id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    conn = None
+    cursor = None
+    
+    try:
+        today = datetime.strptime(_ist_today(), '%Y-%m-%d').date()
+
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+
+        try:
+            words = daily_history.read_activity(cursor, bhaktgan_id, today)
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:
+                raise
+            return jsonify({'success': False, 'error': 'History not available yet'}), 503
+
+        first_day = history.first_active_day(words)
+        return jsonify({
+            'success': True,
+            'current_streak': history.current_streak(words, today),
+            'longest_streak': history.longest_streak(words),
+            'active_days': history.active_days(words),
+            'active_today': history.is_active(words, today),
+            'first_active_date': first_day.isoformat() if first_day else None,
+            'today': today.isoformat(),
+        }), 200
+        
+    except Exception as e:
+        print(f"ERROR: harijap_streak - {e}")
         return jsonify({'success': False, 'error': 'Server error'}), 500
         
     finally:
@@ -805,38 +841,288 @@ def harijap_get_stats():
             conn.close()
 
 
+@harijap_auth_bp.route('/harijap/api/global_today', methods=['GET'])
+def harijap_global_today():
+    """
+    Get the total Hari Jap words chanted today (IST) by everyone.
+    
+    Summed from the sharded daily counter and cached per worker for a few
+    seconds; saves reach it when their write-behind batch is flushed.
+    
+    Returns:
+        JSON with today's date and global word count
+    """
+    conn = None
+    cursor = None
+    
+    try:
+        today = _ist_today()
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+
+        try:
+            total = today_counter.read(cursor, today)
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:
+                raise
+            return jsonify({'success': False, 'error': 'Global counter not available yet'}), 503
+
+        return jsonify({
+            'success': True,
+            'today_date': today,
+            'total_words': total,
+        }), 200
+        
+    except Exception as e:
+        print(f"ERROR: harijap_global_today - {e}")
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# ============================================================================
+# LIVE UPDATES (SSE WITH LONG-POLL FALLBACK)
+# ============================================================================
+
+def _live_state(bhaktgan_id):
+    """The user's state as /harijap/api/state reports it, on a short-lived connection."""
+    conn = checkout_connection()
+    cursor = None
+    try:
+        cursor = get_cursor(conn)
+        state = progress_engine.read_state(cursor, bhaktgan_id, _ist_today())
+        conn.commit()  # end the read view so the next refresh sees new saves
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+    return progress_engine.public_state(state)
+
+
+def _live_stream(bhaktgan_id, sub):
+    """Generator behind /harijap/api/live. Runs outside the request context."""
+    started = time.monotonic()
+    next_refresh = started + HARIJAP_LIVE_STATE_REFRESH_SECONDS
+    try:
+        yield "retry: 3000\n\n"
+        yield format_sse('state', _live_state(bhaktgan_id))
+        last_tick = live_updates.last_tick()
+        if last_tick is None:
+            live_updates.tick()  # first stream in this worker: arrives through `sub` below
+        else:
+            yield format_sse('tick', dict(last_tick, server_time=_server_time_payload()))
+
+        while time.monotonic() - started < HARIJAP_LIVE_MAX_STREAM_SECONDS:
+            events = sub.get(timeout=HARIJAP_LIVE_TICK_SECONDS)
+            for event, data in events:
+                if event == 'tick':
+                    yield format_sse('tick', data)
+            # A save in this worker, or the periodic refresh that picks up
+            # saves handled by other workers: one read either way
+            if any(event == 'changed' for event, _ in events) or time.monotonic() >= next_refresh:
+                yield format_sse('state', _live_state(bhaktgan_id))
+                next_refresh = time.monotonic() + HARIJAP_LIVE_STATE_REFRESH_SECONDS
+            if not events:
+                yield ": keepalive\n\n"
+
+        # Hand the thread back; EventSource reconnects on its own after `retry`
+        yield format_sse('reconnect', {'after_seconds': HARIJAP_LIVE_MAX_STREAM_SECONDS})
+    except Exception as e:
+        print(f"ERROR: harijap live stream - {e}")
+    finally:
+        live_updates.unsubscribe(sub)
+
+
+@harijap_auth_bp.route('/harijap/api/live', methods=['GET'])
+def harijap_live():
+    """
+    Server-Sent Events stream of the user's state, server time and the
+    global today total.
+    
+    Events:
+        state: same fields as /harijap/api/state, on connect, after each save
+               and every HARIJAP_LIVE_STATE_REFRESH_SECONDS
+        tick:  {server_time, global_today} every HARIJAP_LIVE_TICK_SECONDS
+        reconnect: sent before the server closes a long-lived stream
+        
+    Returns 503 with fallback "poll" when this worker has no stream slots
+    left; clients then use /harijap/api/live/poll.
+    """
+    bhaktgan_id, name, phone = session_user_info()
+    
+    if not bhaktgan_id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    if live_updates.open_streams() >= HARIJAP_LIVE_MAX_STREAMS:
+        return jsonify({'success': False, 'error': 'Too many live streams', 'fallback': 'poll'}), 503
+
+    sub = live_updates.subscribe([('user', bhaktgan_id)])
+    return Response(
+        _live_stream(bhaktgan_id, sub),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@harijap_auth_bp.route('/harijap/api/live/poll', methods=['GET'])
+def harijap_live_poll():
+    """
+    Long-poll fallback for /harijap/api/live.
+    
+    Query params:
+        wait: 1 to hold the request until a save or tick arrives
+              (at most HARIJAP_LIVE_POLL_SECONDS); 0 for an immediate snapshot
+        
+    Returns:
+        JSON with state, tick and whether the state changed while waiting
+    """
+    bhaktgan_id, name, phone = session_user_info()
+    
+    if not bhaktgan_id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    changed = False
+    tick = None
+    try:
+        if request.args.get('wait', 0, type=int):
+            sub = live_updates.subscribe([('user', bhaktgan_id)], kind='poll')
+            try:
+                events = sub.get(timeout=HARIJAP_LIVE_POLL_SECONDS)
+            finally:
+                live_updates.unsubscribe(sub, kind='poll')
+            changed = any(event == 'changed' for event, _ in events)
+            tick = next((data for event, data in reversed(events) if event == 'tick'), None)
+
+        return jsonify({
+            'success': True,
+            'changed': changed,
+            'state': _live_state(bhaktgan_id),
+            'tick': dict(tick or live_updates.last_tick() or live_updates.tick(),
+                         server_time=_server_time_payload()),
+        }), 200
+        
+    except Exception as e:
+        print(f"ERROR: harijap_live_poll - {e}")
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+
+
 @harijap_auth_bp.route('/harijap/api/leaderboard', methods=['GET'])
 def harijap_leaderboard():
     """
-    Get leaderboard of top users by total count.
+    Get leaderboard of users by total count, one keyset page at a time.
+    
+    The first page is served from the harijap_leaderboard table (top K by
+    rank), which each worker's refresh timer rebuilds after saves that can
+    reach it; see utils/leaderboard.py for the staleness bound. Later pages continue from the cursor on the
+    (count, bhaktgan_id) index, never with OFFSET.
+    
+    Query params:
+        limit: rows per page (default 50, max 100)
+        cursor: next_cursor from the previous page
+    
+    Returns:
+        JSON with one page of users and the cursor for the next page
+    """
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
+        try:
+            leaderboard, next_cursor = progress_engine.leaderboard_page(
+                cursor, request.args.get('limit', 50, type=int), request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+
+        return jsonify({
+            'success': True,
+            'leaderboard': leaderboard,
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        print(f"ERROR: harijap_leaderboard - {e}")
+        return jsonify({'success': False, 'error': 'Server error'}), 500
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+@harijap_auth_bp.route('/harijap/api/my_rank', methods=['GET'])
+def harijap_my_rank():
+    """
+    Get the caller's leaderboard rank and the users ranked around them.
+    
+    The rank is a binary search in this worker's RankSnapshot (other users'
+    counts at most HARIJAP_RANK_SNAPSHOT_SECONDS old, reloaded in the
+    background; one index aggregate until the first load); the caller's own
+    count and the neighbours are read fresh through the
+    (count, bhaktgan_id) index.
+    
+    Query params:
+        neighbours: users to return on each side (default 3, max 10)
     
     Returns:
-        JSON with top 50 users
+        JSON with rank, count, total ranked users and neighbours above/below
     """
+    bhaktgan_id, name, phone = session_user_info()
+    
+    if not bhaktgan_id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
     conn = None
     cursor = None
     
     try:
+        n = min(max(0, request.args.get('neighbours', 3, type=int)), 10)
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
         cursor.execute("""
-            SELECT hp.name, hp.count, hp.total_malas, hp.last_spoken_at, bg.city
-            FROM harijap_progress hp
-            JOIN bhaktgan bg ON hp.bhaktgan_id = bg.id
-            WHERE hp.count > 0
-            ORDER BY hp.count DESC
-            LIMIT 50
-        """)
-        leaderboard = cursor.fetchall()
+            SELECT count FROM harijap_progress WHERE bhaktgan_id = %s
+        """, (bhaktgan_id,))
+        row = cursor.fetchone()
+        count = row['count'] if row else 0
+        pending = progress_engine.buffer.peek(bhaktgan_id)
+        if pending:
+            count = max(count, pending['count'])
+
+        if rank_snapshot.ensure_fresh():
+            rank, total = rank_snapshot.rank(count, bhaktgan_id), rank_snapshot.total()
+        else:
+            # This worker's first snapshot is still loading
+            rank, total = rank_snapshot.rank_from_index(cursor, count, bhaktgan_id)
+
+        above, below = [], []
+        if rank is not None and n:
+            above, below = neighbours(cursor, 'harijap_progress', count, bhaktgan_id, n)
+            for i, entry in enumerate(above, start=1):
+                entry['rank'] = max(1, rank - i)
+            for i, entry in enumerate(below, start=1):
+                entry['rank'] = rank + i
+
+        def public(entries):
+            return [{k: v for k, v in e.items() if k != 'bhaktgan_id'} for e in entries]
 
         return jsonify({
             'success': True,
-            'leaderboard': leaderboard
+            'rank': rank,
+            'count': count,
+            'total_ranked': max(total, rank or 0),
+            'above': public(above),
+            'below': public(below)
         }), 200
         
     except Exception as e:
-        print(f"ERROR: harijap_leaderboard - {e}")
+        print(f"ERROR: harijap_my_rank - {e}")
         return jsonify({'success': False, 'error': 'Server error'}), 500
         
     finally:
@@ -851,6 +1137,9 @@ def harijap_city_stats():
     """
     Get aggregated statistics by city.
     
+    Read from harijap_city_rollup, which every save batch updates in its
+    own transaction (see utils/rollups.py).
+    
     Returns:
         JSON with city-wise statistics
     """
@@ -861,19 +1150,24 @@ def harijap_city_stats():
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
-        cursor.execute("""
-            SELECT bg.city, 
-                   COUNT(hp.bhaktgan_id) as user_count,
-                   SUM(hp.count) as total_count,
-                   SUM(hp.total_malas) as total_malas,
-                   AVG(hp.count) as avg_count
-            FROM harijap_progress hp
-            JOIN bhaktgan bg ON hp.bhaktgan_id = bg.id
-            WHERE bg.city IS NOT NULL AND bg.city != ''
-            GROUP BY bg.city
-            ORDER BY total_count DESC
-        """)
-        city_stats = cursor.fetchall()
+        try:
+            city_stats = city_rollup.read(cursor)
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                raise
+            cursor.execute("""
+                SELECT bg.city, 
+                       COUNT(hp.bhaktgan_id) as user_count,
+                       SUM(hp.count) as total_count,
+                       SUM(hp.total_malas) as total_malas,
+                       AVG(hp.count) as avg_count
+                FROM harijap_progress hp
+                JOIN bhaktgan bg ON hp.bhaktgan_id = bg.id
+                WHERE bg.city IS NOT NULL AND bg.city != ''
+                GROUP BY bg.city
+                ORDER BY total_count DESC
+            """)
+            city_stats = cursor.fetchall()
 
         return jsonify({
             'success': True,
@@ -919,21 +1213,7 @@ def get_server_time():
     Returns:
         JSON with current server date and time in IST timezone
     """
-    from datetime import timezone, timedelta
-    # Create IST timezone (UTC+5:30)
-    ist = timezone(timedelta(hours=5, minutes=30))
-    now = datetime.now(ist)
-    
-    return jsonify({
-        'success': True,
-        'date': now.strftime('%Y-%m-%d'),
-        'datetime': now.isoformat(),
-        'timezone': 'IST',
-        'timestamp': now.timestamp(),
-        'hour': now.hour,
-        'minute': now.minute,
-        'second': now.second
-    }), 200
+    return jsonify({'success': True, **_server_time_payload()}), 200
 
 
 @harijap_auth_bp.route('/harijap/auth/test_session', methods=['GET', 'POST'])
@@ -1,14 +1,17 @@
 from flask import Blueprint, render_template, request, jsonify, session
-from db_config import get_db_connection
+from db_config import get_db_connection, checkout_connection
+from utils.etags import etag_cache, conditional_json
+from utils.japa_sessions import JapaSessionCache
+from utils.japa_janitor import JapaJanitor
+from utils.mantra_patterns import CompiledMantra, MantraPatternCache
 from datetime import date
 import uuid
 import pymysql
-import difflib
-import re
 
 japa_bp = Blueprint('japa', __name__)
 
-# Define the mantra pattern with repetitions
+# Built-in mantra pattern: served until the japa_mantras tables exist, and
+# the seed of run_japa_mantra_migration.py
 MANTRA_PATTERN = [
     {'word': 'radhe', 'devanagari': 'राधे', 'repetitions': 1},
     {'word': 'krishna', 'devanagari': 'कृष्णा', 'repetitions': 1},
@@ -26,6 +29,21 @@ MANTRA_PATTERN = [
 # Calculate total utterances in one complete round
 TOTAL_UTTERANCES = sum(item['repetitions'] for item in MANTRA_PATTERN)
 
+# The active mantra from japa_mantras, compiled once per version (see utils/mantra_patterns.py)
+mantra_patterns = MantraPatternCache(
+    checkout_connection, CompiledMantra('radhe-krishna', 'Radhe Krishna', 0, MANTRA_PATTERN)
+)
+
+# Most tokens accepted by one /api/japa/update_count_batch call
+JAPA_BATCH_MAX_WORDS = 64
+
+# Active sessions are advanced in memory and written back every few words
+# (see utils/japa_sessions.py for the loss bound)
+japa_sessions = JapaSessionCache(TOTAL_UTTERANCES, checkout_connection)
+
+# Closes abandoned sessions, archives / purges closed ones, rolls the monthly partitions
+japa_janitor = JapaJanitor(checkout_connection)
+
 # ---------- Helpers ----------
 def get_or_create_user_token() -> str:
     """Get authenticated user_id or redirect to auth if not authenticated."""
@@ -47,73 +65,13 @@ def get_or_create_user_token() -> str:
 def get_cursor(conn):
     return conn.cursor(pymysql.cursors.DictCursor)
 
-def get_pattern_info_from_position(position):
-    """Get pattern information based on position - now tracks pattern groups, not individual utterances."""
-    if position < 1:
-        position = 1
-    elif position > len(MANTRA_PATTERN):
-        position = 1  # Reset to beginning
-
-    pattern_index = position - 1
-    pattern_item = MANTRA_PATTERN[pattern_index]
-
-    return {
-        'pattern_index': pattern_index,
-        'word_english': pattern_item['word'],
-        'word_devanagari': pattern_item['devanagari'],
-        'total_repetitions': pattern_item['repetitions'],
-        'pattern_position': position
-    }
-
-def get_expected_word_from_session(current_pattern_position, current_repetition_count):
-    """Get expected word details based on current pattern position and repetition count."""
-    pattern_info = get_pattern_info_from_position(current_pattern_position)
-
+def word_info(word_data):
     return {
-        'word_english': pattern_info['word_english'],
-        'word_devanagari': pattern_info['word_devanagari'],
-        'repetition_number': current_repetition_count,
-        'total_repetitions': pattern_info['total_repetitions'],
-        'pattern_position': current_pattern_position,
-        'pattern_index': pattern_info['pattern_index']
+        'word_english': word_data['word_english'],
+        'word_devanagari': word_data['word_devanagari'],
+        'repetition_info': f"{word_data['repetition_number']}/{word_data['total_repetitions']}"
     }
 
-def advance_position(current_pattern_position, current_repetition_count):
-    """Advance to next position in pattern. Returns (new_pattern_position, new_repetition_count, completed_round)."""
-    pattern_info = get_pattern_info_from_position(current_pattern_position)
-    
-    # FIXED: Only advance if ALL repetitions are completed
-    if current_repetition_count < pattern_info['total_repetitions']:
-        # Still need more repetitions of current word - stay on same word
-        return current_pattern_position, current_repetition_count + 1, False
-    else:
-        # Completed all repetitions, move to next word in pattern
-        new_pattern_position = current_pattern_position + 1
-        if new_pattern_position > len(MANTRA_PATTERN):
-            # Completed full round
-            return 1, 1, True
-        else:
-            return new_pattern_position, 1, False
-
-def create_display_mantra():
-    """Create the mantra display with repetitions shown."""
-    display_words = []
-    word_order = 1
-
-    for pattern_item in MANTRA_PATTERN:
-        for rep in range(pattern_item['repetitions']):
-            display_words.append({
-                'word_order': word_order,
-                'word_english': pattern_item['word'],
-                'word_devanagari': pattern_item['devanagari'],
-                'is_repetition': rep > 0,
-                'repetition_number': rep + 1,
-                'total_repetitions': pattern_item['repetitions']
-            })
-            word_order += 1
-
-    return display_words
-
 def fetch_active_session(cursor, user_token):
     """Return dict with id, total_count, current_pattern_position, current_repetition_count or None."""
     cursor.execute("""
@@ -125,71 +83,67 @@ def fetch_active_session(cursor, user_token):
     """, (user_token,))
     return cursor.fetchone()
 
-def normalize_word(word):
-    """Normalize word for better matching."""
-    if not word:
-        return ""
-
-    # Convert to lowercase and strip
-    word = word.lower().strip()
-
-    # Remove punctuation and extra spaces
-    word = re.sub(r'[^\w\s]', '', word)
-    word = re.sub(r'\s+', ' ', word).strip()
-
-    return word
-
-def is_word_match(recognized_word, expected_word):
-    """Enhanced word matching with strict separation between different words."""
-    recognized = normalize_word(recognized_word)
-    expected = normalize_word(expected_word)
-
-    # Direct match
-    if recognized == expected:
-        return True
-
-    # STRICT word mappings - each word has completely distinct variations
-    word_mappings = {
-        'radhe': [
-            'radhe', 'राधे', 'radhey', 'radhai', 'rade', 'radey'
-        ],
-        'krishna': [
-            'krishna', 'कृष्णा', 'krisha', 'krisna', 'krishnaa', 'krsna'
-        ],
-        'shyam': [
-            'shyam', 'श्याम', 'sham', 'shaam', 'syam', 'shym'
-            # NO variations that could match shyama
-        ],
-        'shyama': [
-            'shyama', 'श्यामा', 'shyamaa'
-            # NO variations that could match shyam
-        ]
-    }
+def fetch_japa_totals(cursor, user_token, today):
+    """Return (daily_rounds, daily_words, lifetime_rounds, lifetime_words)."""
+    if japa_sessions.user_totals:
+        try:
+            # One primary-key read, maintained with every japa_daily_counts upsert
+            cursor.execute("""
+                SELECT today_date, today_rounds, today_words, lifetime_rounds, lifetime_words
+                FROM japa_user_totals
+                WHERE user_id = %s
+            """, (user_token,))
+            totals = cursor.fetchone()
+            if not totals:
+                return 0, 0, 0, 0
+            is_today = totals['today_date'] == today
+            return (int(totals['today_rounds']) if is_today else 0,
+                    int(totals['today_words']) if is_today else 0,
+                    int(totals['lifetime_rounds']), int(totals['lifetime_words']))
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                raise
+            japa_sessions.user_totals = False
 
-    # STRICT CHECK: Only allow exact variations for expected word
-    if expected in word_mappings:
-        for variation in word_mappings[expected]:
-            if recognized == normalize_word(variation):
-                return True
-
-    # DISABLED fuzzy matching between shyam and shyama completely
-    if len(recognized) >= 4 and len(expected) >= 4:
-        # STRICT prevention: Never allow shyam/shyama cross-match
-        if (expected == 'shyam' and 'shyama' in recognized) or \
-           (expected == 'shyama' and 'shyam' in recognized):
-            return False
-        
-        # Additional strict checks for other similar words
-        if (expected == 'radhe' and 'krishna' in recognized) or \
-           (expected == 'krishna' and 'radhe' in recognized):
+    cursor.execute("""
+        SELECT total_rounds, total_words
+        FROM japa_daily_counts
+        WHERE user_id = %s AND japa_date = %s
+    """, (user_token, today))
+    daily = cursor.fetchone()
+    cursor.execute("""
+        SELECT SUM(total_rounds) AS lifetime_rounds,
+               SUM(total_words) AS lifetime_words
+        FROM japa_daily_counts
+        WHERE user_id = %s
+    """, (user_token,))
+    lifetime = cursor.fetchone()
+    return (int(daily['total_rounds']) if daily else 0,
+            int(daily['total_words']) if daily else 0,
+            int(lifetime['lifetime_rounds']) if lifetime and lifetime['lifetime_rounds'] else 0,
+            int(lifetime['lifetime_words']) if lifetime and lifetime['lifetime_words'] else 0)
+
+def write_back_session(conn, user_token, entry):
+    """
+    Write a cached session that is due (caller holds entry.lock); one commit.
+    Returns False when another worker had moved the session on: the copy is
+    dropped and the caller reloads and replays.
+    """
+    cursor = get_cursor(conn)
+    try:
+        if not japa_sessions.write(cursor, entry):
+            conn.rollback()
+            japa_sessions.discard_stale(entry)
             return False
-        
-        # Only very high similarity for non-conflicting words
-        similarity = difflib.SequenceMatcher(None, recognized, expected).ratio()
-        if similarity >= 0.90:  # Very high threshold
-            return True
-
-    return False
+        conn.commit()
+        if japa_sessions.written(entry):
+            etag_cache.invalidate(f"japa_stats:{user_token}")
+    except pymysql.Error as e:
+        conn.rollback()
+        japa_sessions.write_failed(e)
+    finally:
+        cursor.close()
+    return True
 
 # ---------- Routes ----------
 @japa_bp.route('/japa')
@@ -201,12 +155,18 @@ def japa_page():
         cursor = get_cursor(conn)
 
         user_token = get_or_create_user_token()
+        mantra = mantra_patterns.current()
 
         # Use our pattern-based mantra words
-        mantra_words = create_display_mantra()
+        mantra_words = list(mantra.display_words)
 
-        # Current session stats
+        # Current session stats (this worker's in-memory copy is ahead of the row)
         session_row = fetch_active_session(cursor, user_token)
+        cached = japa_sessions.fresh(user_token, session_row)
+        if cached:
+            session_row = dict(session_row, total_count=cached.total_count,
+                               current_pattern_position=cached.pattern_position,
+                               current_repetition_count=cached.repetition_count)
         current_count = int(session_row['total_count']) if session_row else 0
 
         # For display purposes, calculate word index from pattern position and repetition
@@ -214,35 +174,15 @@ def japa_page():
             current_pattern_position = int(session_row['current_pattern_position'])
             current_repetition_count = int(session_row['current_repetition_count'])
 
-            # Calculate display word index (for the visual progress)
-            current_word_index = 0
-            for i in range(current_pattern_position - 1):
-                current_word_index += MANTRA_PATTERN[i]['repetitions']
-            current_word_index += current_repetition_count
+            # Display word index (for the visual progress)
+            current_word_index = mantra.word_index(current_pattern_position, current_repetition_count)
         else:
             current_word_index = 1
 
-        # Daily stats
-        today = date.today()
-        cursor.execute("""
-            SELECT total_rounds, total_words
-            FROM japa_daily_counts
-            WHERE user_id = %s AND japa_date = %s
-        """, (user_token, today))
-        daily = cursor.fetchone()
-        daily_rounds = int(daily['total_rounds']) if daily else 0
-        daily_words = int(daily['total_words']) if daily else 0
-
-        # Lifetime stats
-        cursor.execute("""
-            SELECT SUM(total_rounds) AS lifetime_rounds,
-                   SUM(total_words) AS lifetime_words
-            FROM japa_daily_counts
-            WHERE user_id = %s
-        """, (user_token,))
-        lifetime = cursor.fetchone()
-        lifetime_rounds = int(lifetime['lifetime_rounds']) if lifetime and lifetime['lifetime_rounds'] else 0
-        lifetime_words = int(lifetime['lifetime_words']) if lifetime and lifetime['lifetime_words'] else 0
+        # Daily and lifetime stats
+        daily_rounds, daily_words, lifetime_rounds, lifetime_words = fetch_japa_totals(
+            cursor, user_token, date.today()
+        )
 
         return render_template(
             'japa.html',
@@ -277,19 +217,23 @@ def start_japa_session():
     cursor = None
     try:
         user_token = get_or_create_user_token()
+        japa_janitor.ensure_started()
         conn = get_db_connection()
         cursor = get_cursor(conn)
-
         row = fetch_active_session(cursor, user_token)
+        # This worker's copy is ahead of the row only while the row is still what it last wrote
+        cached = japa_sessions.fresh(user_token, row)
+        if cached:
+            row = dict(row, total_count=cached.total_count,
+                       current_pattern_position=cached.pattern_position,
+                       current_repetition_count=cached.repetition_count)
         if row:
             # Calculate display word index for existing session
             current_pattern_position = int(row['current_pattern_position'])
             current_repetition_count = int(row['current_repetition_count'])
 
-            current_word_index = 0
-            for i in range(current_pattern_position - 1):
-                current_word_index += MANTRA_PATTERN[i]['repetitions']
-            current_word_index += current_repetition_count
+            current_word_index = mantra_patterns.current().word_index(current_pattern_position,
+                                                                      current_repetition_count)
 
             return jsonify({
                 'success': True,
@@ -319,6 +263,8 @@ def start_japa_session():
                 (%s, NOW(), %s, %s, %s, %s, NOW())
         """, (user_token, 0, 1, 1, 1))
         conn.commit()
+        japa_sessions.admit(user_token, {'id': cursor.lastrowid, 'total_count': 0,
+                                         'current_pattern_position': 1, 'current_repetition_count': 1})
         return jsonify({
             'success': True,
             'data': {
@@ -345,89 +291,77 @@ def update_japa_count():
             return jsonify({'success': False, 'error': 'Invalid word'}), 400
 
         user_token = get_or_create_user_token()
-        conn = get_db_connection()
-        cursor = get_cursor(conn)
-
-        current_session = fetch_active_session(cursor, user_token)
-        if not current_session:
-            return jsonify({'success': False, 'error': 'No active session found'}), 409
-
-        session_total_count = int(current_session['total_count'])
-        current_pattern_position = int(current_session['current_pattern_position'])
-        current_repetition_count = int(current_session['current_repetition_count'])
-
-        # Get expected word using our new pattern logic
-        expected_word_data = get_expected_word_from_session(current_pattern_position, current_repetition_count)
-        expected_english = expected_word_data['word_english']
-        expected_devanagari = expected_word_data['word_devanagari']
-
-        # Enhanced matching
-        is_match = is_word_match(recognized_word, expected_english)
-
-        if not is_match:
-            return jsonify({
-                'success': True,
-                'matched': False,
-                'expected_word': {
-                    'word_english': expected_english,
-                    'word_devanagari': expected_devanagari,
-                    'repetition_info': f"{expected_word_data['repetition_number']}/{expected_word_data['total_repetitions']}"
-                },
-                'recognized_word': recognized_word,
-                'similarity_score': difflib.SequenceMatcher(None,
-                    normalize_word(recognized_word),
-                    normalize_word(expected_english)
-                ).ratio()
-            }), 200
-
-        # FIXED: Advance counters using corrected logic
-        new_count = session_total_count + 1
-        new_pattern_position, new_repetition_count, completed_round = advance_position(
-            current_pattern_position, current_repetition_count
-        )
-
-        # If completed full cycle, update daily stats
-        if completed_round:
-            today = date.today()
-            cursor.execute("""
-                INSERT INTO japa_daily_counts (user_id, japa_date, total_rounds, total_words)
-                VALUES (%s, %s, 1, %s)
-                ON DUPLICATE KEY UPDATE
-                    total_rounds = total_rounds + 1,
-                    total_words = total_words + %s
-            """, (user_token, today, TOTAL_UTTERANCES, TOTAL_UTTERANCES))
-
-        # Update session with new position and repetition count
-        cursor.execute("""
-            UPDATE japa_sessions
-            SET total_count = %s, current_word_index = %s, current_repetition_count = %s, last_updated = NOW()
-            WHERE user_id = %s AND session_active = 1
-        """, (new_count, new_pattern_position, new_repetition_count, user_token))
-        conn.commit()
+        mantra = mantra_patterns.current()
+
+        def load_session():
+            nonlocal conn, cursor
+            conn = conn or get_db_connection()
+            cursor = cursor or get_cursor(conn)
+            return fetch_active_session(cursor, user_token)
+
+        # A write that finds the row moved on by another worker drops this
+        # worker's copy; the word is then replayed once on the reloaded row
+        for attempt in range(2):
+            # With JAPA_MAX_UNSAVED_WORDS > 1 (the default) no DB round trip
+            # unless this worker has not seen the session yet or it is due to be written back
+            with japa_sessions.session(user_token, load_session) as current_session:
+                if current_session is None:
+                    return jsonify({'success': False, 'error': 'No active session found'}), 409
+
+                current_pattern_position = current_session.pattern_position
+                current_repetition_count = current_session.repetition_count
+
+                # Get expected word from the compiled pattern
+                expected_word_data = mantra.expected(current_pattern_position, current_repetition_count)
+                expected_english = expected_word_data['word_english']
+                expected_devanagari = expected_word_data['word_devanagari']
+
+                # Enhanced matching (verdict and similarity in one pass)
+                is_match, similarity = mantra.matcher.match(recognized_word, expected_english)
+
+                if not is_match:
+                    return jsonify({
+                        'success': True,
+                        'matched': False,
+                        'expected_word': {
+                            'word_english': expected_english,
+                            'word_devanagari': expected_devanagari,
+                            'repetition_info': f"{expected_word_data['repetition_number']}/{expected_word_data['total_repetitions']}"
+                        },
+                        'recognized_word': recognized_word,
+                        'similarity_score': similarity
+                    }), 200
+
+                # Advance only after ALL repetitions of a word are completed
+                new_pattern_position, new_repetition_count, completed_round = mantra.advance(
+                    current_pattern_position, current_repetition_count
+                )
+                due = japa_sessions.count_word(current_session, new_pattern_position, new_repetition_count,
+                                               completed_round, date.today(), mantra.round_length)
+                new_count = current_session.total_count
+
+                # Completed rounds (daily stats) and every JAPA_MAX_UNSAVED_WORDS words
+                if due:
+                    conn = conn or get_db_connection()
+                    if not write_back_session(conn, user_token, current_session):
+                        continue
+            break
+        else:
+            return jsonify({'success': False, 'error': 'Session changed, please retry'}), 409
 
         # Get next word info
-        next_word_data = get_expected_word_from_session(new_pattern_position, new_repetition_count)
-
-        # Calculate display word index for frontend
-        current_word_index = 0
-        for i in range(new_pattern_position - 1):
-            current_word_index += MANTRA_PATTERN[i]['repetitions']
-        current_word_index += new_repetition_count
+        next_word_data = mantra.expected(new_pattern_position, new_repetition_count)
 
         return jsonify({
             'success': True,
             'matched': True,
             'new_count': new_count,
-            'current_word_index': current_word_index,
-            'next_word': {
-                'word_english': next_word_data['word_english'],
-                'word_devanagari': next_word_data['word_devanagari'],
-                'repetition_info': f"{next_word_data['repetition_number']}/{next_word_data['total_repetitions']}"
-            },
+            'current_word_index': mantra.word_index(new_pattern_position, new_repetition_count),
+            'next_word': word_info(next_word_data),
             'completed_round': completed_round,
             'recognized_word': recognized_word,
             'expected_word': expected_english,
-            'total_words_in_mantra': TOTAL_UTTERANCES
+            'total_words_in_mantra': mantra.round_length
         }), 200
     except Exception as e:
         print("Error updating japa count:", repr(e))
@@ -436,6 +370,96 @@ def update_japa_count():
         if cursor: cursor.close()
         if conn: conn.close()
 
+@japa_bp.route('/api/japa/update_count_batch', methods=['POST'])
+def update_japa_count_batch():
+    """
+    Advance the mantra over every token of a recognized phrase in one call.
+    Tokens that do not match the expected word are skipped; the session is
+    written back at most once per batch.
+    """
+    conn = None
+    cursor = None
+    try:
+        data = request.get_json(silent=True) or {}
+        words = data.get('words')
+        if not isinstance(words, list) or not words or len(words) > JAPA_BATCH_MAX_WORDS:
+            return jsonify({'success': False,
+                            'error': f'words must be a list of 1-{JAPA_BATCH_MAX_WORDS} tokens'}), 400
+        words = [w.strip() if isinstance(w, str) else '' for w in words]
+        if any(not w or len(w) > 100 for w in words):
+            return jsonify({'success': False, 'error': 'Invalid word'}), 400
+
+        user_token = get_or_create_user_token()
+        mantra = mantra_patterns.current()
+
+        def load_session():
+            nonlocal conn, cursor
+            conn = conn or get_db_connection()
+            cursor = cursor or get_cursor(conn)
+            return fetch_active_session(cursor, user_token)
+
+        # Replayed once on the reloaded row if another worker moved the session on
+        for attempt in range(2):
+            with japa_sessions.session(user_token, load_session) as current_session:
+                if current_session is None:
+                    return jsonify({'success': False, 'error': 'No active session found'}), 409
+
+                pattern_position = current_session.pattern_position
+                repetition_count = current_session.repetition_count
+                today = date.today()
+                results = []
+                completed_rounds = 0
+                due = False
+
+                for recognized_word in words:
+                    expected_english = mantra.expected(pattern_position, repetition_count)['word_english']
+                    is_match, similarity = mantra.matcher.match(recognized_word, expected_english)
+                    if not is_match:
+                        results.append({
+                            'word': recognized_word,
+                            'matched': False,
+                            'expected_word': expected_english,
+                            'similarity_score': similarity
+                        })
+                        continue
+
+                    pattern_position, repetition_count, completed_round = mantra.advance(
+                        pattern_position, repetition_count
+                    )
+                    completed_rounds += completed_round
+                    due = japa_sessions.count_word(current_session, pattern_position, repetition_count,
+                                                   completed_round, today, mantra.round_length) or due
+                    results.append({'word': recognized_word, 'matched': True, 'expected_word': expected_english,
+                                    'completed_round': completed_round})
+
+                new_count = current_session.total_count
+                if due:
+                    conn = conn or get_db_connection()
+                    if not write_back_session(conn, user_token, current_session):
+                        continue
+            break
+        else:
+            return jsonify({'success': False, 'error': 'Session changed, please retry'}), 409
+
+        next_word_data = mantra.expected(pattern_position, repetition_count)
+
+        return jsonify({
+            'success': True,
+            'results': results,
+            'matched_count': sum(1 for r in results if r['matched']),
+            'new_count': new_count,
+            'current_word_index': mantra.word_index(pattern_position, repetition_count),
+            'next_word': word_info(next_word_data),
+            'completed_rounds': completed_rounds,
+            'total_words_in_mantra': mantra.round_length
+        }), 200
+    except Exception as e:
+        print("Error updating japa count (batch):", repr(e))
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
 @japa_bp.route('/api/japa/end_session', methods=['POST'])
 def end_japa_session():
     conn = None
@@ -445,12 +469,23 @@ def end_japa_session():
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
-        cursor.execute("""
-            UPDATE japa_sessions
-            SET session_active = 0, session_end = NOW(), last_updated = NOW()
-            WHERE user_id = %s AND session_active = 1
-        """, (user_token,))
-        conn.commit()
+        # Words still held in memory are written in the same transaction
+        # (unless another worker moved the session on meanwhile)
+        with japa_sessions.session(user_token, lambda: fetch_active_session(cursor, user_token)) as cached:
+            dirty = cached is not None and cached.dirty
+            if dirty and not japa_sessions.write(cursor, cached):
+                japa_sessions.discard_stale(cached)
+                cached, dirty = None, False
+            cursor.execute("""
+                UPDATE japa_sessions
+                SET session_active = 0, session_end = NOW(), last_updated = NOW()
+                WHERE user_id = %s AND session_active = 1
+            """, (user_token,))
+            conn.commit()
+            if cached is not None:
+                if dirty and japa_sessions.written(cached):
+                    etag_cache.invalidate(f"japa_stats:{user_token}")
+                japa_sessions.evict(cached)
 
         return jsonify({'success': True}), 200
     except Exception as e:
@@ -462,36 +497,24 @@ def end_japa_session():
 
 @japa_bp.route('/api/japa/get_stats', methods=['GET'])
 def get_japa_stats():
+    user_token = get_or_create_user_token()
+    mantra = mantra_patterns.current()
+    return conditional_json(f"japa_stats:{user_token}", f"{date.today().isoformat()}:{mantra.slug}:{mantra.version}",
+                            lambda: _japa_stats(user_token, mantra))
+
+def _japa_stats(user_token, mantra):
+    """(payload, status) for get_japa_stats; rebuilt only when the ETag cache misses."""
     conn = None
     cursor = None
     try:
-        user_token = get_or_create_user_token()
         conn = get_db_connection()
         cursor = get_cursor(conn)
 
-        today = date.today()
-        cursor.execute("""
-            SELECT total_rounds, total_words
-            FROM japa_daily_counts
-            WHERE user_id = %s AND japa_date = %s
-        """, (user_token, today))
-        daily_stats = cursor.fetchone()
-
-        daily_rounds = int(daily_stats['total_rounds']) if daily_stats else 0
-        daily_words = int(daily_stats['total_words']) if daily_stats else 0
-
-        # Lifetime stats
-        cursor.execute("""
-            SELECT SUM(total_rounds) AS lifetime_rounds,
-                   SUM(total_words) AS lifetime_words
-            FROM japa_daily_counts
-            WHERE user_id = %s
-        """, (user_token,))
-        lifetime = cursor.fetchone()
-        lifetime_rounds = int(lifetime['lifetime_rounds']) if lifetime and lifetime['lifetime_rounds'] else 0
-        lifetime_words = int(lifetime['lifetime_words']) if lifetime and lifetime['lifetime_words'] else 0
+        daily_rounds, daily_words, lifetime_rounds, lifetime_words = fetch_japa_totals(
+            cursor, user_token, date.today()
+        )
 
-        return jsonify({
+        return {
             'success': True,
             'data': {
                 'today': {
@@ -503,14 +526,14 @@ def get_japa_stats():
                     'words': lifetime_words
                 },
                 'pattern_info': {
-                    'total_utterances': TOTAL_UTTERANCES,
-                    'pattern_length': len(MANTRA_PATTERN)
+                    'total_utterances': mantra.round_length,
+                    'pattern_length': len(mantra.groups)
                 }
             }
-        }), 200
+        }, 200
     except Exception as e:
         print("Error getting japa stats:", repr(e))
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return {'success': False, 'error': str(e)}, 500
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
@@ -519,11 +542,13 @@ def get_japa_stats():
 @japa_bp.route('/api/japa/get_pattern', methods=['GET'])
 def get_mantra_pattern():
     """Return the complete mantra pattern with repetition information."""
+    mantra = mantra_patterns.current()
     return jsonify({
         'success': True,
         'data': {
-            'pattern': MANTRA_PATTERN,
-            'total_utterances': TOTAL_UTTERANCES,
-            'display_words': create_display_mantra()
+            'mantra': {'slug': mantra.slug, 'name': mantra.name, 'version': mantra.version},
+            'pattern': list(mantra.pattern),
+            'total_utterances': mantra.round_length,
+            'display_words': list(mantra.display_words)
         }
     }), 200
@@ -4,17 +4,11 @@
 # routes/krishna_lila.py
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-import os
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, session
 from datetime import datetime
-import mysql.connector
-from dotenv import load_dotenv
+import db_config
 import logging
 
-# Load environment variables
-load_dotenv()
-load_dotenv("database.env")
-
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,19 +28,9 @@ krishna_lila_bp = Blueprint(
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 def get_db_connection():
-    """Get MySQL database connection"""
+    """Get a pooled connection from the shared db_config layer (None on failure)"""
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv('MYSQL_HOST', 'metro.proxy.rlwy.net'),
-            port=int(os.getenv('MYSQL_PORT', 52774)),
-            user=os.getenv('MYSQL_USER', 'root'),
-            password=os.getenv('MYSQL_PASSWORD'),
-            database=os.getenv('MYSQL_DB', 'railway'),
-            charset='utf8mb4',
-            collation='utf8mb4_unicode_ci',
-            autocommit=True
-        )
-        return connection
+        return db_config.get_db_connection()
     except Exception as e:
         logger.error(f"Database connection error: {e}")
         return None
@@ -64,7 +48,7 @@ def index():
             flash('Database connection error. Please try again later.', 'error')
             return render_template('error.html'), 500
         
-        cursor = db.cursor(dictionary=True)
+        cursor = db.cursor()
         
         # Get featured lilas
         cursor.execute("""
@@ -117,7 +101,7 @@ def view_lila(lila_id):
             flash('Database connection error. Please try again later.', 'error')
             return render_template('error.html'), 500
         
-        cursor = db.cursor(dictionary=True)
+        cursor = db.cursor()
         
         # Get specific lila
         cursor.execute("""
@@ -128,6 +112,8 @@ def view_lila(lila_id):
         lila = cursor.fetchone()
         
         if not lila:
+            cursor.close()
+            db.close()
             flash('Krishna Lila not found.', 'error')
             return redirect(url_for('krishna_lila.index'))
         
@@ -164,7 +150,7 @@ def view_category(category):
             flash('Database connection error. Please try again later.', 'error')
             return render_template('error.html'), 500
         
-        cursor = db.cursor(dictionary=True)
+        cursor = db.cursor()
         
         # Get lilas from specific category
         cursor.execute("""
@@ -176,6 +162,8 @@ def view_category(category):
         category_lilas = cursor.fetchall()
         
         if not category_lilas:
+            cursor.close()
+            db.close()
             flash(f'No Krishna Lilas found in category: {category}', 'info')
             return redirect(url_for('krishna_lila.index'))
         
@@ -221,7 +209,7 @@ def search():
             flash('Database connection error. Please try again later.', 'error')
             return render_template('error.html'), 500
         
-        cursor = db.cursor(dictionary=True)
+        cursor = db.cursor()
         
         # Search in titles, descriptions, and tags
         search_query = f"%{query}%"
@@ -271,7 +259,7 @@ def api_get_lilas():
         if not db:
             return jsonify({'error': 'Database connection failed'}), 500
         
-        cursor = db.cursor(dictionary=True)
+        cursor = db.cursor()
         
         # Get query parameters
         category = request.args.get('category')
@@ -320,7 +308,7 @@ def api_get_lila(lila_id):
         if not db:
             return jsonify({'error': 'Database connection failed'}), 500
         
-        cursor = db.cursor(dictionary=True)
+        cursor = db.cursor()
         cursor.execute("""
             SELECT * FROM krishna_lila 
             WHERE id = %s AND is_active = TRUE
@@ -329,6 +317,8 @@ def api_get_lila(lila_id):
         lila = cursor.fetchone()
         
         if not lila:
+            cursor.close()
+            db.close()
             return jsonify({'error': 'Lila not found'}), 404
         
         # Convert datetime objects to strings
@@ -360,7 +350,7 @@ def get_category_stats():
         if not db:
             return {}
         
-        cursor = db.cursor(dictionary=True)
+        cursor = db.cursor()
         cursor.execute("""
             SELECT category, COUNT(*) as count 
             FROM krishna_lila 
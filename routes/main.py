@@ -3,7 +3,7 @@
 import pymysql
 from flask import Blueprint, render_template, request, current_app
 from db_config import get_db_connection
-from routes.utils import send_email
+from routes.utils import send_email, insert_bhakt
 from routes.storage import save_bhakt_to_csv  # CSV saver
 
 
@@ -59,13 +59,7 @@ def bhaktgan():
         else:
             try:
                 # 🔍 Insert new bhakt with timestamp
-                cursor.execute(
-                    """
-                    INSERT INTO bhaktgan (name, email, phone, seva_interest, city, submitted_at)
-                    VALUES (%s, %s, %s, %s, %s, NOW())
-                    """,
-                    (name, email, phone, seva_interest, city)
-                )
+                insert_bhakt(cursor, name, email, phone, seva_interest, city)
                 conn.commit()
                 print("✅ New bhakt registered.")
 
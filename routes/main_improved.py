@@ -7,7 +7,7 @@
 import pymysql
 from flask import Blueprint, render_template, request, current_app, jsonify, session
 from db_config import get_db_cursor
-from routes.utils import send_email
+from routes.utils import send_email, insert_bhakt
 from routes.storage import save_bhakt_to_csv
 from utils.validators import FormValidator, ValidationError
 from utils.logger import logger, log_function_call
@@ -82,16 +82,14 @@ def bhaktgan():
                                          bhaktgan=[])
                 
                 # Insert new bhakt
-                cursor.execute("""
-                    INSERT INTO bhaktgan (name, email, phone, seva_interest, city, submitted_at)
-                    VALUES (%s, %s, %s, %s, %s, NOW())
-                """, (
+                insert_bhakt(
+                    cursor,
                     validated_data['name'],
-                    validated_data['email'], 
+                    validated_data['email'],
                     validated_data['phone'],
                     validated_data['seva_interest'],
                     validated_data['city']
-                ))
+                )
                 cursor.connection.commit()
                 
                 bhakt_id = cursor.lastrowid
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import random
+import pymysql
 import requests
 from flask import current_app
 from flask_mail import Message
@@ -12,6 +13,61 @@ def normalize(phone):
     """Normalize phone number by removing +91 prefix and leading zeros"""
     return phone.strip().replace('+91', '').lstrip('0')
 
+# 🔑 Lookup keys stored on bhaktgan (normalized_phone, name_key)
+def phone_key(phone):
+    """Last 10 digits of a phone number, matching bhaktgan.normalized_phone"""
+    digits = ''.join(ch for ch in str(phone or '') if ch.isdigit())
+    return digits[-10:] if digits else None
+
+def name_key(name):
+    """Trimmed lowercase name, matching bhaktgan.name_key"""
+    name = (name or '').strip().lower()
+    return name or None
+
+# 🔍 Find a registered bhakt for OTP login
+def find_bhakt_by_phone_and_name(cursor, mobile, name):
+    """Index seek on (normalized_phone, name_key); falls back to the old
+    per-row normalization scan until the migration has been applied."""
+    try:
+        cursor.execute("""
+            SELECT id, name, phone
+            FROM bhaktgan
+            WHERE normalized_phone = %s AND name_key = %s
+            LIMIT 1
+        """, (phone_key(mobile), name_key(name)))
+    except pymysql.err.OperationalError as e:
+        if e.args[0] != 1054:  # Unknown column: migration not run yet
+            raise
+        cursor.execute("""
+            SELECT id, name, phone
+            FROM bhaktgan
+            WHERE RIGHT(REGEXP_REPLACE(
+                REPLACE(REPLACE(REPLACE(IFNULL(phone,''), ' ', ''), '-', ''), '+91', ''),
+                '^0+', ''
+            ), 10) = %s
+            AND LOWER(TRIM(name)) = LOWER(TRIM(%s))
+            LIMIT 1
+        """, (mobile, name))
+    return cursor.fetchone()
+
+# 📝 Register a bhakt
+def insert_bhakt(cursor, name, email, phone, seva_interest, city):
+    """Insert a bhaktgan row with its lookup keys; without them until the
+    normalized_phone migration has been applied."""
+    try:
+        cursor.execute("""
+            INSERT INTO bhaktgan (name, email, phone, seva_interest, city, submitted_at,
+                                  normalized_phone, name_key)
+            VALUES (%s, %s, %s, %s, %s, NOW(), %s, %s)
+        """, (name, email, phone, seva_interest, city, phone_key(phone), name_key(name)))
+    except pymysql.err.OperationalError as e:
+        if e.args[0] != 1054:  # Unknown column: migration not run yet
+            raise
+        cursor.execute("""
+            INSERT INTO bhaktgan (name, email, phone, seva_interest, city, submitted_at)
+            VALUES (%s, %s, %s, %s, %s, NOW())
+        """, (name, email, phone, seva_interest, city))
+
 # 🔢 OTP Generator
 def generate_otp(length=6):
     """Generate random OTP of specified length"""
@@ -5,8 +5,6 @@ from datetime import date, datetime, timedelta
 from flask import Blueprint, render_template, request, jsonify
 from db_config import get_db_connection
 from pymysql.cursors import DictCursor
-import mysql.connector
-from mysql.connector import Error
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
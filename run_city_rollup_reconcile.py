@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Recompute the city rollups (harijap_city_rollup, guru_mantra_city_rollup)
+from their progress tables and report drift.
+
+    python run_city_rollup_reconcile.py            # report and correct
+    python run_city_rollup_reconcile.py --dry-run  # report only
+
+Creates the rollup table when missing (first run fills it). Saves wait on
+the progress rows' share lock while a correcting run recomputes, so run it
+outside peak japa hours on large tables.
+"""
+
+import sys
+import argparse
+
+from db_config import get_db_connection
+from routes.harijap_auth import city_rollup as harijap_city_rollup
+from routes.guru_mantra_auth import city_rollup as guru_mantra_city_rollup
+
+ROLLUP_DDL = """
+    CREATE TABLE IF NOT EXISTS `{table}` (
+      `city` varchar(255) COLLATE utf8mb4_unicode_ci NOT NULL,
+      `user_count` int(11) NOT NULL DEFAULT 0,
+      `total_count` bigint(20) NOT NULL DEFAULT 0,
+      `total_malas` bigint(20) NOT NULL DEFAULT 0,
+      `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+      PRIMARY KEY (`city`),
+      KEY `idx_city_rollup_total` (`total_count`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+
+def reconcile(rollup, dry_run=False):
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(ROLLUP_DDL.format(table=rollup.rollup_table))
+        conn.commit()
+
+        drift = rollup.reconcile(cursor, apply=not dry_run)
+        conn.commit()
+
+        if not drift:
+            print(f"✅ {rollup.rollup_table}: no drift.")
+        for d in drift:
+            e, a = d['expected'], d['actual']
+            print(f"⚠️  {d['city']}: users {a['user_count']} → {e['user_count']}, "
+                  f"count {a['total_count']} → {e['total_count']}, "
+                  f"malas {a['total_malas']} → {e['total_malas']}")
+        if drift:
+            action = "reported (dry run)" if dry_run else "corrected"
+            print(f"{'🔎' if dry_run else '✅'} {len(drift)} cities {action} in {rollup.rollup_table}.")
+        return drift
+
+    except Exception as e:
+        print(f"❌ Error reconciling {rollup.rollup_table}: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='report drift without correcting it')
+    args = parser.parse_args()
+    drift = []
+    for rollup in (harijap_city_rollup, guru_mantra_city_rollup):
+        drift += reconcile(rollup, dry_run=args.dry_run)
+    sys.exit(1 if drift and args.dry_run else 0)
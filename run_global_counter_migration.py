@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Run database migration to create the sharded per-day counter tables (harijap_global_daily, guru_mantra_global_daily)."""
+
+from datetime import datetime, timedelta, timezone
+
+from db_config import get_db_connection
+
+# (counter table, migration file, progress table, today's words in a progress row)
+COUNTERS = [
+    ('harijap_global_daily', 'migrations/create_harijap_global_daily.sql',
+     'harijap_progress', 'GREATEST(today_words, todays_count)'),
+    ('guru_mantra_global_daily', 'migrations/create_guru_mantra_global_daily.sql',
+     'guru_mantra_progress', 'todays_count'),
+]
+
+
+def run_migration(table, sql_file, progress_table, today_words):
+    """Create a counter table if it doesn't exist and seed today's total."""
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT COUNT(*) as table_count
+            FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = %s
+        """, (table,))
+        if cursor.fetchone()['table_count'] > 0:
+            print(f"✅ Table '{table}' already exists.")
+            return
+
+        with open(sql_file) as f:
+            ddl = f.read()
+        statement = ddl[ddl.index('CREATE TABLE'):].rstrip().rstrip(';')
+        cursor.execute(statement)
+
+        # Seed today's total so the counter does not start from zero mid-day
+        ist = timezone(timedelta(hours=5, minutes=30))
+        today = datetime.now(ist).strftime('%Y-%m-%d')
+        cursor.execute(f"""
+            INSERT INTO {table} (day, shard, words)
+            SELECT %s, 0, COALESCE(SUM({today_words}), 0)
+            FROM {progress_table}
+            WHERE today_date = %s
+        """, (today, today))
+        conn.commit()
+        print(f"✅ Successfully created '{table}' table (seeded {today}).")
+
+    except Exception as e:
+        print(f"❌ Error running migration for {table}: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    for counter in COUNTERS:
+        run_migration(*counter)
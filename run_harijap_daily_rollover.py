@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Archive every harijap_progress day older than today (IST) into harijap_daily
+and the activity bitmap.
+
+    python run_harijap_daily_rollover.py
+
+Saves archive a user's previous day themselves when they roll over; this
+job covers users who have not saved since. Run it shortly after IST
+midnight (cron). Re-running is harmless. Creates the tables when missing.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from db_config import get_db_connection
+from routes.harijap_auth import daily_history
+
+DAILY_DDL = """
+    CREATE TABLE IF NOT EXISTS `{table}` (
+      `bhaktgan_id` int(11) NOT NULL,
+      `day` date NOT NULL COMMENT 'IST date',
+      `words` int(11) NOT NULL DEFAULT 0,
+      `pronunciations` int(11) NOT NULL DEFAULT 0,
+      `malas` int(11) NOT NULL DEFAULT 0,
+      `todays_count` int(11) NOT NULL DEFAULT 0,
+      PRIMARY KEY (`bhaktgan_id`, `day`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+ACTIVITY_DDL = """
+    CREATE TABLE IF NOT EXISTS `{table}` (
+      `bhaktgan_id` int(11) NOT NULL,
+      `word_idx` int(11) NOT NULL COMMENT 'days since 2020-01-01 DIV 64',
+      `bits` bigint(20) unsigned NOT NULL DEFAULT 0,
+      PRIMARY KEY (`bhaktgan_id`, `word_idx`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+
+def rollover(history):
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(DAILY_DDL.format(table=history.daily_table))
+        cursor.execute(ACTIVITY_DDL.format(table=history.activity_table))
+        conn.commit()
+
+        ist = timezone(timedelta(hours=5, minutes=30))
+        today = datetime.now(ist).strftime('%Y-%m-%d')
+        archived = history.archive(cursor, today)
+        conn.commit()
+        print(f"✅ Archived days before {today} into {history.daily_table} ({archived} rows affected).")
+        return archived
+
+    except Exception as e:
+        print(f"❌ Error archiving into {history.daily_table}: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    rollover(daily_history)
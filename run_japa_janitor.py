@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Close idle japa sessions, archive / purge closed ones and maintain the
+monthly partitions (one janitor pass, see utils/japa_janitor.py).
+
+    python run_japa_janitor.py               # one pass (cron), creates japa_sessions_history
+    python run_japa_janitor.py --partition   # first: partition japa_sessions / japa_daily_counts
+
+The app's workers run the same pass every JAPA_JANITOR_INTERVAL_SECONDS;
+a MySQL lock keeps concurrent passes from overlapping. Re-running is
+harmless.
+"""
+
+import sys
+from datetime import date
+
+from db_config import get_db_connection
+from routes.japa import japa_janitor
+from utils.japa_janitor import partition_ddl
+
+HISTORY_SQL = 'migrations/create_japa_sessions_history.sql'
+
+# (table, statements that make the partition column part of every unique key)
+PARTITION_PREP = [
+    ('japa_sessions', [
+        "UPDATE japa_sessions SET session_start = COALESCE(last_updated, NOW()) WHERE session_start IS NULL",
+        """ALTER TABLE japa_sessions
+             MODIFY `session_start` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+             DROP PRIMARY KEY,
+             ADD PRIMARY KEY (`id`, `session_start`),
+             ADD KEY `idx_user_active_start` (`user_id`, `session_active`, `session_start`)""",
+    ]),
+    ('japa_daily_counts', [
+        "ALTER TABLE japa_daily_counts DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `japa_date`)",
+    ]),
+]
+
+
+def partition_tables(cursor):
+    for table, prep in PARTITION_PREP:
+        cursor.execute("""
+            SELECT COUNT(*) AS partitions FROM INFORMATION_SCHEMA.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        """, (table,))
+        if cursor.fetchone()['partitions'] > 0:
+            print(f"✅ Table '{table}' is already partitioned.")
+            continue
+        for statement in prep:
+            cursor.execute(statement)
+        cursor.execute(f"ALTER TABLE {table} {partition_ddl(table, date.today())}")
+        print(f"✅ Partitioned '{table}' by month.")
+
+
+def run_janitor(partition=False):
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        with open(HISTORY_SQL) as f:
+            ddl = f.read()
+        cursor.execute(ddl[ddl.index('CREATE TABLE'):].rstrip().rstrip(';'))
+        if partition:
+            partition_tables(cursor)
+        conn.commit()
+
+        done = japa_janitor.run_once(conn)
+        if done is None:
+            print("✅ Another janitor pass is running - nothing to do.")
+        else:
+            print("✅ Janitor pass: " + ", ".join(f"{k}={v}" for k, v in done.items()))
+        return done
+
+    except Exception as e:
+        print(f"❌ Error running japa janitor: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    run_janitor(partition='--partition' in sys.argv[1:])
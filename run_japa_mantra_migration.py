@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Run database migration to create japa_mantras / japa_mantra_words and seed the built-in pattern."""
+
+from db_config import get_db_connection
+from routes.japa import MANTRA_PATTERN
+
+SQL_FILE = 'migrations/create_japa_mantras.sql'
+SEED_SLUG = 'radhe-krishna'
+SEED_NAME = 'Radhe Krishna'
+
+
+def run_migration():
+    """Create the mantra tables if they don't exist and seed the default mantra."""
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        with open(SQL_FILE) as f:
+            ddl = f.read()
+        for statement in ddl.split(';'):
+            statement = statement[statement.find('CREATE TABLE'):].strip() if 'CREATE TABLE' in statement else ''
+            if statement:
+                cursor.execute(statement)
+
+        cursor.execute("SELECT id FROM japa_mantras WHERE slug = %s", (SEED_SLUG,))
+        if cursor.fetchone():
+            conn.commit()
+            print(f"✅ Mantra '{SEED_SLUG}' already exists.")
+            return
+
+        cursor.execute("""
+            INSERT INTO japa_mantras (slug, name, version, is_default, active)
+            VALUES (%s, %s, 1, 1, 1)
+        """, (SEED_SLUG, SEED_NAME))
+        mantra_id = cursor.lastrowid
+        cursor.executemany("""
+            INSERT INTO japa_mantra_words (mantra_id, position, word_english, word_devanagari, repetitions)
+            VALUES (%s, %s, %s, %s, %s)
+        """, [(mantra_id, position, item['word'], item['devanagari'], item['repetitions'])
+              for position, item in enumerate(MANTRA_PATTERN, 1)])
+        conn.commit()
+        print(f"✅ Successfully created mantra tables and seeded '{SEED_SLUG}' "
+              f"({len(MANTRA_PATTERN)} word groups).")
+
+    except Exception as e:
+        print(f"❌ Error running migration: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Create japa_user_totals and (re)compute it from japa_daily_counts."""
+
+from db_config import get_db_connection
+
+SQL_FILE = 'migrations/create_japa_user_totals.sql'
+WIDEN_SQL_FILE = 'migrations/widen_japa_user_totals_user_id.sql'
+
+
+def run_backfill():
+    """
+    Overwrite every user's running totals with the sums of their daily rows.
+    INSERT ... SELECT locks the daily rows it reads, so a concurrent round
+    either lands in the sums or adds to the backfilled row after it - safe
+    to run (and re-run) while the app is live.
+    """
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        with open(SQL_FILE) as f:
+            ddl = f.read()
+        cursor.execute(ddl[ddl.index('CREATE TABLE'):].rstrip().rstrip(';'))
+        # Tables created before user_id matched japa_daily_counts (varchar(200))
+        with open(WIDEN_SQL_FILE) as f:
+            ddl = f.read()
+        cursor.execute(ddl[ddl.index('ALTER TABLE'):].rstrip().rstrip(';'))
+
+        cursor.execute("""
+            INSERT INTO japa_user_totals
+                (user_id, lifetime_rounds, lifetime_words, today_date, today_rounds, today_words)
+            SELECT d.user_id,
+                   SUM(d.total_rounds),
+                   SUM(d.total_words),
+                   MAX(d.japa_date),
+                   SUM(CASE WHEN d.japa_date = latest.japa_date THEN d.total_rounds ELSE 0 END),
+                   SUM(CASE WHEN d.japa_date = latest.japa_date THEN d.total_words ELSE 0 END)
+            FROM japa_daily_counts d
+            JOIN (
+                SELECT user_id, MAX(japa_date) AS japa_date
+                FROM japa_daily_counts
+                GROUP BY user_id
+            ) latest ON latest.user_id = d.user_id
+            GROUP BY d.user_id
+            ON DUPLICATE KEY UPDATE
+                lifetime_rounds = VALUES(lifetime_rounds),
+                lifetime_words = VALUES(lifetime_words),
+                today_date = VALUES(today_date),
+                today_rounds = VALUES(today_rounds),
+                today_words = VALUES(today_words)
+        """)
+        users = cursor.rowcount
+        conn.commit()
+        print(f"✅ Backfilled japa_user_totals ({users} rows affected).")
+
+    except Exception as e:
+        print(f"❌ Error backfilling japa_user_totals: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    run_backfill()
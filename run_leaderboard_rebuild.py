@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Create the leaderboard table (and its progress index) if missing, then
+rebuild it from scratch. Use on cold start or after bulk data changes;
+afterwards each worker's refresh timer keeps it fresh after saves.
+
+Safe to re-run.
+"""
+
+from db_config import get_db_connection
+from routes.harijap_auth import leaderboard_cache as harijap_leaderboard
+from routes.guru_mantra_auth import leaderboard_cache as guru_mantra_leaderboard
+
+LEADERBOARD_DDL = """
+    CREATE TABLE IF NOT EXISTS `{table}` (
+      `rank_pos` int(11) NOT NULL,
+      `bhaktgan_id` int(11) NOT NULL,
+      `name` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+      `city` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+      `count` int(11) NOT NULL DEFAULT 0,
+      `total_malas` int(11) NOT NULL DEFAULT 0,
+      `last_spoken_at` datetime DEFAULT NULL,
+      `refreshed_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      PRIMARY KEY (`rank_pos`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+
+def index_exists(cursor, table, index_name):
+    cursor.execute("""
+        SELECT COUNT(*) as idx_count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = %s
+        AND INDEX_NAME = %s
+    """, (table, index_name))
+    return cursor.fetchone()['idx_count'] > 0
+
+
+def rebuild(cache, index_name):
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(LEADERBOARD_DDL.format(table=cache.leaderboard_table))
+        if not index_exists(cursor, cache.progress_table, index_name):
+            cursor.execute(f"CREATE INDEX {index_name} ON {cache.progress_table}(count, bhaktgan_id)")
+            print(f"✅ Added index '{index_name}'.")
+        conn.commit()
+
+        rows = cache.rebuild(cursor)
+        conn.commit()
+        print(f"✅ Rebuilt '{cache.leaderboard_table}' with {rows} rows.")
+
+    except Exception as e:
+        print(f"❌ Error rebuilding {cache.leaderboard_table}: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    rebuild(harijap_leaderboard, 'idx_harijap_count_id')
+    rebuild(guru_mantra_leaderboard, 'idx_guru_mantra_count_id')
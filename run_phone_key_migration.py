@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Add bhaktgan.normalized_phone / bhaktgan.name_key (indexed) and backfill
+them in batches, so OTP login is an index seek instead of a regex scan.
+
+Safe to re-run: columns and index are only added when missing, and the
+backfill only touches rows whose keys are NULL or out of date.
+"""
+
+from db_config import get_db_connection
+from routes.utils import phone_key, name_key
+
+BATCH_SIZE = 500
+
+
+def column_exists(cursor, column):
+    cursor.execute("""
+        SELECT COUNT(*) as col_count
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'bhaktgan'
+        AND COLUMN_NAME = %s
+    """, (column,))
+    return cursor.fetchone()['col_count'] > 0
+
+
+def index_exists(cursor, index_name):
+    cursor.execute("""
+        SELECT COUNT(*) as idx_count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'bhaktgan'
+        AND INDEX_NAME = %s
+    """, (index_name,))
+    return cursor.fetchone()['idx_count'] > 0
+
+
+def add_columns(cursor):
+    if not column_exists(cursor, 'normalized_phone'):
+        cursor.execute("""
+            ALTER TABLE bhaktgan
+            ADD COLUMN normalized_phone CHAR(10) NULL DEFAULT NULL AFTER phone
+        """)
+        print("✅ Added column 'normalized_phone'.")
+    if not column_exists(cursor, 'name_key'):
+        cursor.execute("""
+            ALTER TABLE bhaktgan
+            ADD COLUMN name_key VARCHAR(100) COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL AFTER name
+        """)
+        print("✅ Added column 'name_key'.")
+    if not index_exists(cursor, 'idx_bhaktgan_phone_name_key'):
+        cursor.execute("CREATE INDEX idx_bhaktgan_phone_name_key ON bhaktgan(normalized_phone, name_key)")
+        print("✅ Added index 'idx_bhaktgan_phone_name_key'.")
+
+
+def backfill(conn, cursor, batch_size=BATCH_SIZE):
+    """Walk bhaktgan by primary key, one committed batch at a time."""
+    last_id = 0
+    updated = 0
+    while True:
+        cursor.execute("""
+            SELECT id, name, phone, normalized_phone, name_key
+            FROM bhaktgan
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+
+        changes = []
+        for row in rows:
+            keys = (phone_key(row['phone']), name_key(row['name']))
+            if keys != (row['normalized_phone'], row['name_key']):
+                changes.append(keys + (row['id'],))
+        if changes:
+            cursor.executemany("""
+                UPDATE bhaktgan SET normalized_phone = %s, name_key = %s WHERE id = %s
+            """, changes)
+            conn.commit()
+            updated += len(changes)
+        print(f"  … scanned up to id {last_id}, {updated} rows updated")
+    return updated
+
+
+def run_migration():
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        add_columns(cursor)
+        conn.commit()
+        updated = backfill(conn, cursor)
+        print(f"✅ Backfill complete: {updated} rows updated.")
+
+    except Exception as e:
+        print(f"❌ Error running migration: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    run_migration()
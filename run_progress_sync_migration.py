@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Run database migration to create the progress_sync_devices table (v2 save protocol)."""
+
+from db_config import get_db_connection
+
+
+def run_migration():
+    """Create progress_sync_devices table if it doesn't exist."""
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT COUNT(*) as table_count
+            FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'progress_sync_devices'
+        """)
+        if cursor.fetchone()['table_count'] > 0:
+            print("✅ Table 'progress_sync_devices' already exists.")
+            return
+
+        with open('migrations/create_progress_sync_devices.sql') as f:
+            ddl = f.read()
+        statement = ddl[ddl.index('CREATE TABLE'):].rstrip().rstrip(';')
+        cursor.execute(statement)
+        conn.commit()
+        print("✅ Successfully created 'progress_sync_devices' table.")
+
+    except Exception as e:
+        print(f"❌ Error running migration: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    run_migration()
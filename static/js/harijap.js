@@ -66,6 +66,8 @@ class HariJapCounter {
             countedUpToTokenIndex: 0, // Word-stream: tokens already matched in current utterance
             lastSeenTokens: [],       // FIX #5: last tokenized transcript, used to detect revisions
             saveDebounceTimer: null,
+            offlineQueue: [],         // saves that failed to reach the server, sent together by flushOfflineQueue()
+            isFlushingQueue: false,   // a flushOfflineQueue() request is in flight
 
             // Mantra word tracking
             mantraWords: ['जय', 'जय', 'राम', 'कृष्णा', 'हारी']
@@ -94,6 +96,7 @@ class HariJapCounter {
 
             // Auto-save settings
             autoSaveInterval: 10000,
+            offlineQueueMax: 500,     // matches the server's per-request event limit
             syncInterval: 30000,
 
             // SIMPLIFIED target phrases - prioritize most common variations
@@ -263,7 +266,8 @@ class HariJapCounter {
             'countDisplay', 'malaStatus', 'totalMalas', 'startBtn', 'stopBtn',
             'manualBtn', 'resetBtn', 'listeningStatus', 'recognitionText',
             'progressFill', 'remainingCount', 'celebration', 'userName',
-            'logoutBtn', 'sessionTime', 'todayCount', 'accuracy', 'datetimeDisplay'
+            'logoutBtn', 'sessionTime', 'todayCount', 'accuracy', 'datetimeDisplay',
+            'globalTodayCount'
         ];
 
         elementIds.forEach(id => {
@@ -476,6 +480,11 @@ class HariJapCounter {
             this.saveToServer(true);
         });
 
+        // Reconnected: send everything queued while offline as one request
+        window.addEventListener('online', () => {
+            this.flushOfflineQueue();
+        });
+
         console.log('✅ Event listeners attached');
     }
 
@@ -564,12 +573,9 @@ class HariJapCounter {
             }
         }, this.config.autoSaveInterval);
 
-        // Server time sync and date check (every 5 minutes) - CRITICAL for IST midnight reset
-        setInterval(async () => {
-            await this.getServerTime();
-            this.checkForDateChange();
-            this.updateDateTimeDisplay();
-        }, 5 * 60 * 1000);
+        // Server time, global count and state pushed by the server (replaces
+        // the 5-minute /harijap/api/server_time poll) - CRITICAL for IST midnight reset
+        this.startLiveUpdates();
 
         // Check for date change (every minute) - CRITICAL for IST midnight reset
         setInterval(() => {
@@ -1445,138 +1451,142 @@ class HariJapCounter {
             const data = await response.json();
 
             if (data.success) {
-                // CRITICAL FIX: Only update from server if loading from initial state
-                // or if the server values are higher (preserve data integrity)
-                const serverCount = data.count || 0;
-                const serverTotalMalas = data.total_malas || 0;
-                const serverTotalPronunciations = data.total_pronunciations || 0;
-                
-                // Use the greater value to prevent data loss
-                this.state.totalWords = Math.max(this.state.totalWords, serverCount);
-                this.state.totalMalas = Math.max(this.state.totalMalas, serverTotalMalas);
-                this.state.totalPronunciations = Math.max(this.state.totalPronunciations, serverTotalPronunciations);
-                
-                // Load session-specific data (can be different from client)
-                this.state.currentMalaPronunciations = data.current_mala_pronunciations || 0;
-                
-                // CRITICAL FIX: Load today's data and check if date matches
-                // Use server date from response, and compare with serverDate (IST) from getServerTime
-                const serverTodayDate = data.today_date || this.serverDate || this.getTodayDateString();
-                const currentServerDate = this.serverDate || this.getTodayDateString();
+                this.applyServerState(data);
+            }
+        } catch (error) {
+            console.error('❌ Error loading from server:', error);
+            this.showNotification('डेटा लोड करता आला नाही', 'error');
+        }
+    }
+
+    applyServerState(data) {
+        // CRITICAL FIX: Only update from server if loading from initial state
+        // or if the server values are higher (preserve data integrity)
+        const serverCount = data.count || 0;
+        const serverTotalMalas = data.total_malas || 0;
+        const serverTotalPronunciations = data.total_pronunciations || 0;
+        
+        // Use the greater value to prevent data loss
+        this.state.totalWords = Math.max(this.state.totalWords, serverCount);
+        this.state.totalMalas = Math.max(this.state.totalMalas, serverTotalMalas);
+        this.state.totalPronunciations = Math.max(this.state.totalPronunciations, serverTotalPronunciations);
+        
+        // Load session-specific data (can be different from client)
+        this.state.currentMalaPronunciations = data.current_mala_pronunciations || 0;
+        
+        // CRITICAL FIX: Load today's data and check if date matches
+        // Use server date from response, and compare with serverDate (IST) from getServerTime
+        const serverTodayDate = data.today_date || this.serverDate || this.getTodayDateString();
+        const currentServerDate = this.serverDate || this.getTodayDateString();
+        
+        console.log('📅 Date comparison - Server stored date:', serverTodayDate, 'Current server date:', currentServerDate, 'isFirstLoad:', this.state.isFirstLoad);
+        console.log('📅 Full server response:', {
+            today_date: data.today_date,
+            today_words: data.today_words,
+            todays_count: data.todays_count,
+            today_malas: data.today_malas
+        });
+        
+        // CRITICAL FIX: Always load today's data from server if server date matches current server date
+        // This ensures today's count persists after logout/login
+        // Only skip loading if the date has actually changed (IST midnight passed)
+        // Also handle case where serverDate might not be loaded yet - use server's today_date as fallback
+        const datesMatch = serverTodayDate === currentServerDate || 
+                          (!this.serverDate && serverTodayDate); // If serverDate not loaded, trust server's today_date
+        
+        if (datesMatch) {
+            // Server date matches current date - load today's data from server
+            // CRITICAL: Use todays_count if available, otherwise use today_words
+            const serverTodaysCount = data.todays_count !== undefined ? data.todays_count : (data.today_words || 0);
+            
+            const serverTodayWords = data.today_words || 0;
+            const serverTodayPronunciations = data.today_pronunciations || 0;
+            const serverTodayMalas = data.today_malas || 0;
+            
+            // CRITICAL FIX: On first load, directly assign server values
+            // On subsequent syncs, use Math.max to prevent overwriting local increments
+            if (this.state.isFirstLoad) {
+                // First load - directly assign from server
+                // This is critical for preserving count after logout/login
+                this.state.todayWords = serverTodayWords;
+                this.state.todayPronunciations = serverTodayPronunciations;
+                this.state.todayMalas = serverTodayMalas;
+                this.state.todaysCount = serverTodaysCount;
+                this.state.todayDate = serverTodayDate;
+                this.state.isFirstLoad = false;  // Mark that first load is complete
                 
-                console.log('📅 Date comparison - Server stored date:', serverTodayDate, 'Current server date:', currentServerDate, 'isFirstLoad:', this.state.isFirstLoad);
-                console.log('📅 Full server response:', {
-                    today_date: data.today_date,
-                    today_words: data.today_words,
-                    todays_count: data.todays_count,
-                    today_malas: data.today_malas
+                console.log('✅ FIRST LOAD - directly loaded today\'s data from server:', {
+                    todayWords: this.state.todayWords,
+                    todaysCount: this.state.todaysCount,
+                    todayDate: this.state.todayDate,
+                    serverTodayDate: serverTodayDate,
+                    currentServerDate: currentServerDate,
+                    serverTodayWords: serverTodayWords,
+                    serverTodaysCount: serverTodaysCount
                 });
                 
-                // CRITICAL FIX: Always load today's data from server if server date matches current server date
-                // This ensures today's count persists after logout/login
-                // Only skip loading if the date has actually changed (IST midnight passed)
-                // Also handle case where serverDate might not be loaded yet - use server's today_date as fallback
-                const datesMatch = serverTodayDate === currentServerDate || 
-                                  (!this.serverDate && serverTodayDate); // If serverDate not loaded, trust server's today_date
+                // CRITICAL: Update UI immediately after first load
+                this.updateUI();
+            } else {
+                // Subsequent sync - use Math.max to prevent overwriting local increments
+                this.state.todayWords = Math.max(this.state.todayWords, serverTodayWords);
+                this.state.todayPronunciations = Math.max(this.state.todayPronunciations, serverTodayPronunciations);
+                this.state.todayMalas = Math.max(this.state.todayMalas, serverTodayMalas);
+                this.state.todaysCount = Math.max(this.state.todaysCount, serverTodaysCount);
+                this.state.todayDate = serverTodayDate;
                 
-                if (datesMatch) {
-                    // Server date matches current date - load today's data from server
-                    // CRITICAL: Use todays_count if available, otherwise use today_words
-                    const serverTodaysCount = data.todays_count !== undefined ? data.todays_count : (data.today_words || 0);
-                    
-                    const serverTodayWords = data.today_words || 0;
-                    const serverTodayPronunciations = data.today_pronunciations || 0;
-                    const serverTodayMalas = data.today_malas || 0;
-                    
-                    // CRITICAL FIX: On first load, directly assign server values
-                    // On subsequent syncs, use Math.max to prevent overwriting local increments
-                    if (this.state.isFirstLoad) {
-                        // First load - directly assign from server
-                        // This is critical for preserving count after logout/login
-                        this.state.todayWords = serverTodayWords;
-                        this.state.todayPronunciations = serverTodayPronunciations;
-                        this.state.todayMalas = serverTodayMalas;
-                        this.state.todaysCount = serverTodaysCount;
-                        this.state.todayDate = serverTodayDate;
-                        this.state.isFirstLoad = false;  // Mark that first load is complete
-                        
-                        console.log('✅ FIRST LOAD - directly loaded today\'s data from server:', {
-                            todayWords: this.state.todayWords,
-                            todaysCount: this.state.todaysCount,
-                            todayDate: this.state.todayDate,
-                            serverTodayDate: serverTodayDate,
-                            currentServerDate: currentServerDate,
-                            serverTodayWords: serverTodayWords,
-                            serverTodaysCount: serverTodaysCount
-                        });
-                        
-                        // CRITICAL: Update UI immediately after first load
-                        this.updateUI();
-                    } else {
-                        // Subsequent sync - use Math.max to prevent overwriting local increments
-                        this.state.todayWords = Math.max(this.state.todayWords, serverTodayWords);
-                        this.state.todayPronunciations = Math.max(this.state.todayPronunciations, serverTodayPronunciations);
-                        this.state.todayMalas = Math.max(this.state.todayMalas, serverTodayMalas);
-                        this.state.todaysCount = Math.max(this.state.todaysCount, serverTodaysCount);
-                        this.state.todayDate = serverTodayDate;
-                        
-                        // Ensure todaysCount reflects todayWords if it's higher
-                        if (this.state.todayWords > this.state.todaysCount) {
-                            this.state.todaysCount = this.state.todayWords;
-                        }
-                        
-                        console.log('✅ Sync - loaded today\'s data from server (using Math.max):', {
-                            todayWords: this.state.todayWords,
-                            todaysCount: this.state.todaysCount,
-                            todayDate: this.state.todayDate
-                        });
-                    }
-                } else {
-                    // Date changed - server date is different from current date
-                    // This means IST midnight passed - reset will be handled by checkForDateChange
-                    console.log('📅 Date changed detected. Server stored:', serverTodayDate, 'Current:', currentServerDate);
-                    
-                    // CRITICAL FIX: On first load, if dates don't match but server has data,
-                    // it might be a timezone/format issue. Only reset if we're sure it's a new day.
-                    // If it's first load and server has non-zero count, be more cautious about resetting
-                    if (this.state.isFirstLoad && (serverTodayWords > 0 || serverTodaysCount > 0)) {
-                        console.warn('⚠️ First load: Dates don\'t match but server has count data. Loading anyway to preserve data.');
-                        // Load the data anyway - might be a date format issue
-                        this.state.todayWords = serverTodayWords;
-                        this.state.todayPronunciations = serverTodayPronunciations;
-                        this.state.todayMalas = serverTodayMalas;
-                        this.state.todaysCount = serverTodaysCount;
-                        this.state.todayDate = serverTodayDate || currentServerDate;
-                        this.state.isFirstLoad = false;
-                        this.updateUI();
-                    } else {
-                        // Set todayDate to current server date to prevent false resets
-                        this.state.todayDate = currentServerDate;
-                        // Initialize today's counters to 0 for new day
-                        this.state.todayWords = 0;
-                        this.state.todayPronunciations = 0;
-                        this.state.todayMalas = 0;
-                        this.state.todaysCount = 0;
-                        this.state.currentMalaPronunciations = 0;
-                    }
+                // Ensure todaysCount reflects todayWords if it's higher
+                if (this.state.todayWords > this.state.todaysCount) {
+                    this.state.todaysCount = this.state.todayWords;
                 }
-
-                console.log('DEBUG LOAD: todayMalas=' + this.state.todayMalas + ', todaysCount=' + this.state.todaysCount + ', currentMalaPron=' + this.state.currentMalaPronunciations);
-                console.log('✅ State loaded:', {
-                    totalWords: this.state.totalWords,
-                    totalPronunciations: this.state.totalPronunciations,
-                    currentMalaPronunciations: this.state.currentMalaPronunciations,
-                    totalMalas: this.state.totalMalas,
+                
+                console.log('✅ Sync - loaded today\'s data from server (using Math.max):', {
                     todayWords: this.state.todayWords,
-                    todayPronunciations: this.state.todayPronunciations,
-                    todayMalas: this.state.todayMalas,
-                    todaysCount: this.state.todaysCount
+                    todaysCount: this.state.todaysCount,
+                    todayDate: this.state.todayDate
                 });
             }
-        } catch (error) {
-            console.error('❌ Error loading from server:', error);
-            this.showNotification('डेटा लोड करता आला नाही', 'error');
+        } else {
+            // Date changed - server date is different from current date
+            // This means IST midnight passed - reset will be handled by checkForDateChange
+            console.log('📅 Date changed detected. Server stored:', serverTodayDate, 'Current:', currentServerDate);
+            
+            // CRITICAL FIX: On first load, if dates don't match but server has data,
+            // it might be a timezone/format issue. Only reset if we're sure it's a new day.
+            // If it's first load and server has non-zero count, be more cautious about resetting
+            if (this.state.isFirstLoad && (serverTodayWords > 0 || serverTodaysCount > 0)) {
+                console.warn('⚠️ First load: Dates don\'t match but server has count data. Loading anyway to preserve data.');
+                // Load the data anyway - might be a date format issue
+                this.state.todayWords = serverTodayWords;
+                this.state.todayPronunciations = serverTodayPronunciations;
+                this.state.todayMalas = serverTodayMalas;
+                this.state.todaysCount = serverTodaysCount;
+                this.state.todayDate = serverTodayDate || currentServerDate;
+                this.state.isFirstLoad = false;
+                this.updateUI();
+            } else {
+                // Set todayDate to current server date to prevent false resets
+                this.state.todayDate = currentServerDate;
+                // Initialize today's counters to 0 for new day
+                this.state.todayWords = 0;
+                this.state.todayPronunciations = 0;
+                this.state.todayMalas = 0;
+                this.state.todaysCount = 0;
+                this.state.currentMalaPronunciations = 0;
+            }
         }
+
+        console.log('DEBUG LOAD: todayMalas=' + this.state.todayMalas + ', todaysCount=' + this.state.todaysCount + ', currentMalaPron=' + this.state.currentMalaPronunciations);
+        console.log('✅ State loaded:', {
+            totalWords: this.state.totalWords,
+            totalPronunciations: this.state.totalPronunciations,
+            currentMalaPronunciations: this.state.currentMalaPronunciations,
+            totalMalas: this.state.totalMalas,
+            todayWords: this.state.todayWords,
+            todayPronunciations: this.state.todayPronunciations,
+            todayMalas: this.state.todayMalas,
+            todaysCount: this.state.todaysCount
+        });
     }
 
     scheduleSaveToServer() {
@@ -1596,12 +1606,13 @@ class HariJapCounter {
         }
 
         this.state.isSaving = true;
+        let payload = null;
 
         try {
             // Calculate actual todays count for persistence
             const actualTodaysCount = this.calculateTodayTotalWords();
             
-            const payload = {
+            payload = {
                 count: this.state.totalWords,
                 totalMalas: this.state.totalMalas,
                 currentMalaPronunciations: this.state.currentMalaPronunciations,
@@ -1616,6 +1627,16 @@ class HariJapCounter {
             console.log('💾 Saving to server:', payload);
             console.log('DEBUG SAVE: todayMalas=' + payload.todayMalas + ', todaysCount=' + payload.todaysCount + ', currentMalaPron=' + payload.currentMalaPronunciations);
 
+            // Offline, or earlier saves still queued: queue this one too so the
+            // server sees them in order, then try to send the whole queue
+            if (!navigator.onLine || this.state.offlineQueue.length > 0) {
+                this.queueOfflineSave(payload);
+                if (navigator.onLine) {
+                    await this.flushOfflineQueue();
+                }
+                return;
+            }
+
             const response = await fetch('/harijap/api/save', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
@@ -1633,6 +1654,10 @@ class HariJapCounter {
             }
         } catch (error) {
             console.error('❌ Save error:', error);
+            // Network failure: keep the snapshot for the batch upload on reconnect
+            if (payload) {
+                this.queueOfflineSave(payload);
+            }
             if (!immediate) {
                 this.showNotification('सर्वर शी कनेक्ट करता आले नाही', 'error');
             }
@@ -1641,6 +1666,50 @@ class HariJapCounter {
         }
     }
 
+    queueOfflineSave(payload) {
+        // Each entry is a full snapshot stamped with when it was taken, so the
+        // server can put it on the right IST day even across midnight
+        this.state.offlineQueue.push(Object.assign({ at: Date.now() }, payload));
+        if (this.state.offlineQueue.length > this.config.offlineQueueMax) {
+            // Snapshots are cumulative: dropping the oldest loses no counts
+            this.state.offlineQueue.splice(0, this.state.offlineQueue.length - this.config.offlineQueueMax);
+        }
+    }
+
+    async flushOfflineQueue() {
+        if (this.state.offlineQueue.length === 0 || this.state.isFlushingQueue) {
+            return;
+        }
+        this.state.isFlushingQueue = true;
+        const events = this.state.offlineQueue.slice();
+
+        try {
+            console.log('📤 Uploading ' + events.length + ' queued saves');
+            const response = await fetch('/harijap/api/save_batch', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                credentials: 'same-origin',
+                body: JSON.stringify({ events: events })
+            });
+
+            if (response.ok) {
+                // Only drop what was sent; saves queued meanwhile go next time
+                this.state.offlineQueue.splice(0, events.length);
+                console.log('✅ Offline queue uploaded');
+            } else if (response.status === 400) {
+                // Rejected as malformed: retrying the same queue would never succeed
+                this.state.offlineQueue.splice(0, events.length);
+                console.error('❌ Batch upload rejected, queue dropped');
+            } else {
+                console.error('❌ Batch upload failed:', response.status);
+            }
+        } catch (error) {
+            console.error('❌ Batch upload error:', error);
+        } finally {
+            this.state.isFlushingQueue = false;
+        }
+    }
+
     // ================================================================
     // UI UPDATE METHODS
     // ================================================================
@@ -2214,6 +2283,106 @@ class HariJapCounter {
         return fallbackDate;
     }
 
+    applyServerTime(data) {
+        this.serverDate = data.date;
+        this.serverTime = data.datetime;
+        // Store hour, minute, second separately for accurate time display
+        this.serverHour = data.hour !== undefined ? parseInt(data.hour) : null;
+        this.serverMinute = data.minute !== undefined ? parseInt(data.minute) : null;
+        this.serverSecond = data.second !== undefined ? parseInt(data.second) : null;
+        this.serverTimeFetchedAt = Date.now(); // Store when we fetched the time for live clock
+        console.log('🕐 Server time loaded:', data.date, 'at', this.serverHour + ':' + this.serverMinute + ':' + this.serverSecond, 'Server datetime:', data.datetime);
+        
+        // Update date/time display when server time is loaded
+        this.updateDateTimeDisplay();
+        
+        // If server time was loaded, trigger date check
+        if (this.state.isInitialized) {
+            this.checkForDateChange();
+        }
+    }
+
+    // ================================================================
+    // LIVE UPDATES (SSE, LONG-POLL FALLBACK)
+    // ================================================================
+
+    startLiveUpdates() {
+        if (!window.EventSource) {
+            this.startLongPoll();
+            return;
+        }
+
+        let failures = 0;
+        const source = new EventSource('/harijap/api/live');
+        this.liveSource = source;
+
+        source.addEventListener('state', (event) => {
+            failures = 0;
+            this.applyLiveState(JSON.parse(event.data));
+        });
+        source.addEventListener('tick', (event) => {
+            this.applyLiveTick(JSON.parse(event.data));
+        });
+        source.onerror = () => {
+            // EventSource reconnects by itself; give up only if it keeps failing
+            // (proxy stripping the stream, or the server out of stream slots)
+            failures += 1;
+            if (failures >= 3) {
+                console.warn('⚠️ Live stream unavailable, falling back to long-poll');
+                source.close();
+                this.liveSource = null;
+                this.startLongPoll();
+            }
+        };
+    }
+
+    async startLongPoll() {
+        let wait = 0; // first request answers immediately with a snapshot
+        while (true) {
+            try {
+                const response = await fetch('/harijap/api/live/poll?wait=' + wait, {
+                    method: 'GET',
+                    credentials: 'same-origin'
+                });
+                if (response.status === 401) {
+                    return;
+                }
+                if (response.ok) {
+                    const data = await response.json();
+                    if (data.success) {
+                        this.applyLiveState(data.state);
+                        if (data.tick) {
+                            this.applyLiveTick(data.tick);
+                        }
+                    }
+                    wait = 1;
+                    continue;
+                }
+            } catch (error) {
+                console.error('❌ Long-poll error:', error);
+            }
+            await new Promise(resolve => setTimeout(resolve, 5000));
+        }
+    }
+
+    applyLiveState(data) {
+        // Only adopt what another tab or device added; local increments not yet
+        // saved are always ahead of the server
+        if (data && (data.count || 0) > this.state.totalWords) {
+            this.applyServerState(data);
+            this.updateUI();
+        }
+    }
+
+    applyLiveTick(tick) {
+        if (tick.server_time) {
+            this.applyServerTime(tick.server_time);
+        }
+        if (tick.global_today !== null && tick.global_today !== undefined && this.elements.globalTodayCount) {
+            this.elements.globalTodayCount.textContent = 'आज सर्वांचा जप: ' + tick.global_today;
+        }
+    }
+
     async getServerTime() {
         try {
             const response = await fetch('/harijap/api/server_time', {
@@ -2224,23 +2393,7 @@ class HariJapCounter {
             if (response.ok) {
                 const data = await response.json();
                 if (data.success) {
-                    this.serverDate = data.date;
-                    this.serverTime = data.datetime;
-                    // Store hour, minute, second separately for accurate time display
-                    this.serverHour = data.hour !== undefined ? parseInt(data.hour) : null;
-                    this.serverMinute = data.minute !== undefined ? parseInt(data.minute) : null;
-                    this.serverSecond = data.second !== undefined ? parseInt(data.second) : null;
-                    this.serverTimeFetchedAt = Date.now(); // Store when we fetched the time for live clock
-                    console.log('🕐 Server time loaded:', data.date, 'at', this.serverHour + ':' + this.serverMinute + ':' + this.serverSecond, 'Server datetime:', data.datetime);
-                    
-                    // Update date/time display when server time is loaded
-                    this.updateDateTimeDisplay();
-                    
-                    // If server time was loaded, trigger date check
-                    if (this.state.isInitialized) {
-                        this.checkForDateChange();
-                    }
-                    
+                    this.applyServerTime(data);
                     return data.date;
                 }
             }
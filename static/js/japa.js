@@ -296,6 +296,12 @@ class JapaApp {
         const cleanedWord = transcript.toLowerCase().trim();
         this.updateStatus(`प्रसंस्करण: "${cleanedWord}"`);
 
+        // A phrase ("radhe krishna radhe") is counted in one request
+        const words = cleanedWord.split(/\s+/).filter(Boolean);
+        if (words.length > 1) {
+            return this.processPhrase(words);
+        }
+
         try {
             const response = await fetch('/api/japa/update_count', {
                 method: 'POST',
@@ -401,6 +407,47 @@ class JapaApp {
         }
     }
 
+    async processPhrase(words) {
+        try {
+            const response = await fetch('/api/japa/update_count_batch', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ words: words })
+            });
+
+            const data = await response.json();
+
+            if (!data.success) {
+                console.error('API Error:', data.error);
+                this.updateStatus('सर्वर त्रुटि। फिर से कोशिश करें');
+                return;
+            }
+
+            const next = data.next_word;
+            if (data.matched_count > 0) {
+                this.consecutiveFailures = 0;
+                this.sessionCount = data.new_count;
+                this.currentWordIndex = data.current_word_index;
+                this.showRecognitionFeedback(`सही! ${data.matched_count}/${words.length} शब्द - अब "${next.word_english}" बोलें (${next.repetition_info})`, true);
+                this.animateCounterUpdate();
+
+                if (data.completed_rounds > 0) {
+                    this.showRoundCompletion();
+                    await this.updateStats();
+                }
+
+                this.updateDisplay();
+                this.updateStatus(`सुन रहा है... "${next.word_english}" बोलें (${next.repetition_info})`);
+            } else {
+                this.showRecognitionFeedback(`गलत शब्द: "${words.join(' ')}" | अपेक्षित: "${next.word_english}"`, false);
+                this.updateStatus(`फिर से कोशिश करें। बोलें: "${next.word_english}" (${next.repetition_info})`);
+            }
+        } catch (error) {
+            console.error('Error processing phrase:', error);
+            this.updateStatus('शब्द प्रसंस्करण में त्रुटि');
+        }
+    }
+
     showRecognitionFeedback(message, isSuccess) {
         const feedback = this.elements.recognitionFeedback;
         if (feedback) {
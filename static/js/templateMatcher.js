@@ -13,7 +13,9 @@
  * variation, but not usually a ~2x speed difference. Expect this to
  * UNDER-MATCH real fast chanting until templates.json is rebuilt from a
  * fast-paced reference recording (same Python pipeline, new source WAV).
- * Swapping in a new templates.json requires no code changes here.
+ * Swapping in a new templates.json requires no code changes here; run
+ * build_template_pack.py afterwards to refresh the compact templates.bin
+ * the page loads (either file works as templatesUrl).
  * =====================================================================
  */
 
@@ -22,6 +24,7 @@ class MantraTemplateMatcher {
         this.templatesUrl = templatesUrl;
         this.templates = [];       // array of Float32Array[frames][nMels], normalized
         this.melFilterbank = null; // Float32Array[nMels][nFftBins]
+        this.templateScales = [];  // per template: Float32Array[nMels] for int8 packs, else null
         this.meta = null;
 
         this.sampleRate = 16000;
@@ -55,8 +58,13 @@ class MantraTemplateMatcher {
 
     async loadTemplates() {
         const res = await fetch(this.templatesUrl);
-        if (!res.ok) throw new Error('Failed to load templates.json: HTTP ' + res.status);
-        const data = await res.json();
+        if (!res.ok) throw new Error('Failed to load ' + this.templatesUrl + ': HTTP ' + res.status);
+        const buffer = await res.arrayBuffer();
+
+        // templates.bin (build_template_pack.py) or the original templates.json
+        const data = MantraTemplateMatcher.isTemplatePack(buffer)
+            ? MantraTemplateMatcher.parseTemplatePack(buffer)
+            : MantraTemplateMatcher.parseTemplateJSON(JSON.parse(new TextDecoder().decode(buffer)));
 
         this.meta = data.meta;
         this.sampleRate = data.meta.sampleRate;
@@ -64,8 +72,9 @@ class MantraTemplateMatcher {
         this.hop = data.meta.hopSize;
         this.nMels = data.meta.nMels;
 
-        this.melFilterbank = data.melFilterbank.map(row => Float32Array.from(row));
-        this.templates = data.templates.map(t => t.map(frame => Float32Array.from(frame)));
+        this.melFilterbank = data.melFilterbank;
+        this.templates = data.templates;
+        this.templateScales = data.templateScales;
 
         console.log('✅ Loaded ' + this.templates.length + ' templates. Phrase: "' + data.meta.phrase + '"');
         if (data.meta.paceWarning) {
@@ -75,6 +84,87 @@ class MantraTemplateMatcher {
         return data.meta;
     }
 
+    static parseTemplateJSON(data) {
+        return {
+            meta: data.meta,
+            melFilterbank: data.melFilterbank.map(row => Float32Array.from(row)),
+            templates: data.templates.map(t => t.map(frame => Float32Array.from(frame))),
+            templateScales: data.templates.map(() => null)
+        };
+    }
+
+    static isTemplatePack(buffer) {
+        const magic = new Uint8Array(buffer, 0, Math.min(4, buffer.byteLength));
+        return String.fromCharCode(...magic) === 'MTPK';
+    }
+
+    // ----------------------------------------------------------------
+    // Template pack (layout in utils/template_pack.py): a small JSON header,
+    // then 8-byte aligned little-endian sections. Frames become subarray
+    // views into the fetched buffer - nothing is copied except float16
+    // frames on browsers without Float16Array, which are widened once.
+    // int8 frames stay quantized; _euclidean() applies the per-template
+    // per-band scale.
+    // ----------------------------------------------------------------
+    static parseTemplatePack(buffer) {
+        const view = new DataView(buffer);
+        const version = view.getUint16(4, true);
+        if (version !== 1) throw new Error('Unsupported template pack version ' + version);
+        if (new Uint8Array(new Uint16Array([1]).buffer)[0] !== 1) {
+            throw new Error('Template packs need a little-endian platform - use templates.json');
+        }
+        const headerLen = view.getUint32(8, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 12, headerLen)));
+        const nMels = header.nMels, nBins = header.nBins;
+
+        const fb = new Float32Array(buffer, header.melFilterbank.offset, nMels * nBins);
+        const melFilterbank = [];
+        for (let m = 0; m < nMels; m++) melFilterbank.push(fb.subarray(m * nBins, (m + 1) * nBins));
+
+        const frameCounts = header.templates.frames;
+        const count = frameCounts.reduce((a, b) => a + b, 0) * nMels;
+        let values;
+        if (header.dtype === 'int8') {
+            values = new Int8Array(buffer, header.templates.offset, count);
+        } else if (header.dtype === 'float16') {
+            values = typeof Float16Array !== 'undefined'
+                ? new Float16Array(buffer, header.templates.offset, count)
+                : MantraTemplateMatcher._widenFloat16(new Uint16Array(buffer, header.templates.offset, count));
+        } else {
+            throw new Error('Unsupported template pack dtype ' + header.dtype);
+        }
+        const scales = header.scales
+            ? new Float32Array(buffer, header.scales.offset, frameCounts.length * nMels)
+            : null;
+
+        const templates = [];
+        const templateScales = [];
+        let pos = 0;
+        for (let t = 0; t < frameCounts.length; t++) {
+            const frames = [];
+            for (let f = 0; f < frameCounts[t]; f++, pos += nMels) frames.push(values.subarray(pos, pos + nMels));
+            templates.push(frames);
+            templateScales.push(scales ? scales.subarray(t * nMels, (t + 1) * nMels) : null);
+        }
+        return { meta: header.meta, melFilterbank, templates, templateScales };
+    }
+
+    static _widenFloat16(halves) {
+        // Rebuild each value's float32 bit pattern: rebias the exponent, shift the fraction
+        const bits = new Uint32Array(halves.length);
+        const out = new Float32Array(bits.buffer);
+        for (let i = 0; i < halves.length; i++) {
+            const h = halves[i];
+            const sign = (h & 0x8000) << 16, exp = (h >> 10) & 0x1f, frac = h & 0x3ff;
+            if (exp === 0) {
+                out[i] = (sign ? -1 : 1) * frac * 5.960464477539063e-8;   // zero / subnormal: frac * 2^-24
+            } else {
+                bits[i] = sign | (exp === 31 ? 0x7f800000 : (exp + 112) << 23) | (frac << 13);
+            }
+        }
+        return out;
+    }
+
     async start() {
         if (this.templates.length === 0) {
             await this.loadTemplates();
@@ -248,7 +338,7 @@ class MantraTemplateMatcher {
             const window = this.featureBuffer.slice(this.featureBuffer.length - T);
             const windowNorm = this._zScoreNormalize(window);
 
-            const dist = this._dtwDistance(template, windowNorm, 0.3);
+            const dist = this._dtwDistance(template, windowNorm, 0.3, this.templateScales[t]);
             if (dist < bestDist) {
                 bestDist = dist;
                 bestTemplateIdx = t;
@@ -293,7 +383,7 @@ class MantraTemplateMatcher {
     }
 
     // Banded DTW, same normalization (distance / path length) as the Python prototype
-    _dtwDistance(A, B, bandFrac = 0.3) {
+    _dtwDistance(A, B, bandFrac = 0.3, scaleA = null) {
         const n = A.length, m = B.length;
         const band = Math.floor(Math.max(n, m) * bandFrac);
 
@@ -306,15 +396,22 @@ class MantraTemplateMatcher {
             const jLo = Math.max(1, i - band);
             const jHi = Math.min(m, i + band);
             for (let j = jLo; j <= jHi; j++) {
-                const cost = this._euclidean(A[i - 1], B[j - 1]);
+                const cost = this._euclidean(A[i - 1], B[j - 1], scaleA);
                 D[i][j] = cost + Math.min(D[i - 1][j], D[i][j - 1], D[i - 1][j - 1]);
             }
         }
         return D[n][m] / (n + m);
     }
 
-    _euclidean(a, b) {
+    _euclidean(a, b, scaleA = null) {
         let sum = 0;
+        if (scaleA) {
+            for (let i = 0; i < a.length; i++) {
+                const d = a[i] * scaleA[i] - b[i];
+                sum += d * d;
+            }
+            return Math.sqrt(sum);
+        }
         for (let i = 0; i < a.length; i++) {
             const d = a[i] - b[i];
             sum += d * d;
@@ -0,0 +1,89 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption('--benchmark', action='store_true', default=False,
+                     help='also run the @pytest.mark.benchmark throughput tests')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: timing test, skipped unless --benchmark is given')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='benchmark - run with --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
+class RecordingCursor:
+    """
+    DB-API cursor fake that records (whitespace-collapsed sql, params).
+
+    fetchone() / fetchall() answer from `one` / `many`: (sql prefix, result)
+    pairs checked against the last statement in order, '' matching anything;
+    no match gives None / []. Each prefix in `misses` makes the next
+    statement starting with it match no row (rowcount 0), once.
+    """
+
+    def __init__(self, one=(), many=(), misses=None):
+        self.one = list(one)
+        self.many = list(many)
+        self.misses = [] if misses is None else misses
+        self.statements = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append((sql, params))
+        self.rowcount = 1
+        for prefix in self.misses:
+            if sql.startswith(prefix):
+                self.misses.remove(prefix)
+                self.rowcount = 0
+                break
+
+    def _answer(self, replies, default):
+        sql = self.statements[-1][0] if self.statements else ''
+        return next((result for prefix, result in replies if sql.startswith(prefix)), default)
+
+    def fetchone(self):
+        return self._answer(self.one, None)
+
+    def fetchall(self):
+        return self._answer(self.many, [])
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    """Connection fake: hands out RecordingCursors that share its replies and misses."""
+
+    def __init__(self, one=(), many=(), misses=()):
+        self.one = one
+        self.many = many
+        self.misses = list(misses)
+        self.cursors = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_class=None):
+        self.cursors.append(RecordingCursor(self.one, self.many, self.misses))
+        return self.cursors[-1]
+
+    @property
+    def statements(self):
+        return [statement for cursor in self.cursors for statement in cursor.statements]
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
@@ -0,0 +1,90 @@
+import random
+from datetime import date, timedelta
+
+from utils import daily_history as history
+from utils import progress_sync
+from utils.progress_engine import ProgressEngine, fold_progress_events, state_from_payload
+from tests.conftest import FakeConn, RecordingCursor
+
+
+def bitmap(days):
+    words = {}
+    for day in days:
+        history.set_bit(words, day)
+    return words
+
+
+def brute_force(days, today):
+    active = set(days)
+    longest = run = 0
+    day = min(active) if active else today
+    while day <= today:
+        run = run + 1 if day in active else 0
+        longest = max(longest, run)
+        day += timedelta(days=1)
+    current = 0
+    day = today if today in active else today - timedelta(days=1)
+    while day in active:
+        current += 1
+        day -= timedelta(days=1)
+    return current, longest
+
+
+def test_streaks_across_word_boundaries():
+    today = date(2025, 1, 6)
+    # 200 days ending yesterday, spanning several 64-day words; today not chanted yet
+    days = [today - timedelta(days=n) for n in range(1, 201)]
+    words = bitmap(days)
+    assert history.current_streak(words, today) == 200
+    assert history.longest_streak(words) == 200
+    assert history.active_days(words) == 200
+    assert history.first_active_day(words) == today - timedelta(days=200)
+
+    # missing yesterday too: the streak is broken
+    words = bitmap(days[1:])
+    assert history.current_streak(words, today) == 0
+
+
+def test_streaks_match_a_day_by_day_walk():
+    rng = random.Random(7)
+    today = date(2025, 3, 1)
+    for _ in range(50):
+        days = [today - timedelta(days=n) for n in range(400) if rng.random() < 0.8]
+        words = bitmap(days)
+        assert (history.current_streak(words, today), history.longest_streak(words)) == brute_force(days, today)
+
+
+def harijap_history():
+    return history.DailyHistory('harijap_progress', 'harijap_daily', 'harijap_activity')
+
+
+def test_every_day_of_an_offline_batch_reaches_the_history():
+    engine = ProgressEngine(progress_sync.HARIJAP, connect=None, write_behind=False, history=harijap_history())
+    states = [state_from_payload({'count': count, 'todayWords': words, 'todaysCount': words, 'todayDate': day},
+                                 7, 'Test', '', today='2025-01-07')
+              for day, count, words in (('2025-01-06', 150, 50), ('2025-01-07', 180, 30))]
+    cursor = RecordingCursor(one=[('', {'last_seq': 0})])
+    engine.save(FakeConn(), cursor, fold_progress_events(states))   # stored row still on D0
+
+    tables = [sql.split(' INTO ')[1].split()[0] for sql, _ in cursor.statements]
+    assert tables == ['harijap_daily', 'harijap_activity',       # stored D0, from the row
+                      'harijap_daily', 'harijap_activity',       # D1, from the folded state
+                      'harijap_progress']                        # D2 stays the stored day
+    assert cursor.statements[2][1] == [7, date(2025, 1, 6), 50, 0, 0, 50]
+    idx, bit = divmod(history.day_index(date(2025, 1, 6)), history.WORD_BITS)
+    assert cursor.statements[3][1] == [7, idx, 1 << bit]
+
+
+def test_every_day_of_a_v2_batch_reaches_the_history():
+    _, ops = progress_sync.parse_ops({'client_id': 'tab', 'ops': [
+        {'seq': 1, 'date': '2025-01-05', 'words': 10}, {'seq': 2, 'date': '2025-01-06', 'words': 5},
+        {'seq': 3, 'date': '2025-01-07', 'words': 7}]}, today='2025-01-07')
+    cursor = RecordingCursor(one=[('', {'last_seq': 0})])
+    progress_sync.apply_ops(FakeConn(), cursor, progress_sync.HARIJAP, 7, 'Test', '', 'tab', ops,
+                            today='2025-01-07', history=harijap_history())
+
+    writes = [sql.split(' INTO ')[1].split()[0] for sql, _ in cursor.statements if sql.startswith('INSERT')]
+    assert writes == ['progress_sync_devices', 'harijap_daily', 'harijap_activity',   # stored day
+                      'harijap_progress', 'harijap_daily', 'harijap_activity',   # D0 archived before D1
+                      'harijap_progress', 'harijap_daily', 'harijap_activity',   # D1 archived before D2
+                      'harijap_progress']
@@ -0,0 +1,135 @@
+import time
+import pytest
+from db_config import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    cursorclass = object
+
+    def __init__(self):
+        self.open = True
+        self.rollbacks = 0
+        self.pings = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def get_autocommit(self):
+        return False
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+
+    def cursor(self, cursor=None):
+        return FakeCursor()
+
+    def close(self):
+        self.open = False
+
+
+class FakeCursor:
+    def close(self):
+        pass
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def creator():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return ConnectionPool(creator=creator, **kwargs), created
+
+
+def test_connection_is_reused_after_close():
+    pool, created = make_pool(size=2, max_overflow=0)
+    conn = pool.connect()
+    conn.close()
+    conn.close()  # double close is a no-op
+    pool.connect().close()
+
+    assert len(created) == 1
+    assert created[0].rollbacks == 2
+    assert pool.stats()['checked_out'] == 0
+
+
+def test_overflow_is_closed_and_exhaustion_times_out():
+    pool, created = make_pool(size=1, max_overflow=1, timeout=0.05)
+    first, second = pool.connect(), pool.connect()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.connect()
+
+    first.close()
+    second.close()
+    stats = pool.stats()
+    assert stats['waits'] == 1 and stats['timeouts'] == 1
+    assert stats['open'] == 1
+    assert not created[1].open
+
+
+def test_stale_connections_are_recycled_and_idle_ones_pinged():
+    pool, created = make_pool(size=1, max_overflow=0, recycle=0.01, ping_after=0)
+    pool.connect().close()
+    time.sleep(0.02)
+    pool.connect().close()
+
+    assert len(created) == 2
+    assert pool.stats()['recycled'] == 1
+
+    pool.recycle = 0
+    pool.connect().close()
+    assert created[1].pings == 1
+
+
+def test_request_shares_one_connection(monkeypatch):
+    import os
+    from flask import Flask
+    import db_config
+
+    pool, created = make_pool(size=2, max_overflow=0)
+    monkeypatch.setattr(db_config, '_pool', pool)
+    monkeypatch.setattr(db_config, '_pool_pid', os.getpid())
+    monkeypatch.setattr(db_config, '_request_stats',
+                        {'requests_with_db': 0, 'multi_connection_requests': 0})
+
+    app = Flask(__name__)
+    db_config.init_app(app)
+
+    @app.route('/shared')
+    def shared():
+        first = db_config.get_db_connection()
+        first.close()
+        with db_config.get_db_cursor():
+            pass
+        db_config.get_db_connection().close()
+        return 'ok'
+
+    @app.route('/leaky')
+    def leaky():
+        db_config.get_db_connection()
+        db_config.checkout_connection().close()
+        return 'ok'
+
+    client = app.test_client()
+    assert client.get('/shared').status_code == 200
+    assert len(created) == 1
+    assert pool.stats()['checked_out'] == 0
+    assert db_config._request_stats['multi_connection_requests'] == 0
+
+    assert client.get('/leaky').status_code == 200
+    assert db_config._request_stats == {'requests_with_db': 2, 'multi_connection_requests': 1}
+    assert pool.stats()['checked_out'] == 0
+
+
+def test_query_fingerprint_hides_values():
+    from utils.query_metrics import fingerprint
+
+    assert fingerprint("SELECT * FROM t WHERE id = %s AND name = 'x'") == \
+        "SELECT * FROM t WHERE id = ? AND name = ?"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)") == \
+        "INSERT INTO t (a, b) VALUES (?...), ..."
+    assert fingerprint("SELECT 1 FROM t WHERE id IN (1, 2, 3)\n  LIMIT 50") == \
+        "SELECT ? FROM t WHERE id IN (?...) LIMIT ?"
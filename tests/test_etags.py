@@ -0,0 +1,54 @@
+from flask import Flask
+
+from utils.etags import ETagCache, conditional_json
+
+
+def _app(cache, data, builds):
+    app = Flask(__name__)
+
+    def build():
+        builds.append(1)
+        return {'success': True, 'count': data['count']}, 200
+
+    @app.route('/state')
+    def state():
+        return conditional_json('state:1', '2026-10-17', build, cache=cache)
+
+    return app
+
+
+def test_repeat_get_is_answered_from_the_cache_until_invalidated():
+    cache = ETagCache(redis_url=None, local_ttl=60)
+    data, builds = {'count': 108}, []
+    client = _app(cache, data, builds).test_client()
+
+    first = client.get('/state')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.get_json()['count'] == 108
+
+    again = client.get('/state', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and len(builds) == 1
+
+    # a save with no visible change: rebuilt once, same body, still a 304
+    cache.invalidate('state:1')
+    assert client.get('/state', headers={'If-None-Match': etag}).status_code == 304
+    assert len(builds) == 2
+
+    data['count'] = 216
+    cache.invalidate('state:1')
+    changed = client.get('/state', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['revalidated'], stats['misses']) == (1, 1, 2)
+    assert stats['hit_ratio'] == 0.25 and stats['not_modified_ratio'] == 0.5
+
+
+def test_remembered_etag_expires_without_shared_invalidation():
+    cache = ETagCache(redis_url=None, local_ttl=0)
+    builds = []
+    client = _app(cache, {'count': 1}, builds).test_client()
+
+    etag = client.get('/state').headers['ETag']
+    assert client.get('/state', headers={'If-None-Match': etag}).status_code == 304
+    assert len(builds) == 2  # revalidated by a rebuild, not trusted blindly
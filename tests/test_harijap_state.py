@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+
+import db_config
+import routes.harijap_auth as harijap
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+class CountingConnection:
+    rowcount = 0
+
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self, cursor=None):
+        return self
+
+    def execute(self, sql, params=None):
+        self.statements.append(' '.join(sql.split())[:60])
+
+    def fetchone(self):
+        return dict(self.row) if self.row else None
+
+    def fetchall(self):
+        return [self.fetchone()] if self.row else []
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def progress_row(today_date):
+    return {
+        'bhaktgan_id': 1, 'city': 'Pune',
+        'count': 1080, 'total_malas': 10, 'current_mala_pronunciations': 12,
+        'total_pronunciations': 216, 'last_spoken_at': None,
+        'today_words': 540, 'today_pronunciations': 108, 'today_malas': 5,
+        'today_date': today_date, 'todays_count': 540,
+    }
+
+
+def request(client, method, row, payload=None):
+    conn = CountingConnection(row)
+    original = harijap.get_db_connection
+    harijap.get_db_connection = lambda: conn
+    try:
+        url = '/harijap/api/save' if method == 'POST' else '/harijap/api/state'
+        response = client.open(url, method=method, json=payload)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    finally:
+        harijap.get_db_connection = original
+    return len(conn.statements), conn.commits
+
+
+def test_state_and_save_are_single_statement():
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    db_config.init_app(app)
+    app.register_blueprint(harijap.harijap_auth_bp)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(authenticated=True, user_id='bhaktgan:1', user_name='Test', user_mobile='9876543210')
+
+    today = datetime.now(IST).date()
+    yesterday = today - timedelta(days=1)
+    save = {
+        'count': 1085, 'totalMalas': 10, 'currentMalaPronunciations': 13,
+        'totalPronunciations': 217, 'todayWords': 545, 'todayPronunciations': 109,
+        'todayMalas': 5, 'todayDate': today.isoformat(), 'todaysCount': 545,
+    }
+    engine, cache = harijap.progress_engine, harijap.leaderboard_cache
+    saved = (engine.write_behind, cache.refresh_seconds, harijap.city_rollup.enabled,
+             harijap.daily_history.enabled, harijap.today_counter.enabled)
+    engine.write_behind = False
+    cache.refresh_seconds = float('inf')   # periodic, not per request
+    harijap.city_rollup.enabled = harijap.daily_history.enabled = harijap.today_counter.enabled = False
+    try:
+        # Every state read is one SELECT (the rollover is folded into it), no COMMIT
+        for row in (None, progress_row(today), progress_row(yesterday)):
+            assert request(client, 'GET', row) == (1, 0)
+        # Every synchronous save is one upsert plus its COMMIT, across midnight too
+        for row in (progress_row(today), progress_row(yesterday)):
+            assert request(client, 'POST', row, save) == (1, 1)
+
+        # First save of an IST day archives yesterday in the same transaction
+        harijap.daily_history.enabled = True
+        harijap.daily_history.mark_current([], None)
+        assert request(client, 'POST', progress_row(yesterday), save) == (3, 1)
+        harijap.daily_history.enabled = False
+
+        engine.write_behind = True
+        assert request(client, 'POST', progress_row(today), save) == (0, 0)
+        engine.buffer.pop(1)   # never let the flush thread reach a real database
+    finally:
+        (engine.write_behind, cache.refresh_seconds, harijap.city_rollup.enabled,
+         harijap.daily_history.enabled, harijap.today_counter.enabled) = saved
@@ -0,0 +1,98 @@
+import re
+import uuid
+from datetime import date
+
+from utils.japa_janitor import ANONYMOUS, ANONYMOUS_TOKEN, JapaJanitor, partition_ddl
+
+
+class ScriptedDB:
+    """Answers the janitor's queries from a small in-memory picture of the tables."""
+
+    def __init__(self, lock=1, idle=0, stale_ids=(), partitions=None, nonempty=()):
+        self.lock = lock
+        self.idle = idle
+        self.stale_ids = list(stale_ids)
+        self.partitions = partitions or {}
+        self.nonempty = set(nonempty)
+        self.statements = []
+        self.commits = 0
+        self.rowcount = 0
+        self._result = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        self.rowcount, self._result = 0, []
+        if sql.startswith('SELECT GET_LOCK'):
+            self._result = [{'got': self.lock}]
+        elif sql.startswith('UPDATE japa_sessions'):
+            self.rowcount, self.idle = min(self.idle, params[-1]), max(0, self.idle - params[-1])
+        elif sql.startswith('SELECT id FROM japa_sessions'):
+            batch, self.stale_ids = self.stale_ids[:params[-1]], self.stale_ids[params[-1]:]
+            self._result = [{'id': i} for i in batch]
+        elif 'INFORMATION_SCHEMA.PARTITIONS' in sql:
+            self._result = [{'name': n} for n in self.partitions.get(params[0], [])]
+        elif sql.startswith('SELECT 1 FROM japa_sessions PARTITION'):
+            name = sql.split('(')[1].split(')')[0]
+            self._result = [{'1': 1}] if name in self.nonempty else []
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+
+def test_pass_is_skipped_when_another_worker_holds_the_lock():
+    db = ScriptedDB(lock=0, idle=5)
+    assert JapaJanitor(None).run_once(db) is None
+    assert db.statements == ["SELECT GET_LOCK('japa_janitor', 0) AS got"]
+
+
+def test_pass_closes_archives_in_batches_and_rolls_partitions():
+    db = ScriptedDB(idle=5, stale_ids=range(1, 6), nonempty={'p202608'}, partitions={
+        'japa_sessions': ['p_old', 'p202607', 'p202608', 'p202609', 'p202610', 'pmax'],
+        'japa_daily_counts': ['p_old', 'p202606', 'p202610', 'p202611', 'p202612', 'pmax'],
+    })
+    janitor = JapaJanitor(None, batch=2, daily_retention_months=3)
+    done = janitor.run_once(db, today=date(2026, 10, 17))
+
+    assert done == {'closed': 5, 'purged': 0, 'archived': 5, 'partitions_added': 2, 'partitions_dropped': 3}
+    copies = [s for s in db.statements if s.startswith('INSERT IGNORE INTO japa_sessions_history')]
+    assert len(copies) == 3   # batches of 2, 2, 1 - each copy + delete in its own commit
+
+    alters = [s for s in db.statements if s.startswith('ALTER TABLE')]
+    assert alters == [
+        "ALTER TABLE japa_sessions REORGANIZE PARTITION pmax INTO "
+        "(PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')), "
+        "PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')), "
+        "PARTITION pmax VALUES LESS THAN (MAXVALUE))",
+        "ALTER TABLE japa_sessions DROP PARTITION p202607",   # p202608 still has rows, p202610 is current
+        "ALTER TABLE japa_sessions DROP PARTITION p202609",
+        "ALTER TABLE japa_daily_counts DROP PARTITION p202606",  # older than 3 months
+    ]
+    assert db.statements[-1] == "SELECT RELEASE_LOCK('japa_janitor')"
+    assert janitor.stats()['archived'] == 5
+
+
+def test_first_partitioning_starts_at_this_month():
+    ddl = partition_ddl('japa_daily_counts', date(2026, 12, 5))
+    assert "PARTITION p_old VALUES LESS THAN ('2026-12-01')" in ddl
+    assert "PARTITION p202702 VALUES LESS THAN ('2027-03-01')" in ddl
+    assert ddl.endswith("PARTITION pmax VALUES LESS THAN (MAXVALUE)\n)")
+
+
+def test_only_anonymous_uuid_tokens_are_purged():
+    assert ANONYMOUS == f"user_id REGEXP '{ANONYMOUS_TOKEN}'"
+    assert re.match(ANONYMOUS_TOKEN, str(uuid.uuid4()))
+    for signed_in in ('42', 'bhaktgan:42', 'bhaktgan:7c9e6679'):
+        assert not re.match(ANONYMOUS_TOKEN, signed_in)
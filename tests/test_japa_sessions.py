@@ -0,0 +1,143 @@
+from datetime import date
+
+from flask import Flask
+
+import routes.japa as japa
+from utils.japa_sessions import JapaSessionCache
+from tests.conftest import FakeConn, RecordingCursor
+
+
+ROW = {'id': 5, 'total_count': 100, 'current_pattern_position': 1, 'current_repetition_count': 1}
+STALE_UPDATE = 'UPDATE japa_sessions'   # a session UPDATE that finds the row moved on
+
+
+def session_conn(stale_updates=0):
+    return FakeConn(one=[('', ROW)], misses=[STALE_UPDATE] * stale_updates)
+
+
+def test_words_are_written_every_n_and_on_a_finished_round():
+    cache = JapaSessionCache(round_words=16, connect=None, max_unsaved_words=4, idle_seconds=3600)
+    cursor, loads, due_at = RecordingCursor(), [], []
+    today = date(2026, 10, 17)
+
+    for word in range(1, 11):
+        with cache.session('user-a', lambda: loads.append(1) or ROW) as entry:
+            if cache.count_word(entry, 1, 1, completed_round=(word == 6), japa_date=today):
+                due_at.append(word)
+                cache.write(cursor, entry)
+                cache.written(entry)
+            assert entry.unsaved_words < 4
+
+    assert len(loads) == 1 and due_at == [4, 6, 10]
+    updates = [params for sql, params in cursor.statements if sql.startswith('UPDATE japa_sessions')]
+    assert [params[0] for params in updates] == [104, 106, 110]
+    (sql, params), = [s for s in cursor.statements if 'japa_daily_counts' in s[0]]
+    assert params == ['user-a', today, 1, 16]
+    (sql, params), = [s for s in cursor.statements if 'japa_user_totals' in s[0]]
+    assert params == ('user-a', 1, 16, today, 1, 16)   # same transaction as the daily upsert
+
+
+def test_rounds_across_midnight_add_to_lifetime_and_latest_day():
+    cache = JapaSessionCache(round_words=16, connect=None, max_unsaved_words=100, idle_seconds=3600)
+    cursor = RecordingCursor()
+    with cache.session('user-m', lambda: ROW) as entry:
+        cache.count_word(entry, 1, 1, True, date(2026, 10, 16), round_words=16)
+        cache.count_word(entry, 1, 1, True, date(2026, 10, 17), round_words=20)
+        cache.count_word(entry, 1, 1, True, date(2026, 10, 17), round_words=20)
+        cache.write(cursor, entry)
+        assert cache.written(entry) == 3
+
+    daily, totals = [params for sql, params in cursor.statements if sql.startswith('INSERT')]
+    assert daily == ['user-m', date(2026, 10, 16), 1, 16, 'user-m', date(2026, 10, 17), 2, 40]
+    assert totals == ('user-m', 3, 56, date(2026, 10, 17), 2, 40)
+
+
+def test_idle_sessions_are_written_and_dropped():
+    conn = session_conn()
+    cache = JapaSessionCache(round_words=16, connect=lambda: conn, max_unsaved_words=10, idle_seconds=3600)
+    with cache.session('user-b', lambda: ROW) as entry:
+        cache.count_word(entry, 1, 2, completed_round=False, japa_date=date(2026, 10, 17))
+
+    assert cache.flush_idle() == 0  # not idle yet
+    assert cache.flush_idle(max_idle=0) == 1
+    assert conn.commits == 1 and cache.peek('user-b') is None
+    assert entry.evicted and not entry.dirty
+    with cache.session('user-b', lambda: None) as entry:
+        assert entry is None
+
+
+def client_for(monkeypatch, conn, user_token, max_unsaved_words=10):
+    monkeypatch.setattr(japa, 'get_db_connection', lambda: conn)
+    monkeypatch.setattr(japa, 'japa_sessions', JapaSessionCache(
+        japa.TOTAL_UTTERANCES, connect=lambda: conn, max_unsaved_words=max_unsaved_words, idle_seconds=3600))
+    monkeypatch.setattr(japa.mantra_patterns, 'enabled', False)   # built-in pattern
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(japa.japa_bp)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['japa_user_token'] = user_token
+    return client
+
+
+def test_a_write_against_a_moved_row_writes_nothing_and_reloads():
+    cache = JapaSessionCache(round_words=16, connect=None, max_unsaved_words=2, idle_seconds=3600)
+    cursor = RecordingCursor(misses=[STALE_UPDATE])
+    with cache.session('user-s', lambda: ROW) as entry:
+        cache.count_word(entry, 1, 1, True, date(2026, 10, 17))
+        assert cache.write(cursor, entry) is False   # another worker wrote (or ended) the row
+        cache.discard_stale(entry)
+    assert [sql.split()[0] for sql, _ in cursor.statements] == ['UPDATE']   # no round credited
+    sql, params = cursor.statements[0]
+    assert 'session_active = 1 AND total_count = %s' in sql and params[-1] == 100
+
+    moved = dict(ROW, total_count=107, current_pattern_position=4)
+    with cache.session('user-s', lambda: moved) as entry:
+        assert (entry.total_count, entry.pattern_position) == (107, 4)
+    assert cache.stats()['conflicts'] == 1 and cache.stats()['dropped_words'] == 1
+
+
+def test_write_through_rereads_the_row_on_every_request():
+    cache = JapaSessionCache(round_words=16, connect=None, max_unsaved_words=1, idle_seconds=3600)
+    rows = [ROW, ROW, dict(ROW, total_count=120)]
+    for row in rows:
+        with cache.session('user-w', lambda: row) as entry:
+            pass
+    assert entry.total_count == 120 and cache.stats()['loads'] == 2
+
+
+def test_a_word_is_replayed_when_another_worker_moved_the_session(monkeypatch):
+    conn = session_conn(stale_updates=1)
+    client = client_for(monkeypatch, conn, 'user-replay', max_unsaved_words=1)
+    data = client.post('/api/japa/update_count', json={'word': 'radhe'}).get_json()
+
+    assert data['matched'] and data['new_count'] == 101
+    updates = [params for sql, params in conn.statements
+               if sql.startswith('UPDATE')]
+    assert len(updates) == 2 and conn.commits == 1   # stale write rolled back, replay committed
+
+
+def test_a_phrase_is_counted_with_one_write(monkeypatch):
+    conn = session_conn()
+    client = client_for(monkeypatch, conn, 'user-batch')
+
+    round_words = [item['word'] for item in japa.MANTRA_PATTERN for _ in range(item['repetitions'])]
+    response = client.post('/api/japa/update_count_batch', json={'words': ['hello'] + round_words + ['radhe']})
+    data = response.get_json()
+
+    assert response.status_code == 200 and data['matched_count'] == japa.TOTAL_UTTERANCES + 1
+    assert data['completed_rounds'] == 1 and data['new_count'] == 101 + japa.TOTAL_UTTERANCES
+    assert data['results'][0]['matched'] is False and data['current_word_index'] == 2
+    statements = [sql.split()[0] for sql, _ in conn.statements]
+    assert statements == ['SELECT', 'UPDATE', 'INSERT', 'INSERT'] and conn.commits == 1
+
+
+def test_words_between_write_backs_cost_no_round_trip(monkeypatch):
+    conn = session_conn()
+    client = client_for(monkeypatch, conn, 'user-default')
+    for word in ('radhe', 'krishna'):
+        assert client.post('/api/japa/update_count', json={'word': word}).get_json()['matched']
+
+    statements = [sql.split()[0] for sql, _ in conn.statements]
+    assert statements == ['SELECT'] and conn.commits == 0   # one load, the second word is free
+    assert japa.japa_sessions.peek('user-default').unsaved_words == 2
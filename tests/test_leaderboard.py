@@ -0,0 +1,199 @@
+from utils.leaderboard import LeaderboardCache
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.acquired = 1   # GET_LOCK result
+
+    def execute(self, sql, params=None):
+        self.statements.append(' '.join(sql.split()))
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return {'acquired': self.acquired}
+
+
+def progress(bhaktgan_id, count):
+    return {'bhaktgan_id': bhaktgan_id, 'name': f'B{bhaktgan_id}', 'city': 'Pune',
+            'count': count, 'total_malas': count // 108, 'last_spoken_at': None}
+
+
+def test_only_saves_that_can_enter_the_board_trigger_a_refresh():
+    cache = LeaderboardCache('harijap_progress', 'harijap_leaderboard', size=2, refresh_seconds=0)
+    cursor = FakeCursor([progress(1, 500), progress(2, 300)])
+    assert cache.maybe_refresh(cursor)  # cold start
+    assert cursor.statements[1].startswith('REPLACE INTO harijap_leaderboard')
+    assert cache.stats()['cutoff'] == 300
+
+    cache.note_saves([120, 299])
+    assert not cache.maybe_refresh(cursor)
+    assert cache.stats()['skipped_saves'] == 2
+
+    cache.note_saves([301])
+    assert cache.maybe_refresh(cursor)
+
+
+def test_refresh_is_rate_limited():
+    cache = LeaderboardCache('harijap_progress', 'harijap_leaderboard', size=2, refresh_seconds=60)
+    cursor = FakeCursor([progress(1, 500)])
+    cache.rebuild(cursor)
+    assert cache.stats()['cutoff'] == 1  # free slots admit any count
+
+    cache.note_saves([10])
+    assert not cache.maybe_refresh(cursor)
+    assert cache.stats()['dirty']
+
+
+def test_timer_refreshes_a_dirty_board_under_the_deployment_lock():
+    class FakeConn:
+        commits = closed = 0
+
+        def __init__(self, rows, acquired=1):
+            self.rows = rows
+            self.acquired = acquired
+            self.cursors = []
+
+        def cursor(self, _cls=None):
+            cursor = FakeCursor(self.rows)
+            cursor.acquired = self.acquired
+            cursor.close = lambda: None
+            self.cursors.append(cursor)
+            return cursor
+
+        def commit(self):
+            self.commits += 1
+
+        def close(self):
+            self.closed += 1
+
+    rows = [progress(1, 500), progress(2, 300)]
+    conn = FakeConn(rows)
+    cache = LeaderboardCache('harijap_progress', 'harijap_leaderboard', size=2, refresh_seconds=0,
+                             connect=lambda: conn)
+    cache.rebuild(FakeCursor(rows))
+    cache.refresh_from_timer()
+    assert conn.closed == 0  # clean board: no connection taken
+
+    cache._dirty = True  # a save that reached the board, as note_saves() marks it
+    busy = FakeConn(rows, acquired=0)
+    cache.connect = lambda: busy
+    cache.refresh_from_timer()
+    assert busy.commits == 0 and cache.stats()['dirty'] and cache.stats()['lock_skips'] == 1
+    assert len(busy.cursors[0].statements) == 1   # another worker holds the lock: nothing rebuilt
+
+    cache.connect = lambda: conn
+    cache.refresh_from_timer()
+    statements = conn.cursors[0].statements
+    assert statements[0].startswith('SELECT GET_LOCK') and statements[-1].startswith('SELECT RELEASE_LOCK')
+    assert conn.commits == 1 and conn.closed == 1
+    assert cache.stats()['timer_refreshes'] == 1 and not cache.stats()['dirty']
+
+
+def test_rank_snapshot_matches_leaderboard_order():
+    import random
+    from array import array
+    from utils.leaderboard import RankSnapshot
+
+    rng = random.Random(7)
+    users = [(rng.randint(1, 50), bhaktgan_id) for bhaktgan_id in range(1, 2001)]
+    snapshot = RankSnapshot('harijap_progress')
+    snapshot.replace(array('q', sorted(RankSnapshot.key(c, i) for c, i in users)))
+
+    # Leaderboard order: count DESC, bhaktgan_id DESC
+    ordered = sorted(users, reverse=True)
+    for position in (0, 1, 500, 1999):
+        count, bhaktgan_id = ordered[position]
+        assert snapshot.rank(count, bhaktgan_id) == position + 1
+
+    assert snapshot.rank(0, 5) is None
+    assert snapshot.rank(10_000, 99_999) == 1  # fresh count above everyone
+
+
+def test_rank_snapshot_loads_in_the_background_once():
+    import threading
+    import time
+    from array import array
+    from utils.leaderboard import RankSnapshot
+
+    scanning, release = threading.Event(), threading.Event()
+    loads = []
+
+    class Conn:
+        def close(self):
+            pass
+
+    snapshot = RankSnapshot('harijap_progress', max_age=3600, connect=Conn)
+
+    def slow_load(conn):
+        loads.append(conn)
+        scanning.set()
+        release.wait(5)
+        snapshot.replace(array('q', [RankSnapshot.key(5, 1), RankSnapshot.key(9, 2)]))
+
+    snapshot.load = slow_load
+    assert snapshot.ensure_fresh() is False and scanning.wait(5)   # cold: request is not blocked
+    assert snapshot.ensure_fresh() is False and len(loads) == 1    # no second scan meanwhile
+
+    class IndexCursor(FakeCursor):
+        def fetchone(self):
+            return {'total': 2, 'above': 1}
+
+    cursor = IndexCursor([])
+    assert snapshot.rank_from_index(cursor, 5, 1) == (2, 2)
+    assert 'SUM(count > %s' in cursor.statements[0]
+
+    release.set()
+    for _ in range(500):
+        if snapshot.ready():
+            break
+        time.sleep(0.01)
+    assert snapshot.ensure_fresh() and snapshot.rank(5, 1) == 2 and len(loads) == 1
+
+
+def test_page_cursor_round_trip():
+    import pytest
+    from utils.leaderboard import decode_cursor, encode_cursor
+
+    assert decode_cursor(encode_cursor({'count': 1080, 'bhaktgan_id': 42}, 51)) == (1080, 42, 51)
+    with pytest.raises(ValueError):
+        decode_cursor('1080:42')
+
+
+def test_city_rollup_deltas_follow_the_greatest_upsert():
+    from utils.rollups import CityRollup
+
+    rollup = CityRollup('harijap_progress', 'harijap_city_rollup')
+    previous = {
+        1: {'bhaktgan_id': 1, 'city': 'Pune', 'count': 100, 'total_malas': 1},
+        2: {'bhaktgan_id': 2, 'city': 'Pune', 'count': None, 'total_malas': None},  # first save
+        3: {'bhaktgan_id': 3, 'city': 'Nashik', 'count': 500, 'total_malas': 4},
+        4: {'bhaktgan_id': 4, 'city': '', 'count': 10, 'total_malas': 0},
+    }
+    states = [
+        {'bhaktgan_id': 1, 'count': 150, 'total_malas': 1},
+        {'bhaktgan_id': 2, 'count': 20, 'total_malas': 0},
+        {'bhaktgan_id': 3, 'count': 400, 'total_malas': 4},  # stale client, never decreases
+        {'bhaktgan_id': 4, 'count': 50, 'total_malas': 0},
+    ]
+    assert rollup.deltas(previous, states) == {'Pune': (1, 70, 0)}
+
+    # A multi-day batch carries several states for one user: counted once
+    batch = [{'bhaktgan_id': 1, 'count': 130, 'total_malas': 1}, {'bhaktgan_id': 1, 'count': 150, 'total_malas': 1}]
+    assert rollup.deltas(previous, batch) == {'Pune': (0, 50, 0)}
+
+
+def test_global_counter_counts_words_per_ist_day():
+    from utils.counters import words_added
+
+    previous = {1: {'count': 1000}, 2: {'count': None}}
+    states = [
+        {'bhaktgan_id': 1, 'count': 1040, 'today_date': '2025-01-06'},
+        {'bhaktgan_id': 1, 'count': 1025, 'today_date': '2025-01-05'},  # offline batch, before midnight
+        {'bhaktgan_id': 2, 'count': 15, 'today_date': '2025-01-06'},
+    ]
+    assert words_added(previous, states) == {'2025-01-05': 25, '2025-01-06': 30}
+    assert words_added(previous, [{'bhaktgan_id': 1, 'count': 900, 'today_date': '2025-01-06'}]) == {}
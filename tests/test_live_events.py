@@ -0,0 +1,33 @@
+import threading
+
+from utils.live_events import Broadcaster, GLOBAL_TOPIC, format_sse
+
+
+def test_publish_reaches_topic_subscribers_only():
+    hub = Broadcaster('test-live')
+    mine = hub.subscribe([('user', 1)])
+    other = hub.subscribe([('user', 2)])
+
+    assert hub.publish(('user', 1), 'changed') == 1
+    assert hub.publish(GLOBAL_TOPIC, 'tick', {'global_today': 5}) == 2
+    assert mine.get(timeout=0) == [('changed', None), ('tick', {'global_today': 5})]
+    assert other.get(timeout=0) == [('tick', {'global_today': 5})]
+    assert hub.stats()['open_streams'] == 2
+
+    hub.unsubscribe(mine)
+    hub.unsubscribe(other)
+    assert hub.stats()['open_streams'] == 0 and hub.publish(('user', 1), 'changed') == 0
+
+
+def test_waiting_subscriber_wakes_on_publish():
+    hub = Broadcaster('test-live-wait')
+    sub = hub.subscribe([('user', 1)], kind='poll')
+    threading.Timer(0.05, hub.publish, (('user', 1), 'changed')).start()
+
+    assert sub.get(timeout=5) == [('changed', None)]
+    hub.unsubscribe(sub, kind='poll')
+    assert hub.stats()['long_polls'] == 1
+
+
+def test_sse_frame():
+    assert format_sse('tick', {'global_today': 7}) == 'event: tick\ndata: {"global_today": 7}\n\n'
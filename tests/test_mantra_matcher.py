@@ -0,0 +1,44 @@
+import pytest
+
+from utils.mantra_matcher import MantraWordMatcher, normalize
+
+matcher = MantraWordMatcher(['radhe', 'krishna', 'shyam', 'shyama'])
+
+
+def test_strict_words_and_scores():
+    assert matcher.match('Radhe!', 'radhe') == (True, 1.0)
+    assert matcher.match('राधे।', 'radhe') == (True, 1.0)
+    assert matcher.match('कृष्ण', 'krishna')[0]
+    assert matcher.match('krishn', 'krishna') == (True, 12 / 13)   # one dropped letter
+    assert matcher.match('radhi', 'radhe') == (False, 0.8)
+    # never across shyam / shyama, in either script
+    assert not matcher.is_match('shyamah', 'shyama') and not matcher.is_match('shyama', 'shyam')
+    assert not matcher.is_match('श्याम', 'shyama') and not matcher.is_match('श्यामा', 'shyam')
+    assert normalize('श्याम') != normalize('श्यामा')
+
+
+def test_recognizer_spellings():
+    # (heard, expected, verdict) for what hi-IN / en-IN recognizers return
+    cases = [
+        ('Radhe,', 'radhe', True), ('radhey', 'radhe', True), ('राधे', 'radhe', True),
+        ('राधा', 'radhe', False), ('ready', 'radhe', False), ('krishna', 'radhe', False),
+        ('Krishna.', 'krishna', True), ('कृष्णा', 'krishna', True), ('krsna', 'krishna', True),
+        ('christina', 'krishna', False), ('kishan', 'krishna', False),
+        ('Shyam', 'shyam', True), ('sham', 'shyam', True), ('shyama', 'shyam', False),
+        ('श्यामा', 'shyam', False), ('shyamaa', 'shyama', True), ('श्यामा', 'shyama', True),
+        ('श्याम', 'shyama', False), ('shyamala', 'shyama', False),
+    ]
+    assert [(heard, expected) for heard, expected, verdict in cases
+            if matcher.is_match(heard, expected) != verdict] == []
+
+
+@pytest.mark.benchmark
+def test_compiled_matcher_words_per_second(record_property):
+    # same recognizer corpus as benchmarks/bench_mantra_matcher.py (Latin and Devanagari spellings)
+    from benchmarks import bench_mantra_matcher as bench
+
+    (_, before, _, _), (_, after, misses, _) = bench.run()
+    record_property('words_per_second', round(after))
+    record_property('speedup', round(after / before, 1))
+    assert after > 5 * before, f'{after:.0f} words/s compiled vs {before:.0f} per-call'
+    assert misses < 0.2
@@ -0,0 +1,67 @@
+from routes.japa import MANTRA_PATTERN, TOTAL_UTTERANCES
+from utils.mantra_patterns import CompiledMantra, MantraPatternCache
+
+FALLBACK = CompiledMantra('radhe-krishna', 'Radhe Krishna', 0, MANTRA_PATTERN)
+
+
+def test_compiled_pattern_walks_one_round():
+    mantra, position, repetition = FALLBACK, 1, 1
+    heard = []
+    for index in range(1, TOTAL_UTTERANCES + 1):
+        assert mantra.word_index(position, repetition) == index
+        heard.append(mantra.expected(position, repetition)['word_english'])
+        position, repetition, completed = mantra.advance(position, repetition)
+        assert completed == (index == TOTAL_UTTERANCES)
+
+    assert heard == [w['word_english'] for w in mantra.display_words]
+    assert mantra.round_length == TOTAL_UTTERANCES and (position, repetition) == (1, 1)
+    assert mantra.expected(99, 1)['pattern_position'] == 1  # stale position from an older pattern
+
+
+def test_devanagari_and_db_spellings_are_accepted():
+    mantra = CompiledMantra('om', 'Om Namah', 1, [
+        {'word': 'om', 'devanagari': 'ॐ', 'repetitions': 1},
+        {'word': 'namah', 'devanagari': 'नमः', 'repetitions': 1, 'spellings': 'namaha, नमह'},
+    ])
+    assert mantra.matcher.match('ॐ', 'om') == (True, 1.0)
+    assert mantra.matcher.is_match('नमः', 'namah') and mantra.matcher.is_match('Namaha', 'namah')
+    assert mantra.matcher.is_match('नमह', 'namah') and not mantra.matcher.is_match('ॐ', 'namah')
+
+
+class MantraDB:
+    def __init__(self):
+        self.version = 1
+        self.queries = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        words = sql.split()
+        self.queries.append(words[words.index('FROM') + 1])
+
+    def fetchone(self):
+        return {'id': 1, 'slug': 'radhe', 'name': 'Radhe', 'version': self.version}
+
+    def fetchall(self):
+        return [{'word_english': 'radhe', 'word_devanagari': 'राधे', 'repetitions': self.version}]
+
+    def close(self):
+        pass
+
+
+def test_recompiled_only_when_the_version_changes():
+    db = MantraDB()
+    cache = MantraPatternCache(lambda: db, FALLBACK, check_seconds=3600)
+
+    assert cache.current().round_length == 1
+    assert cache.current().slug == 'radhe' and db.queries == ['japa_mantras', 'japa_mantra_words']
+
+    cache.invalidate()
+    assert cache.current().version == 1 and db.queries[-1] == 'japa_mantras'   # same version: kept
+
+    db.version = 2
+    assert cache.current().round_length == 1   # within check_seconds: not re-read
+    cache.invalidate()
+    assert cache.current().round_length == 2
+    assert cache.stats()['compiles'] == 2 and cache.stats()['checks'] == 3
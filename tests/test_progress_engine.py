@@ -0,0 +1,149 @@
+import re
+import sqlite3
+
+import pytest
+
+from utils import progress_sync
+from utils.counters import ShardedCounter
+from utils.live_events import Broadcaster
+from utils.rollups import CityRollup
+from utils.progress_engine import ProgressEngine, fold_progress_events, state_from_payload
+from tests.conftest import FakeConn, RecordingCursor
+
+
+def pune_cursor():
+    # locked previous totals (and leaderboard / page reads) return one Pune row
+    return RecordingCursor(one=[('SELECT last_seq', {'last_seq': 0})],
+                            many=[('', [{'bhaktgan_id': 7, 'city': 'Pune', 'count': 500, 'total_malas': 4}])])
+
+
+def _engine(spec, **components):
+    return ProgressEngine(spec, connect=None, write_behind=False, **components)
+
+
+def test_one_upsert_shape_per_table():
+    state = state_from_payload({'count': 540, 'todayWords': 540, 'todaysCount': 540,
+                                'todayDate': '2025-01-06T10:00:00'}, 7, 'Test', '9876543210')
+    assert state['today_date'] == '2025-01-06'
+
+    for spec, has_words in ((progress_sync.HARIJAP, True), (progress_sync.GURU_MANTRA, False)):
+        engine, cursor, conn = _engine(spec), pune_cursor(), FakeConn()
+        engine.save(conn, cursor, [state, dict(state, bhaktgan_id=8)])
+
+        (sql, params), = cursor.statements  # nothing else enabled: one statement, one commit
+        assert sql.startswith(f'INSERT INTO {spec.table}') and conn.commits == 1
+        assert ('today_words' in sql) == has_words
+        assert len(params) == 2 * (12 if has_words else 11)
+        assert ('today_words' in engine.public_state(engine.read_state(pune_cursor(), 7))) == has_words
+
+
+def test_save_payloads_are_range_checked_and_never_dated_ahead():
+    def today_date(value):
+        return state_from_payload({'todayDate': value}, 7, 'Test', '', today='2025-01-06')['today_date']
+
+    assert today_date('2025-01-05') == '2025-01-05'
+    assert today_date('2025-01-09') == '2025-01-06'        # client clock ahead
+    assert today_date('Mon Jan 06 2025') == '2025-01-06'   # not YYYY-MM-DD
+    assert today_date('2025-02-30') == '2025-01-06'
+    for bad in ({'count': 2**31}, {'todayWords': -1}, {'totalMalas': 'lots'}, {'count': None}):
+        with pytest.raises(ValueError):
+            state_from_payload(bad, 7, 'Test', '')
+
+
+def test_v2_save_notifies_the_saving_user():
+    hub = Broadcaster('test-engine')
+    sub = hub.subscribe([('user', 7)])
+    engine, cursor, conn = _engine(progress_sync.GURU_MANTRA, live=hub), pune_cursor(), FakeConn()
+
+    _, ops = progress_sync.parse_ops({'client_id': 'tab', 'seq': 1, 'words': 5}, today='2025-01-06')
+    result = engine.apply_ops(conn, cursor, 7, 'Test', '9876543210', 'tab', ops)
+
+    assert result['applied'] == 1 and sub.get(timeout=0) == [('changed', None)]
+    assert result['state']['bhaktgan_id'] == 7 and engine.stats()['ops_applied'] == 1
+    engine.after_saved(conn, cursor, [{'count': 5}])   # the rows are committed: never raises
+    hub.unsubscribe(sub)
+
+
+def test_guru_mantra_aggregates_share_the_save_transaction():
+    rollup = CityRollup('guru_mantra_progress', 'guru_mantra_city_rollup')
+    counter = ShardedCounter('guru_mantra_global_daily', shards=4)
+    engine = _engine(progress_sync.GURU_MANTRA, rollup=rollup, counter=counter)
+    cursor, conn = pune_cursor(), FakeConn()
+
+    state = state_from_payload({'count': 540, 'totalMalas': 5, 'todaysCount': 40,
+                                'todayDate': '2025-01-06'}, 7, 'Test', '9876543210')
+    engine.save(conn, cursor, [state])
+
+    tables = [sql.split(' INTO ')[1].split()[0] if ' INTO ' in sql else 'lock' for sql, _ in cursor.statements]
+    assert tables == ['lock', 'guru_mantra_progress', 'guru_mantra_city_rollup', 'guru_mantra_global_daily']
+    assert cursor.statements[2][1] == ['Pune', 0, 40, 1] and cursor.statements[3][1][2] == 40
+    assert conn.commits == 1
+
+
+def run_in_sqlite(db, sql, params):
+    """
+    Run a progress upsert on SQLite. Its ON CONFLICT assignments all read the
+    old row, which matches MySQL here because today_date is assigned last.
+    """
+    sql = sql.replace('ON DUPLICATE KEY UPDATE', 'ON CONFLICT(bhaktgan_id) DO UPDATE SET')
+    sql = re.sub(r'VALUES\((\w+)\)', r'excluded.\1', sql)
+    sql = sql.replace('GREATEST(', 'MAX(').replace('NOW()', 'CURRENT_TIMESTAMP').replace('%s', '?')
+    db.execute(sql, params)
+
+
+def test_offline_days_land_on_their_own_dates():
+    db = sqlite3.connect(':memory:')
+    db.row_factory = sqlite3.Row
+    db.execute("""CREATE TABLE harijap_progress (bhaktgan_id INTEGER PRIMARY KEY, name, phone, count,
+                  total_malas, current_mala_pronunciations, total_pronunciations, today_words,
+                  today_pronunciations, today_malas, today_date, todays_count, last_spoken_at, updated_at)""")
+    engine = _engine(progress_sync.HARIJAP)
+
+    def save(states):
+        cursor = pune_cursor()
+        engine.save(FakeConn(), cursor, states)
+        for sql, params in cursor.statements:
+            run_in_sqlite(db, sql, params)
+
+    def payload(day, count, today, current):
+        return state_from_payload({'count': count, 'todayWords': today, 'todaysCount': today,
+                                   'currentMalaPronunciations': current, 'todayDate': day},
+                                  7, 'Test', '', today='2025-01-07')
+
+    save([payload('2025-01-05', 100, 100, 100)])   # stored D0
+    # an offline queue covering D1 and D2, folded as save_events does
+    save(fold_progress_events([payload('2025-01-06', 150, 50, 50), payload('2025-01-07', 180, 30, 30)]))
+
+    row = db.execute('SELECT * FROM harijap_progress').fetchone()
+    assert (row['today_date'], row['count'], row['today_words'], row['todays_count'],
+            row['current_mala_pronunciations']) == ('2025-01-07', 180, 30, 30, 30)
+
+    save([payload('2025-01-06', 190, 60, 60)])     # a stale tab from D1 leaves today alone
+    row = db.execute('SELECT * FROM harijap_progress').fetchone()
+    assert (row['today_date'], row['count'], row['today_words']) == ('2025-01-07', 190, 30)
+
+
+def test_leaderboard_pages_continue_from_the_cursor():
+    from utils.leaderboard import decode_cursor
+
+    engine, cursor = _engine(progress_sync.GURU_MANTRA), pune_cursor()
+    rows, next_cursor = engine.leaderboard_page(cursor, 1)
+    assert rows == [{'city': 'Pune', 'count': 500, 'total_malas': 4, 'rank': 1}]
+    assert 'FROM guru_mantra_progress' in cursor.statements[-1][0]
+    assert cursor.statements[-1][1] == (2**31, 2**31, 2**31, 1)   # first page: above every INT count
+
+    rows, _ = engine.leaderboard_page(cursor, 1, next_cursor)
+    assert decode_cursor(next_cursor) == (500, 7, 1) and rows[0]['rank'] == 2
+    assert cursor.statements[-1][1] == (500, 500, 7, 1)
+    with pytest.raises(ValueError):
+        engine.leaderboard_page(cursor, 1, 'not-a-cursor')
+
+
+def test_leaderboard_reads_never_rebuild_the_board():
+    from utils.leaderboard import LeaderboardCache
+
+    board = LeaderboardCache('guru_mantra_progress', 'guru_mantra_leaderboard', refresh_seconds=0)
+    engine, cursor = _engine(progress_sync.GURU_MANTRA, leaderboard=board), pune_cursor()
+    rows, _ = engine.leaderboard_page(cursor, 2)
+    assert len(rows) == 1 and board.stats()['dirty']   # served as is, left to the refresh timer
+    assert [sql.split(' FROM ')[1].split()[0] for sql, _ in cursor.statements] == ['guru_mantra_leaderboard']
@@ -0,0 +1,53 @@
+import pytest
+from utils import progress_sync
+from tests.conftest import FakeConn, RecordingCursor
+
+
+def scripted_cursor(last_seq):
+    """Answers the device lookup with a fixed last_seq and the progress read with a fixed row."""
+    return RecordingCursor(one=[('SELECT last_seq', {'last_seq': last_seq}),
+                                ('', {'count': 1000, 'total_malas': 9, 'total_pronunciations': 200})])
+
+
+def test_parse_ops_validates_and_sorts():
+    client_id, ops = progress_sync.parse_ops({'client_id': 'tab-1', 'ops': [
+        {'seq': 3, 'words': 5, 'pronunciations': 1},
+        {'seq': 2, 'delta': {'words': 10, 'pronunciations': 2, 'malas': 0}, 'date': '2025-01-05'},
+    ]}, today='2025-01-06')
+    assert client_id == 'tab-1'
+    assert [(op['seq'], op['date'], op['words']) for op in ops] == [(2, '2025-01-05', 10), (3, '2025-01-06', 5)]
+
+    for bad in ({'client_id': 'x y', 'seq': 1},
+                {'client_id': 'tab', 'seq': 0},
+                {'client_id': 'tab', 'seq': 1, 'words': -5},
+                {'client_id': 'tab', 'seq': 1, 'date': '2025-01-07'},
+                {'client_id': 'tab', 'ops': [{'seq': 1}, {'seq': 1}]}):
+        with pytest.raises(ValueError):
+            progress_sync.parse_ops(bad, today='2025-01-06')
+
+
+def test_retried_ops_are_not_applied_twice():
+    _, ops = progress_sync.parse_ops({'client_id': 'tab', 'ops': [
+        {'seq': 40, 'words': 5}, {'seq': 41, 'words': 5}, {'seq': 42, 'words': 7, 'pronunciations': 1},
+    ]}, today='2025-01-06')
+    cursor, conn = scripted_cursor(41), FakeConn()
+
+    result = progress_sync.apply_ops(conn, cursor, progress_sync.HARIJAP, 1, 'Test', '9876543210',
+                                     'tab', ops, today='2025-01-06')
+
+    assert (result['applied'], result['duplicates'], result['last_seq']) == (1, 2, 42)
+    upserts = [params for sql, params in cursor.statements if sql.startswith('INSERT INTO harijap_progress')]
+    assert len(upserts) == 1 and upserts[0][3] == 7  # only seq 42's words
+    assert conn.commits == 1
+
+
+def test_day_groups_are_applied_oldest_first():
+    _, ops = progress_sync.parse_ops({'client_id': 'tab', 'ops': [
+        {'seq': 1, 'words': 5, 'date': '2025-01-05'},
+        {'seq': 2, 'words': 3},
+        {'seq': 3, 'words': 2, 'date': '2025-01-05'},
+    ]}, today='2025-01-06')
+    assert progress_sync.group_by_date(ops) == [
+        ('2025-01-05', {'words': 7, 'pronunciations': 0, 'malas': 0}),
+        ('2025-01-06', {'words': 3, 'pronunciations': 0, 'malas': 0}),
+    ]
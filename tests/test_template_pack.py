@@ -0,0 +1,60 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+import build_template_pack
+from utils.template_pack import build_pack, read_pack
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DATA = {
+    'meta': {'phrase': 'राधे कृष्ण', 'sampleRate': 16000, 'nMels': 2},
+    'melFilterbank': [[0.0, 0.5, 1.0], [1.0, 0.25, 0.0]],
+    'templates': [[[1.5, -0.25], [-3.0, 0.5]], [[0.0, 2.0]]],
+}
+
+
+def test_pack_round_trip():
+    assert read_pack(build_pack(DATA)) == DATA   # all values exact in float16
+
+    pack = build_pack(DATA, 'int8')
+    assert len(pack) % 8 == 0
+    decoded = read_pack(pack)
+    assert decoded['meta'] == DATA['meta'] and decoded['melFilterbank'] == DATA['melFilterbank']
+    for template, original in zip(decoded['templates'], DATA['templates']):
+        for frame, expected in zip(template, original):
+            assert frame == pytest.approx(expected, abs=3.0 / 127 / 2)
+
+    with pytest.raises(ValueError):
+        build_pack(DATA, 'float64')
+    with pytest.raises(ValueError):
+        read_pack(b'{"meta": {}}')
+
+
+def test_packs_are_small_and_close_to_the_json_frames():
+    rng = random.Random(108)
+    data = {
+        'meta': DATA['meta'] | {'nMels': 40},
+        'melFilterbank': [[rng.random() for _ in range(257)] for _ in range(40)],
+        'templates': [[[rng.gauss(0, 1) for _ in range(40)] for _ in range(rng.randint(30, 60))]
+                      for _ in range(12)],
+    }
+    json_bytes = len(json.dumps(data).encode('utf-8'))
+    for dtype, tolerance in (('float16', 0.01), ('int8', 0.05)):
+        pack = build_pack(data, dtype)
+        decoded = read_pack(pack)
+        error = max(abs(a - b)
+                    for t_a, t_b in zip(data['templates'], decoded['templates'])
+                    for f_a, f_b in zip(t_a, t_b)
+                    for a, b in zip(f_a, f_b))
+        assert len(pack) < json_bytes / 4, dtype
+        assert error < tolerance, dtype
+
+
+def test_committed_pack_matches_templates_json():
+    # templateMatcher.js can load either file; the pack must be rebuilt whenever templates.json changes
+    data = json.loads((ROOT / build_template_pack.DEFAULT_SRC).read_text(encoding='utf-8'))
+    committed = (ROOT / build_template_pack.DEFAULT_OUT).read_bytes()
+    assert build_pack(data, 'float16') == committed, 'run python build_template_pack.py'
@@ -0,0 +1,101 @@
+from utils.write_behind import WriteBehindBuffer
+from utils.progress_engine import fold_progress_events, merge_progress_state
+
+
+def state(date, count, today_words, cmp=0):
+    return {
+        'bhaktgan_id': 1, 'name': 'Test', 'phone': '9876543210',
+        'count': count, 'total_malas': 0, 'total_pronunciations': count // 5,
+        'current_mala_pronunciations': cmp,
+        'today_words': today_words, 'today_pronunciations': 0, 'today_malas': 0,
+        'todays_count': today_words, 'today_date': date,
+    }
+
+
+def test_saves_coalesce_into_one_flush():
+    flushed = []
+    buffer = WriteBehindBuffer('test', flushed.append, max, flush_interval_ms=60000, max_batch=10)
+    for value in (3, 7, 5):
+        buffer.put('a', value)
+    buffer.put('b', 1)
+
+    assert buffer.stats()['depth'] == 2
+    assert buffer.flush() == 2
+    assert sorted(flushed[0]) == [('a', 7), ('b', 1)]
+    stats = buffer.stats()
+    assert stats['depth'] == 0 and stats['coalesced'] == 2 and stats['flushes'] == 1
+
+
+def test_failed_flush_is_requeued():
+    def failing(items):
+        raise RuntimeError('db down')
+
+    buffer = WriteBehindBuffer('test-fail', failing, max, flush_interval_ms=60000)
+    buffer.put('a', 3)
+    assert buffer.flush() == 0
+    buffer.put('a', 2)
+
+    assert buffer.pop('a') == 3
+    assert buffer.stats()['flush_errors'] == 1
+
+
+def test_a_poison_row_is_dropped_and_the_rest_written():
+    written = []
+
+    def flush(items):
+        if any(key == 'bad' for key, _ in items):
+            raise ValueError('Out of range value')
+        written.extend(items)
+
+    buffer = WriteBehindBuffer('test-poison', flush, max, flush_interval_ms=60000,
+                               is_transient=lambda e: isinstance(e, ConnectionError))
+    for key in ('a', 'bad', 'b'):
+        buffer.put(key, 1)
+
+    assert buffer.flush() == 2
+    assert sorted(written) == [('a', 1), ('b', 1)]
+    assert buffer.stats()['depth'] == 0 and buffer.stats()['dropped'] == 1
+
+
+def test_values_being_written_stay_visible():
+    buffer = WriteBehindBuffer('test-inflight', lambda items: seen.append(buffer.peek('a')), max,
+                               flush_interval_ms=60000)
+    seen = []
+    buffer.put('a', 3)
+    assert buffer.flush() == 1
+    assert seen == [3] and buffer.peek('a') is None   # visible until the flush returned
+
+
+def test_only_connection_loss_and_lock_conflicts_are_transient():
+    import pymysql
+    from utils.progress_engine import is_transient_db_error
+
+    assert is_transient_db_error(pymysql.err.OperationalError(2013, 'Lost connection'))
+    assert is_transient_db_error(pymysql.err.OperationalError(1213, 'Deadlock found'))
+    assert is_transient_db_error(pymysql.err.InterfaceError(0, ''))
+    assert not is_transient_db_error(pymysql.err.OperationalError(1054, "Unknown column 'x'"))
+    assert not is_transient_db_error(pymysql.err.DataError(1264, 'Out of range value'))
+
+
+def test_merge_never_decreases():
+    merged = merge_progress_state(state('2025-01-05', 100, 40, cmp=10), state('2025-01-05', 90, 30, cmp=4))
+    assert merged['count'] == 100
+    assert merged['today_words'] == 40
+    assert merged['current_mala_pronunciations'] == 4
+
+
+def test_merge_across_ist_rollover():
+    new_day = merge_progress_state(state('2025-01-05', 100, 40), state('2025-01-06', 105, 5))
+    assert (new_day['today_date'], new_day['today_words'], new_day['count']) == ('2025-01-06', 5, 105)
+
+    stale_tab = merge_progress_state(state('2025-01-06', 105, 5), state('2025-01-05', 110, 45))
+    assert (stale_tab['today_date'], stale_tab['today_words'], stale_tab['count']) == ('2025-01-06', 5, 110)
+
+
+def test_offline_queue_folds_per_ist_day():
+    queue = [state('2025-01-05', 100, 40), state('2025-01-05', 120, 60),
+             state('2025-01-06', 125, 5), state('2025-01-05', 110, 50), state('2025-01-06', 130, 10)]
+    days = fold_progress_events(queue)
+
+    assert [(d['today_date'], d['today_words'], d['count']) for d in days] == [
+        ('2025-01-05', 60, 120), ('2025-01-06', 10, 130)]
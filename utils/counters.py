@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+🔢 Sharded Daily Counters for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+A global "chanted today" total kept as `shards` rows per IST day instead of
+one. Every save batch adds its words to one randomly chosen shard, inside
+the batch's own transaction, so concurrent batches rarely wait on the same
+row lock. A single counter row would serialise every save in every worker
+behind one lock held until commit.
+
+Reading sums the day's shards (a primary-key range read of `shards` rows)
+and is cached per worker for `cache_seconds`, so a page full of viewers
+costs one query per worker per interval.
+
+    PYTHONPATH=. python benchmarks/bench_sharded_counter.py
+"""
+
+import time
+import random
+import logging
+import threading
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+
+def words_added(previous, states):
+    """
+    {today_date: words} added by upserting `states` over the locked
+    `previous` rows. Counts only grow by chanting, so the growth of the
+    lifetime count is the number of words chanted on the state's day.
+    Several states for one user (a multi-day batch) are taken oldest first.
+    """
+    totals = {}
+    running = {}
+    for state in sorted(states, key=lambda s: str(s['today_date'])):
+        user = state['bhaktgan_id']
+        if user not in running:
+            before = previous.get(user) or {}
+            running[user] = before.get('count') or 0
+        added = max(running[user], state['count']) - running[user]
+        running[user] += added
+        if added:
+            day = str(state['today_date'])
+            totals[day] = totals.get(day, 0) + added
+    return totals
+
+
+class ShardedCounter:
+    """Per-day counter spread over `shards` rows of one table"""
+
+    def __init__(self, table, shards=16, cache_seconds=5, enabled=True):
+        self.table = table
+        self.shards = max(1, shards)
+        self.cache_seconds = cache_seconds
+        self.enabled = enabled
+        self._cache = {}          # day -> (total, fetched_at)
+        self._lock = threading.Lock()
+        self._stats = {'increments': 0, 'reads': 0, 'cache_hits': 0}
+
+    def pick_shard(self):
+        return random.randrange(self.shards)
+
+    # ---------- save path ----------
+    def add(self, cursor, amounts):
+        """
+        Add {day: amount} in one statement, each day to a random shard.
+        Runs in the caller's transaction; caller commits.
+        """
+        amounts = {day: n for day, n in amounts.items() if n}
+        if not amounts:
+            return 0
+        placeholders = ", ".join(["(%s, %s, %s)"] * len(amounts))
+        params = []
+        for day, amount in sorted(amounts.items()):
+            params.extend((day, self.pick_shard(), amount))
+        try:
+            cursor.execute(f"""
+                INSERT INTO {self.table} (day, shard, words)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE words = words + VALUES(words)
+            """, params)
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                raise
+            self.enabled = False
+            logger.warning(f"{self.table} missing - global counter disabled until restart "
+                           f"(run run_global_counter_migration.py)")
+            return 0
+        with self._lock:
+            self._stats['increments'] += 1
+        return len(amounts)
+
+    # ---------- read path ----------
+    def read(self, cursor, day):
+        """Sum of the day's shards, cached for cache_seconds."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(day)
+            if cached and now - cached[1] < self.cache_seconds:
+                self._stats['cache_hits'] += 1
+                return cached[0]
+
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(words), 0) AS total
+            FROM {self.table}
+            WHERE day = %s
+        """, (day,))
+        total = int(cursor.fetchone()['total'])
+
+        with self._lock:
+            # only today's entry is ever read again
+            self._cache = {day: (total, now)}
+            self._stats['reads'] += 1
+        return total
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, shards=self.shards, cache_seconds=self.cache_seconds)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+📅 Daily History and Activity Streaks for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+A progress row only holds the current IST day: the save that rolls it over
+to a new date overwrites today_words / today_malas / todays_count. Just
+before that happens the old day is copied into a daily table keyed by
+(bhaktgan_id, day), and its bit is set in a per-user activity bitmap.
+
+The bitmap is stored as one BIGINT UNSIGNED per 64 days:
+
+    (bhaktgan_id, word_idx) -> bits      bit i = EPOCH + 64 * word_idx + i
+
+so setting a bit is an additive `bits | VALUES(bits)` upsert (no read),
+and a streak is computed from a primary-key range read of days/64 rows.
+
+A save that writes several days at once (an offline queue folded into
+one upsert, or v2 ops for several dates) also archives every day except
+the last, which never becomes the stored row for long.
+
+The save path only archives users whose stored day may be older than
+today; each worker remembers who is already on today's date, so after
+the first save of the day this costs nothing. run_harijap_daily_rollover.py
+archives everyone else after IST midnight (both are idempotent).
+"""
+
+import logging
+from datetime import date, timedelta
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+EPOCH = date(2020, 1, 1)
+WORD_BITS = 64
+FULL_WORD = (1 << WORD_BITS) - 1
+MAX_HISTORY_DAYS = 366
+
+DAILY_FIELDS = ('words', 'pronunciations', 'malas', 'todays_count')
+
+
+def day_index(day):
+    return (day - EPOCH).days
+
+
+class DailyHistory:
+    """Per-day history and activity bitmap archived from one progress table"""
+
+    def __init__(self, progress_table, daily_table, activity_table, enabled=True):
+        self.progress_table = progress_table
+        self.daily_table = daily_table
+        self.activity_table = activity_table
+        self.enabled = enabled
+        self._current_day = None
+        self._current = set()    # users whose stored today_date is known to be current
+
+    # ---------- save path ----------
+    def archive_rollover(self, cursor, bhaktgan_ids, today):
+        """
+        Copy the stored day of these users into the history if it is older
+        than `today`, before the caller's upsert rolls the rows over.
+        Runs inside the caller's transaction; returns rows archived.
+        """
+        ids = sorted(set(bhaktgan_ids) - self._current_for(today))
+        if not ids:
+            return 0
+        return self.archive_stored(cursor, ids, today)
+
+    def archive_stored(self, cursor, bhaktgan_ids, before):
+        """archive() for the save path: the stored days of these users older than `before`."""
+        return self._guarded(lambda: self.archive(cursor, before, bhaktgan_ids))
+
+    def archive_states(self, cursor, states):
+        """
+        Write the days of progress states straight into the history - the
+        earlier days of a multi-day save, which the same upsert rolls over.
+        Runs inside the caller's transaction; returns rows archived.
+        """
+        if not states:
+            return 0
+        return self._guarded(lambda: self._insert_states(cursor, states))
+
+    def _guarded(self, write):
+        try:
+            return write()
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                raise
+            self.enabled = False
+            logger.warning(f"{self.daily_table} missing - daily history disabled until restart "
+                           f"(run run_harijap_daily_rollover.py)")
+            return 0
+
+    def _insert_states(self, cursor, states):
+        rows, params, words = [], [], {}
+        for s in states:
+            day = s['today_date'] if isinstance(s['today_date'], date) else date.fromisoformat(str(s['today_date']))
+            rows.append("(%s, %s, %s, %s, %s, %s)")
+            params.extend((s['bhaktgan_id'], day, s.get('today_words', 0), s['today_pronunciations'],
+                           s['today_malas'], s['todays_count']))
+            if (s.get('today_words', 0) > 0 or s['todays_count'] > 0) and day >= EPOCH:
+                user_words = words.setdefault(s['bhaktgan_id'], {})
+                set_bit(user_words, day)
+
+        cursor.execute(f"""
+            INSERT INTO {self.daily_table} (bhaktgan_id, day, words, pronunciations, malas, todays_count)
+            VALUES {", ".join(rows)}
+            ON DUPLICATE KEY UPDATE
+                words = GREATEST(words, VALUES(words)),
+                pronunciations = GREATEST(pronunciations, VALUES(pronunciations)),
+                malas = GREATEST(malas, VALUES(malas)),
+                todays_count = GREATEST(todays_count, VALUES(todays_count))
+        """, params)
+        archived = cursor.rowcount
+
+        bits = [(bhaktgan_id, idx, word) for bhaktgan_id, user_words in sorted(words.items())
+                for idx, word in sorted(user_words.items())]
+        if bits:
+            cursor.execute(f"""
+                INSERT INTO {self.activity_table} (bhaktgan_id, word_idx, bits)
+                VALUES {", ".join(["(%s, %s, %s)"] * len(bits))}
+                ON DUPLICATE KEY UPDATE bits = bits | VALUES(bits)
+            """, [v for row in bits for v in row])
+        return archived
+
+    def _current_for(self, today):
+        if self._current_day != today:
+            self._current_day = today
+            self._current = set()
+        return self._current
+
+    def mark_current(self, states, today):
+        """After commit: users now stored on today's date need no archive until tomorrow."""
+        self._current_for(today).update(s['bhaktgan_id'] for s in states if str(s['today_date']) >= today)
+
+    def archive(self, cursor, today, bhaktgan_ids=None):
+        """
+        Copy every stored day older than `today` (optionally only for some
+        users) into the daily table and the activity bitmap. Two statements;
+        GREATEST keeps re-runs harmless. Caller commits.
+        """
+        where = "today_date IS NOT NULL AND today_date < %s"
+        params = [today]
+        if bhaktgan_ids is not None:
+            where += f" AND bhaktgan_id IN ({', '.join(['%s'] * len(bhaktgan_ids))})"
+            params.extend(bhaktgan_ids)
+
+        cursor.execute(f"""
+            INSERT INTO {self.daily_table} (bhaktgan_id, day, words, pronunciations, malas, todays_count)
+            SELECT bhaktgan_id, today_date, COALESCE(today_words, 0), COALESCE(today_pronunciations, 0),
+                   COALESCE(today_malas, 0), COALESCE(todays_count, 0)
+            FROM {self.progress_table}
+            WHERE {where}
+            ON DUPLICATE KEY UPDATE
+                words = GREATEST(words, VALUES(words)),
+                pronunciations = GREATEST(pronunciations, VALUES(pronunciations)),
+                malas = GREATEST(malas, VALUES(malas)),
+                todays_count = GREATEST(todays_count, VALUES(todays_count))
+        """, params)
+        archived = cursor.rowcount
+
+        cursor.execute(f"""
+            INSERT INTO {self.activity_table} (bhaktgan_id, word_idx, bits)
+            SELECT bhaktgan_id,
+                   DATEDIFF(today_date, %s) DIV {WORD_BITS},
+                   CAST(1 AS UNSIGNED) << MOD(DATEDIFF(today_date, %s), {WORD_BITS})
+            FROM {self.progress_table}
+            WHERE {where}
+              AND today_date >= %s
+              AND (today_words > 0 OR todays_count > 0)
+            ON DUPLICATE KEY UPDATE bits = bits | VALUES(bits)
+        """, [EPOCH, EPOCH] + params + [EPOCH])
+        return archived
+
+    # ---------- read path ----------
+    def read_days(self, cursor, bhaktgan_id, first_day, today):
+        """
+        {day: {words, pronunciations, malas, todays_count}} from first_day to
+        today: a primary-key range read of the history plus the live row.
+        """
+        cursor.execute(f"""
+            SELECT day, words, pronunciations, malas, todays_count
+            FROM {self.daily_table}
+            WHERE bhaktgan_id = %s AND day BETWEEN %s AND %s
+            UNION ALL
+            SELECT today_date, today_words, today_pronunciations, today_malas, todays_count
+            FROM {self.progress_table}
+            WHERE bhaktgan_id = %s AND today_date BETWEEN %s AND %s
+        """, (bhaktgan_id, first_day, today, bhaktgan_id, first_day, today))
+        days = {}
+        for row in cursor.fetchall():
+            day = row['day'] if isinstance(row['day'], date) else date.fromisoformat(str(row['day']))
+            seen = days.get(day)
+            values = {f: int(row[f] or 0) for f in DAILY_FIELDS}
+            # the live row and an early archive of the same day: keep the larger
+            days[day] = values if seen is None else {f: max(seen[f], values[f]) for f in DAILY_FIELDS}
+        return days
+
+    def read_activity(self, cursor, bhaktgan_id, today):
+        """
+        {word_idx: bits} for one user, with the live row's day ORed in.
+        One range read of days/64 bitmap rows plus one primary-key read.
+        """
+        cursor.execute(f"""
+            SELECT word_idx, bits FROM {self.activity_table}
+            WHERE bhaktgan_id = %s
+            ORDER BY word_idx
+        """, (bhaktgan_id,))
+        words = {row['word_idx']: int(row['bits']) for row in cursor.fetchall()}
+
+        cursor.execute(f"""
+            SELECT today_date FROM {self.progress_table}
+            WHERE bhaktgan_id = %s AND today_date <= %s AND (today_words > 0 OR todays_count > 0)
+        """, (bhaktgan_id, today))
+        row = cursor.fetchone()
+        if row and row['today_date']:
+            live = row['today_date']
+            set_bit(words, live if isinstance(live, date) else date.fromisoformat(str(live)))
+        return words
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 🔥 Streaks over the bitmap
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Each function touches every 64-bit word at most once; runs inside a
+# word are found with bit tricks, not by walking days.
+
+def set_bit(words, day):
+    i = day_index(day)
+    if i >= 0:
+        words[i // WORD_BITS] = words.get(i // WORD_BITS, 0) | (1 << (i % WORD_BITS))
+
+
+def is_active(words, day):
+    i = day_index(day)
+    return i >= 0 and bool(words.get(i // WORD_BITS, 0) >> (i % WORD_BITS) & 1)
+
+
+def _ones_below(word, top):
+    """Consecutive set bits from bit `top` downwards."""
+    zeros = ~word & ((1 << (top + 1)) - 1)
+    return top + 1 if not zeros else top + 1 - zeros.bit_length()
+
+
+def current_streak(words, today):
+    """
+    Consecutive active days ending today - or ending yesterday while today
+    has no japa yet, so a streak is not broken before the day is over.
+    """
+    day = today if is_active(words, today) else today - timedelta(days=1)
+    i = day_index(day)
+    if i < 0:
+        return 0
+    idx, top = divmod(i, WORD_BITS)
+    streak = 0
+    while idx >= 0:
+        run = _ones_below(words.get(idx, 0), top)
+        streak += run
+        if run < top + 1:
+            break
+        idx, top = idx - 1, WORD_BITS - 1
+    return streak
+
+
+def _longest_inside(word):
+    """Longest run of set bits in one word."""
+    length = 0
+    while word:
+        word &= word >> 1
+        length += 1
+    return length
+
+
+def longest_streak(words):
+    """Longest run of consecutive active days anywhere in the bitmap."""
+    best = run = 0
+    previous = None
+    for idx in sorted(words):
+        word = words[idx]
+        if previous is None or idx != previous + 1:
+            run = 0  # missing words are empty
+        previous = idx
+        if word == FULL_WORD:
+            run += WORD_BITS
+            best = max(best, run)
+            continue
+        low = (word ^ (word + 1)).bit_length() - 1        # set bits continuing the previous run
+        best = max(best, run + low, _longest_inside(word))
+        run = WORD_BITS - (~word & FULL_WORD).bit_length()  # set bits at the top carry over
+    return best
+
+
+def active_days(words):
+    return sum(bin(word).count('1') for word in words.values())
+
+
+def first_active_day(words):
+    for idx in sorted(words):
+        if words[idx]:
+            low = (words[idx] & -words[idx]).bit_length() - 1
+            return EPOCH + timedelta(days=idx * WORD_BITS + low)
+    return None
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+🏷️ Conditional GET (ETag / 304) for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Progress and stats endpoints are polled far more often than they change.
+Each resource key (e.g. "harijap_state:42") has a generation number that
+the write paths bump, and the ETag last served for that generation is
+remembered. When a request's If-None-Match equals the remembered ETag of
+the current generation the answer is a 304 straight from the cache,
+without a MySQL query or JSON serialisation.
+
+The ETag itself is a hash of the response body, so two workers (or a
+worker after a restart) that rebuild the same data agree on it and the
+client still gets a 304 - only after a query, counted as `revalidated`.
+
+Generations live in Redis when REDIS_URL is set, so a save in one worker
+invalidates every worker. Without Redis each worker keeps its own and
+trusts a remembered ETag for ETAG_LOCAL_TTL_SECONDS only, since saves
+handled by other workers cannot reach it.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+
+from flask import request, jsonify, make_response
+
+try:
+    import redis
+except ImportError:  # optional: per-worker cache only
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+ETAG_LOCAL_TTL_SECONDS = float(os.getenv("ETAG_LOCAL_TTL_SECONDS", 5))
+ETAG_REDIS_TTL_SECONDS = int(os.getenv("ETAG_REDIS_TTL_SECONDS", 86400))
+
+
+class ETagCache:
+    """Generation numbers and last-served ETags per resource key"""
+
+    def __init__(self, redis_url=REDIS_URL, local_ttl=ETAG_LOCAL_TTL_SECONDS,
+                 redis_ttl=ETAG_REDIS_TTL_SECONDS, prefix='etag'):
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.prefix = prefix
+        self._redis = None
+        if redis_url and redis is not None:
+            self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.2, decode_responses=True)
+        elif redis_url:
+            logger.warning("REDIS_URL set but the redis package is missing - ETags are per worker")
+        self._generations = {}     # key -> int
+        self._etags = {}           # key -> (generation, scope, etag, stored_at)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'invalidations': 0, 'errors': 0}
+
+    @property
+    def shared(self):
+        return self._redis is not None
+
+    # ---------- cache operations ----------
+    def lookup(self, key, scope):
+        """(generation, etag) for key; etag is None unless valid for this generation and scope."""
+        if self._redis is not None:
+            try:
+                generation, entry = self._redis.mget(f"{self.prefix}:gen:{key}", f"{self.prefix}:tag:{key}")
+                generation = int(generation or 0)
+                if entry:
+                    entry_gen, entry_scope, etag = entry.split('|', 2)
+                    if int(entry_gen) == generation and entry_scope == scope:
+                        return generation, etag
+                return generation, None
+            except Exception as e:
+                self.record('errors')
+                logger.warning(f"ETag cache lookup failed: {e}")
+                return None, None
+
+        with self._lock:
+            generation = self._generations.get(key, 0)
+            entry = self._etags.get(key)
+            if (entry and entry[0] == generation and entry[1] == scope
+                    and time.monotonic() - entry[3] < self.local_ttl):
+                return generation, entry[2]
+            return generation, None
+
+    def store(self, key, generation, scope, etag):
+        """Remember the ETag served for `generation` (ignored if a write bumped it meanwhile)."""
+        if generation is None:
+            return
+        if self._redis is not None:
+            try:
+                self._redis.set(f"{self.prefix}:tag:{key}", f"{generation}|{scope}|{etag}", ex=self.redis_ttl)
+            except Exception as e:
+                self.record('errors')
+                logger.warning(f"ETag cache store failed: {e}")
+            return
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                self._etags[key] = (generation, scope, etag, time.monotonic())
+
+    def invalidate(self, *keys):
+        """Called by write paths: the next request for these keys is rebuilt."""
+        self.record('invalidations', len(keys))
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for key in keys:
+                    pipe.incr(f"{self.prefix}:gen:{key}")
+                    pipe.expire(f"{self.prefix}:gen:{key}", self.redis_ttl)
+                pipe.execute()
+            except Exception as e:
+                self.record('errors')
+                logger.warning(f"ETag cache invalidate failed: {e}")
+            return
+        with self._lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._etags.pop(key, None)
+
+    # ---------- stats ----------
+    def record(self, field, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    def stats(self):
+        with self._lock:
+            answered = self._stats['hits'] + self._stats['revalidated'] + self._stats['misses']
+            return dict(
+                self._stats,
+                hit_ratio=round(self._stats['hits'] / answered, 3) if answered else 0.0,
+                not_modified_ratio=round(
+                    (self._stats['hits'] + self._stats['revalidated']) / answered, 3) if answered else 0.0,
+                shared=self.shared,
+                local_keys=len(self._etags),
+            )
+
+
+etag_cache = ETagCache()
+
+
+def body_etag(body):
+    return hashlib.sha1(body).hexdigest()[:20]
+
+
+def _not_modified(etag):
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional_json(key, scope, build, cache=None):
+    """
+    Answer a GET for resource `key` with ETag support.
+
+    `scope` is anything else the body depends on (usually the IST date).
+    `build()` returns (payload, status) exactly like a view would; only a
+    200 is cached. Returns a Flask response.
+    """
+    cache = cache or etag_cache
+    client_tags = request.if_none_match
+
+    generation, etag = cache.lookup(key, scope)
+    if etag and client_tags.contains(etag):
+        cache.record('hits')
+        return _not_modified(etag)
+
+    payload, status = build()
+    response = make_response(jsonify(payload), status)
+    if status != 200:
+        return response
+
+    etag = body_etag(response.get_data())
+    cache.store(key, generation, scope, etag)
+    if client_tags.contains(etag):
+        cache.record('revalidated')
+        return _not_modified(etag)
+
+    cache.record('misses')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+🧹 Japa Session Janitor for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+japa_sessions rows are only closed when the client calls
+/api/japa/end_session, and every anonymous visitor gets a fresh uuid
+token, so abandoned "active" sessions pile up. One pass, in batches of
+JAPA_JANITOR_BATCH rows with a commit per batch:
+
+    1. closes sessions idle for JAPA_SESSION_CLOSE_IDLE_MINUTES
+       (session_end = their last activity),
+    2. deletes closed anonymous sessions (user_id is the uuid4 token
+       /japa hands out without a login) after JAPA_ANONYMOUS_RETENTION_DAYS,
+    3. moves other closed sessions older than JAPA_SESSION_ARCHIVE_DAYS
+       into japa_sessions_history (ROW_FORMAT=COMPRESSED),
+    4. keeps the monthly partitions of japa_sessions and
+       japa_daily_counts two months ahead, drops japa_sessions partitions
+       that the archive has emptied, and drops japa_daily_counts months
+       older than JAPA_DAILY_RETENTION_MONTHS (0 = keep all; lifetime
+       stats come from japa_user_totals).
+
+Every worker runs a pass each JAPA_JANITOR_INTERVAL_SECONDS, but only the
+one holding the MySQL lock 'japa_janitor' does the work
+(run_japa_janitor.py runs one pass from cron; interval 0 leaves it to
+cron alone). The idle threshold must stay well above
+JAPA_SESSION_IDLE_SECONDS so no worker still holds a session it closes.
+Tables that are not partitioned yet (run_japa_janitor.py --partition)
+are simply not maintained.
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import date
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+JAPA_JANITOR_INTERVAL_SECONDS = float(os.getenv("JAPA_JANITOR_INTERVAL_SECONDS", 600))
+JAPA_SESSION_CLOSE_IDLE_MINUTES = int(os.getenv("JAPA_SESSION_CLOSE_IDLE_MINUTES", 60))
+JAPA_SESSION_ARCHIVE_DAYS = int(os.getenv("JAPA_SESSION_ARCHIVE_DAYS", 7))
+JAPA_ANONYMOUS_RETENTION_DAYS = int(os.getenv("JAPA_ANONYMOUS_RETENTION_DAYS", 1))
+JAPA_DAILY_RETENTION_MONTHS = int(os.getenv("JAPA_DAILY_RETENTION_MONTHS", 0))
+JAPA_JANITOR_BATCH = int(os.getenv("JAPA_JANITOR_BATCH", 1000))
+
+PARTITION_MONTHS_AHEAD = 2
+
+# Anonymous visitors get str(uuid.uuid4()) as japa_user_token (routes/japa.py). Signed-in
+# users are "42" (japa login) or "bhaktgan:42" (harijap login) and are always archived.
+ANONYMOUS_TOKEN = '^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$'
+ANONYMOUS = f"user_id REGEXP '{ANONYMOUS_TOKEN}'"
+
+SESSION_COLUMNS = ("id, user_id, session_start, session_end, last_updated, total_count, "
+                   "current_word_index, current_repetition_count")
+
+
+def add_months(month, n):
+    """First day of the month n months after `month` (a date)."""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_bound(table, month):
+    """VALUES LESS THAN expression for the partition holding `month`."""
+    upper = add_months(month, 1)
+    if table == 'japa_sessions':   # TIMESTAMP column: RANGE over UNIX_TIMESTAMP()
+        return f"UNIX_TIMESTAMP('{upper.isoformat()} 00:00:00')"
+    return f"'{upper.isoformat()}'"
+
+
+def partition_ddl(table, today, months_ahead=PARTITION_MONTHS_AHEAD):
+    """
+    PARTITION BY clause for the first partitioning: everything before this
+    month in p_old, one partition per month up to months_ahead, then pmax.
+    """
+    first = date(today.year, today.month, 1)
+    if table == 'japa_sessions':
+        head = "PARTITION BY RANGE (UNIX_TIMESTAMP(session_start))"
+        old = f"UNIX_TIMESTAMP('{first.isoformat()} 00:00:00')"
+    else:
+        head = "PARTITION BY RANGE COLUMNS (japa_date)"
+        old = f"'{first.isoformat()}'"
+    parts = [f"PARTITION p_old VALUES LESS THAN ({old})"]
+    for n in range(months_ahead + 1):
+        month = add_months(first, n)
+        parts.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ({partition_bound(table, month)})")
+    parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return head + " (\n    " + ",\n    ".join(parts) + "\n)"
+
+
+class JapaJanitor:
+    """Closes, archives and purges japa sessions; maintains the monthly partitions"""
+
+    def __init__(self, connect, interval_seconds=JAPA_JANITOR_INTERVAL_SECONDS,
+                 idle_minutes=JAPA_SESSION_CLOSE_IDLE_MINUTES, archive_days=JAPA_SESSION_ARCHIVE_DAYS,
+                 anonymous_days=JAPA_ANONYMOUS_RETENTION_DAYS,
+                 daily_retention_months=JAPA_DAILY_RETENTION_MONTHS, batch=JAPA_JANITOR_BATCH):
+        self.connect = connect              # () -> dedicated connection for a pass
+        self.interval_seconds = interval_seconds
+        self.idle_minutes = idle_minutes
+        self.archive_days = archive_days
+        self.anonymous_days = anonymous_days
+        self.daily_retention_months = daily_retention_months
+        self.batch = batch
+        self.enabled = True
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {'passes': 0, 'skipped': 0, 'errors': 0, 'closed': 0, 'purged': 0,
+                       'archived': 0, 'partitions_added': 0, 'partitions_dropped': 0}
+
+    # ---------- one pass ----------
+    def run_once(self, conn, today=None):
+        """One full pass on `conn`. Returns the counts, or None if another worker holds the lock."""
+        today = today or date.today()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK('japa_janitor', 0) AS got")
+            if not (cursor.fetchone() or {}).get('got'):
+                self._record('skipped')
+                return None
+            try:
+                done = {
+                    'closed': self._batched(conn, cursor, """
+                        UPDATE japa_sessions
+                        SET session_active = 0, session_end = last_updated, last_updated = last_updated
+                        WHERE session_active = 1 AND last_updated < NOW() - INTERVAL %s MINUTE
+                        LIMIT %s
+                    """, (self.idle_minutes,)),
+                    'purged': self._batched(conn, cursor, f"""
+                        DELETE FROM japa_sessions
+                        WHERE session_active = 0 AND {ANONYMOUS}
+                          AND COALESCE(session_end, last_updated) < NOW() - INTERVAL %s DAY
+                        LIMIT %s
+                    """, (self.anonymous_days,)),
+                    'archived': self._archive(conn, cursor),
+                }
+                added, dropped = self.maintain_partitions(conn, cursor, today)
+                done.update(partitions_added=added, partitions_dropped=dropped)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK('japa_janitor')")
+        finally:
+            cursor.close()
+
+        with self._lock:
+            self._stats['passes'] += 1
+            for field, n in done.items():
+                self._stats[field] += n
+        return done
+
+    def _batched(self, conn, cursor, sql, params):
+        """Repeat a LIMITed UPDATE/DELETE until it affects less than a batch."""
+        total = 0
+        while True:
+            cursor.execute(sql, params + (self.batch,))
+            affected = cursor.rowcount
+            conn.commit()
+            total += affected
+            if affected < self.batch:
+                return total
+
+    def _archive(self, conn, cursor):
+        """Copy closed sessions into japa_sessions_history and delete them, a batch per transaction."""
+        total = 0
+        while True:
+            cursor.execute("""
+                SELECT id FROM japa_sessions
+                WHERE session_active = 0 AND COALESCE(session_end, last_updated) < NOW() - INTERVAL %s DAY
+                ORDER BY id
+                LIMIT %s
+            """, (self.archive_days, self.batch))
+            ids = [row['id'] for row in cursor.fetchall()]
+            if not ids:
+                return total
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"""
+                INSERT IGNORE INTO japa_sessions_history ({SESSION_COLUMNS})
+                SELECT {SESSION_COLUMNS} FROM japa_sessions WHERE id IN ({placeholders})
+            """, ids)
+            cursor.execute(f"DELETE FROM japa_sessions WHERE id IN ({placeholders})", ids)
+            conn.commit()
+            total += len(ids)
+            if len(ids) < self.batch:
+                return total
+
+    # ---------- partitions ----------
+    def maintain_partitions(self, conn, cursor, today):
+        """Add the coming months' partitions and drop expired ones. Returns (added, dropped)."""
+        this_month = date(today.year, today.month, 1)
+        added = dropped = 0
+        for table in ('japa_sessions', 'japa_daily_counts'):
+            cursor.execute("""
+                SELECT PARTITION_NAME AS name FROM INFORMATION_SCHEMA.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            """, (table,))
+            names = {row['name'] for row in cursor.fetchall()}
+            if 'pmax' not in names:
+                continue  # not partitioned (yet)
+
+            ahead = [add_months(this_month, n) for n in range(PARTITION_MONTHS_AHEAD + 1)]
+            missing = [m for m in ahead if f"p{m:%Y%m}" not in names]
+            if missing:
+                parts = ", ".join(f"PARTITION p{m:%Y%m} VALUES LESS THAN ({partition_bound(table, m)})"
+                                  for m in missing)
+                cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO "
+                               f"({parts}, PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+                added += len(missing)
+
+            for name in sorted(names):
+                if name in ('p_old', 'pmax'):
+                    continue
+                month = date(int(name[1:5]), int(name[5:7]), 1)
+                if table == 'japa_sessions':
+                    # only once the archive has moved every row out
+                    if add_months(month, 1) > this_month:
+                        continue
+                    cursor.execute(f"SELECT 1 FROM japa_sessions PARTITION ({name}) LIMIT 1")
+                    if cursor.fetchone():
+                        continue
+                elif not self.daily_retention_months or \
+                        month >= add_months(this_month, -self.daily_retention_months):
+                    continue
+                cursor.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+                dropped += 1
+            conn.commit()
+        return added, dropped
+
+    # ---------- background pass ----------
+    def ensure_started(self):
+        """Start this process's janitor thread (no-op when interval is 0)."""
+        pid = os.getpid()
+        if not self.interval_seconds or (self._thread is not None and self._pid == pid):
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="japa-janitor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while self.enabled:
+            time.sleep(self.interval_seconds)
+            conn = None
+            try:
+                conn = self.connect()
+                self.run_once(conn)
+            except pymysql.err.ProgrammingError as e:
+                if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: japa_sessions_history not created yet
+                    self._failed(e)
+                    continue
+                self.enabled = False
+                logger.warning("japa_sessions_history missing - janitor stopped until restart "
+                               "(run run_japa_janitor.py)")
+            except Exception as e:
+                self._failed(e)
+            finally:
+                if conn:
+                    conn.close()
+
+    def _failed(self, error):
+        self._record('errors')
+        logger.error(f"Japa janitor pass failed: {error}")
+
+    def _record(self, field, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, enabled=self.enabled, interval_seconds=self.interval_seconds)
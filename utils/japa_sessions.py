@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+🪷 In-memory Japa Sessions for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+/api/japa/update_count is called once per spoken word. Instead of reading
+the active japa_sessions row, updating it and committing every time, each
+worker keeps the active session of its users in memory (position,
+repetition, count) and advances the state machine there.
+
+A session is written back (one UPDATE by primary key, plus the
+japa_daily_counts and japa_user_totals upserts for finished rounds, one
+commit) when:
+
+    - a round completes,
+    - JAPA_MAX_UNSAVED_WORDS words have been counted since the last write,
+    - the session ends, or
+    - it has been idle for JAPA_SESSION_IDLE_SECONDS (sweeper thread),
+      and on worker exit (atexit and the gunicorn worker_exit hook).
+
+With the default of 10, nine words in ten cost no database round trip.
+A crashed worker loses at most JAPA_MAX_UNSAVED_WORDS - 1 words of a round
+in progress; a finished round is written before its response. A failed
+write keeps the words pending and is retried with the next word (the
+bound only holds while the database accepts writes).
+
+Sessions are per worker. Each write is conditional on the row still
+holding the count this worker last read or wrote (and the session still
+being active); when another worker has moved the session on, or ended it,
+nothing is written, the stale copy and its unsaved words are dropped and
+the caller reloads the row and replays the current request. Counts never
+go backwards or double, so plain `gunicorn -w N` (prod.sh) is safe; the
+cost of requests that switch workers is lost words: each time a user's
+requests move to another worker, at most JAPA_MAX_UNSAVED_WORDS - 1 words
+the previous worker had not written yet are dropped. Behind sticky
+routing (or with a single worker) nothing is lost short of a crash.
+
+JAPA_MAX_UNSAVED_WORDS=1 is write-through: every request re-reads the
+row and every matched word is written, so nothing is ever dropped - at
+the price of the round trips this cache exists to save.
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+JAPA_MAX_UNSAVED_WORDS = max(1, int(os.getenv("JAPA_MAX_UNSAVED_WORDS", 10)))
+JAPA_SESSION_IDLE_SECONDS = float(os.getenv("JAPA_SESSION_IDLE_SECONDS", 300))
+
+_caches = []
+
+
+class JapaSession:
+    """A user's active session as held in memory"""
+
+    __slots__ = ('session_id', 'user_id', 'total_count', 'pattern_position', 'repetition_count',
+                 'persisted_count', 'pending_rounds', 'last_activity', 'evicted', 'lock')
+
+    def __init__(self, session_id, user_id, total_count, pattern_position, repetition_count):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.total_count = total_count
+        self.pattern_position = pattern_position
+        self.repetition_count = repetition_count
+        self.persisted_count = total_count
+        self.pending_rounds = {}        # japa_date -> [rounds, words] not yet in japa_daily_counts
+        self.last_activity = time.monotonic()
+        self.evicted = False
+        self.lock = threading.Lock()
+
+    @property
+    def unsaved_words(self):
+        return self.total_count - self.persisted_count
+
+    @property
+    def dirty(self):
+        return self.unsaved_words > 0 or bool(self.pending_rounds)
+
+    def matches(self, row):
+        """True while the japa_sessions row still holds what this copy last read or wrote."""
+        return int(row['id']) == self.session_id and int(row['total_count']) == self.persisted_count
+
+
+class JapaSessionCache:
+    """Active japa sessions of this worker, written back in batches of words"""
+
+    def __init__(self, round_words, connect, max_unsaved_words=JAPA_MAX_UNSAVED_WORDS,
+                 idle_seconds=JAPA_SESSION_IDLE_SECONDS):
+        self.round_words = round_words
+        self.connect = connect              # () -> dedicated connection for the sweeper
+        self.max_unsaved_words = max(1, max_unsaved_words)
+        self.write_through = self.max_unsaved_words == 1   # re-read the row on every request
+        self.idle_seconds = idle_seconds
+        self.user_totals = True             # japa_user_totals maintained (off until migrated)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'hits': 0,
+            'loads': 0,
+            'words': 0,
+            'writes': 0,
+            'write_errors': 0,
+            'idle_writes': 0,
+            'evicted': 0,
+            'conflicts': 0,
+            'dropped_words': 0,
+        }
+        _caches.append(self)
+
+    def _record(self, field, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    # ---------- entries ----------
+    def peek(self, user_id):
+        """The cached session (None if this worker holds none) - read-only use."""
+        with self._lock:
+            return self._entries.get(user_id)
+
+    def fresh(self, user_id, row):
+        """The cached session if it is still the state of `row` (else None)."""
+        entry = self.peek(user_id)
+        return entry if row and entry is not None and entry.matches(row) else None
+
+    def admit(self, user_id, row):
+        """Cache a session loaded from japa_sessions (a fetch_active_session row)."""
+        self._ensure_sweeper()
+        entry = JapaSession(int(row['id']), user_id, int(row['total_count']),
+                            int(row['current_pattern_position']), int(row['current_repetition_count']))
+        with self._lock:
+            current = self._entries.get(user_id)
+            if current is not None:
+                if current.matches(row):
+                    return current   # another request of the same user loaded it first
+                current.evicted = True   # an older session, or a copy the row has moved past
+                self._stats['conflicts'] += 1
+                self._stats['dropped_words'] += current.unsaved_words
+            self._entries[user_id] = entry
+            return entry
+
+    @contextmanager
+    def session(self, user_id, load):
+        """
+        Lock and yield the user's session, calling load() -> row or None on a
+        miss (in write-through mode on every call, dropping a cached copy the
+        row has moved past). Yields None when the user has no active session.
+        """
+        while True:
+            entry = self.peek(user_id)
+            if entry is None or self.write_through:
+                row = load()
+                if row is None:
+                    if entry is not None:
+                        self.discard_stale(entry)
+                    yield None
+                    return
+                if entry is not None and not entry.matches(row):
+                    self.discard_stale(entry)
+                    entry = None
+                if entry is None:
+                    entry = self.admit(user_id, row)
+                    self._record('loads')
+                else:
+                    self._record('hits')
+            else:
+                self._record('hits')
+            with entry.lock:
+                if entry.evicted:
+                    continue  # written back and dropped meanwhile: load again
+                entry.last_activity = time.monotonic()
+                yield entry
+                return
+
+    def evict(self, entry):
+        """Drop a session (caller holds entry.lock and has written it back)."""
+        entry.evicted = True
+        with self._lock:
+            if self._entries.get(entry.user_id) is entry:
+                del self._entries[entry.user_id]
+            self._stats['evicted'] += 1
+
+    def discard_stale(self, entry):
+        """
+        Drop a copy another worker has moved on (or ended); its unsaved words
+        were counted against an outdated position and are not written.
+        """
+        dropped = entry.unsaved_words
+        self.evict(entry)
+        with self._lock:
+            self._stats['conflicts'] += 1
+            self._stats['dropped_words'] += dropped
+        if dropped:
+            logger.warning(f"Japa session {entry.session_id} changed on another worker - "
+                           f"dropped {dropped} unsaved words (is routing sticky?)")
+
+    # ---------- state machine ----------
+    def count_word(self, entry, pattern_position, repetition_count, completed_round, japa_date,
+                   round_words=None):
+        """
+        Record one matched word (caller holds entry.lock); a completed round
+        counts round_words words (default: the cache's round length).
+        Returns True when the session is due to be written back.
+        """
+        entry.total_count += 1
+        entry.pattern_position = pattern_position
+        entry.repetition_count = repetition_count
+        if completed_round:
+            pending = entry.pending_rounds.setdefault(japa_date, [0, 0])
+            pending[0] += 1
+            pending[1] += self.round_words if round_words is None else round_words
+        self._record('words')
+        return bool(entry.pending_rounds) or entry.unsaved_words >= self.max_unsaved_words
+
+    # ---------- write-back ----------
+    def write(self, cursor, entry):
+        """
+        Write the session row and any finished rounds (caller holds
+        entry.lock and commits, then calls written()). Returns False without
+        writing anything when the row is no longer active at the count this
+        copy was based on; the caller then rolls back and calls
+        discard_stale().
+        """
+        cursor.execute("""
+            UPDATE japa_sessions
+            SET total_count = %s, current_word_index = %s,
+                current_repetition_count = %s, last_updated = NOW()
+            WHERE id = %s AND session_active = 1 AND total_count = %s
+        """, (entry.total_count, entry.pattern_position, entry.repetition_count, entry.session_id,
+              entry.persisted_count))
+        if cursor.rowcount == 0:   # total_count always changes on a write, so 0 means no match
+            return False
+        if entry.pending_rounds:
+            days = sorted(entry.pending_rounds.items())
+            placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(days))
+            params = []
+            for japa_date, (rounds, words) in days:
+                params.extend((entry.user_id, japa_date, rounds, words))
+            cursor.execute(f"""
+                INSERT INTO japa_daily_counts (user_id, japa_date, total_rounds, total_words)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE
+                    total_rounds = total_rounds + VALUES(total_rounds),
+                    total_words = total_words + VALUES(total_words)
+            """, params)
+            if self.user_totals:
+                self._add_totals(cursor, entry.user_id, days)
+        return True
+
+    def _add_totals(self, cursor, user_id, days):
+        """
+        Running lifetime and latest-day totals (same transaction as the daily
+        upsert). A late write for an older day only adds to the lifetime.
+        """
+        rounds = sum(r for _, (r, _) in days)
+        words = sum(w for _, (_, w) in days)
+        last_date, (last_rounds, last_words) = days[-1]
+        try:
+            cursor.execute("""
+                INSERT INTO japa_user_totals
+                    (user_id, lifetime_rounds, lifetime_words, today_date, today_rounds, today_words)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    lifetime_rounds = lifetime_rounds + VALUES(lifetime_rounds),
+                    lifetime_words = lifetime_words + VALUES(lifetime_words),
+                    today_rounds = CASE
+                        WHEN today_date = VALUES(today_date) THEN today_rounds + VALUES(today_rounds)
+                        WHEN today_date > VALUES(today_date) THEN today_rounds
+                        ELSE VALUES(today_rounds) END,
+                    today_words = CASE
+                        WHEN today_date = VALUES(today_date) THEN today_words + VALUES(today_words)
+                        WHEN today_date > VALUES(today_date) THEN today_words
+                        ELSE VALUES(today_words) END,
+                    today_date = GREATEST(today_date, VALUES(today_date))
+            """, (user_id, rounds, words, last_date, last_rounds, last_words))
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                raise
+            self.user_totals = False
+            logger.warning("japa_user_totals missing - running totals disabled until restart "
+                           "(run run_japa_user_totals_backfill.py)")
+
+    def written(self, entry):
+        """After commit: returns the number of rounds that were written."""
+        rounds = sum(r for r, _ in entry.pending_rounds.values())
+        entry.persisted_count = entry.total_count
+        entry.pending_rounds = {}
+        self._record('writes')
+        return rounds
+
+    def write_failed(self, error):
+        self._record('write_errors')
+        logger.error(f"Japa session write-back failed (words stay pending): {error}")
+
+    # ---------- idle sessions ----------
+    def flush_idle(self, max_idle=None):
+        """Write back and drop sessions idle for max_idle seconds; returns sessions written."""
+        max_idle = self.idle_seconds if max_idle is None else max_idle
+        now = time.monotonic()
+        with self._lock:
+            idle = [e for e in self._entries.values() if now - e.last_activity >= max_idle]
+        written = 0
+        for entry in idle:
+            if not entry.lock.acquire(blocking=False):
+                continue  # in use right now: not idle
+            try:
+                if entry.evicted:
+                    continue
+                if entry.dirty:
+                    if not self._write_alone(entry):
+                        self.discard_stale(entry)
+                        continue
+                    written += 1
+                    self._record('idle_writes')
+                self.evict(entry)
+            except Exception as e:
+                self.write_failed(e)
+            finally:
+                entry.lock.release()
+        return written
+
+    def _write_alone(self, entry):
+        conn = self.connect()
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            if not self.write(cursor, entry):
+                conn.rollback()
+                return False
+            conn.commit()
+            self.written(entry)
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            conn.close()
+
+    def _ensure_sweeper(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            if self._pid != pid:
+                self._entries = {}  # forked child: the parent's sessions are the parent's
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="japa-sessions", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = max(1.0, min(30.0, self.idle_seconds / 4))
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush_idle()
+            except Exception as e:
+                logger.error(f"Japa session sweeper: {e}")
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                active=len(self._entries),
+                unsaved_words=sum(e.unsaved_words for e in self._entries.values()),
+                max_unsaved_words=self.max_unsaved_words,
+                idle_seconds=self.idle_seconds,
+                user_totals=self.user_totals,
+            )
+
+
+def flush_all():
+    """Write back every session in this process (graceful shutdown)."""
+    for cache in _caches:
+        if cache._pid == os.getpid():
+            cache.flush_idle(max_idle=0)
+
+
+def all_stats():
+    return [cache.stats() for cache in _caches]
+
+
+atexit.register(flush_all)
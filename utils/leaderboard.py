@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+🏆 Incrementally Refreshed Leaderboards for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+The top `size` rows of a progress table are materialised into a small
+leaderboard table keyed by rank, so the leaderboard endpoint reads K rows
+by primary key instead of joining and sorting the whole progress table.
+
+The save path reports the counts it wrote. A count that could enter or
+reorder the top K marks this worker's cache dirty, and the next refresh
+(at most once per `refresh_seconds`) recomputes the top K through the
+(count, bhaktgan_id) index. Counts never decrease, so a save below the
+current cutoff can never change the board. Requests never rebuild it:
+each worker's refresh timer (started by its first dirty save, or its
+first leaderboard read for the cold start) wakes every refresh_seconds / 2
+and rebuilds a dirty board on its own connection, under a MySQL GET_LOCK
+so only one worker of the deployment rebuilds at a time. Staleness after
+a save is therefore about 1.5 x refresh_seconds plus the write-behind
+flush interval. Reads serve the table as it is; while it is empty
+(never built) the caller falls back to a keyset query.
+
+RankSnapshot answers "my rank" for users anywhere in the table, and
+keyset_page() walks beyond the top K in (count, bhaktgan_id) order.
+"""
+
+import os
+import time
+import logging
+import threading
+from array import array
+from bisect import bisect_right
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+TIMER_MAX_SLEEP = 300  # seconds between refresh-timer wakeups at most
+
+
+class LeaderboardCache:
+    """Top-K leaderboard table maintained from one progress table"""
+
+    def __init__(self, progress_table, leaderboard_table, size=100, refresh_seconds=15, connect=None):
+        self.progress_table = progress_table
+        self.leaderboard_table = leaderboard_table
+        self.size = size
+        self.refresh_seconds = refresh_seconds
+        self.connect = connect     # () -> dedicated connection for the refresh timer (None: no timer)
+        self.enabled = True
+        self._thread = None
+        self._pid = None
+        self._cutoff = None        # lowest count on the board at last refresh (None = unknown)
+        self._dirty = True         # cold start: first refresh in each worker rebuilds
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'refreshes': 0, 'skipped_saves': 0, 'timer_refreshes': 0, 'timer_errors': 0,
+                       'lock_skips': 0, 'last_refresh_ms': 0.0}
+
+    # ---------- save path ----------
+    def note_saves(self, counts):
+        """Mark the board dirty if any saved count could be on it."""
+        with self._lock:
+            dirty = self._cutoff is None or any(c >= self._cutoff for c in counts)
+            if dirty:
+                self._dirty = True
+            else:
+                self._stats['skipped_saves'] += len(counts)
+        if dirty:
+            self._ensure_timer()
+
+    def refresh_due(self):
+        with self._lock:
+            return self._dirty and time.monotonic() - self._last_refresh >= self.refresh_seconds
+
+    def maybe_refresh(self, cursor):
+        """Rebuild if dirty and the refresh interval has passed; caller commits."""
+        if not self.refresh_due():
+            return False
+        self.rebuild(cursor)
+        return True
+
+    def rebuild(self, cursor):
+        """Recompute the top K from the progress table; caller commits."""
+        start = time.perf_counter()
+        cursor.execute(f"""
+            SELECT hp.bhaktgan_id, hp.name, hp.count, hp.total_malas, hp.last_spoken_at, bg.city
+            FROM {self.progress_table} hp
+            JOIN bhaktgan bg ON hp.bhaktgan_id = bg.id
+            WHERE hp.count > 0
+            ORDER BY hp.count DESC, hp.bhaktgan_id DESC
+            LIMIT %s
+        """, (self.size,))
+        rows = cursor.fetchall()
+
+        if rows:
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+            params = []
+            for rank, row in enumerate(rows, start=1):
+                params.extend((rank, row['bhaktgan_id'], row['name'], row['city'],
+                               row['count'], row['total_malas'], row['last_spoken_at']))
+            cursor.execute(f"""
+                REPLACE INTO {self.leaderboard_table}
+                (rank_pos, bhaktgan_id, name, city, count, total_malas, last_spoken_at)
+                VALUES {placeholders}
+            """, params)
+        cursor.execute(f"DELETE FROM {self.leaderboard_table} WHERE rank_pos > %s", (len(rows),))
+
+        with self._lock:
+            # A board with free slots admits any positive count
+            self._cutoff = rows[-1]['count'] if len(rows) >= self.size else 1
+            self._dirty = False
+            self._last_refresh = time.monotonic()
+            self._stats['refreshes'] += 1
+            self._stats['last_refresh_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return len(rows)
+
+    # ---------- refresh timer ----------
+    def _ensure_timer(self):
+        pid = os.getpid()
+        if self.connect is None or (self._thread is not None and self._pid == pid):
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name=f"{self.leaderboard_table}-refresh",
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while self.enabled:
+            # Bounded so a huge (or infinite) refresh_seconds still sleeps a valid interval
+            time.sleep(min(max(1.0, self.refresh_seconds / 2), TIMER_MAX_SLEEP))
+            self.refresh_from_timer()
+
+    def refresh_from_timer(self):
+        """One timer tick: refresh on a dedicated connection if the board is due."""
+        if not self.refresh_due():
+            return
+        conn = None
+        try:
+            conn = self.connect()
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            try:
+                # One worker of the deployment rebuilds; the others keep their dirty flag
+                cursor.execute("SELECT GET_LOCK(%s, 0) AS acquired", (self._lock_name(),))
+                if not (cursor.fetchone() or {}).get('acquired'):
+                    with self._lock:
+                        self._last_refresh = time.monotonic()
+                        self._stats['lock_skips'] += 1
+                    return
+                try:
+                    if self.maybe_refresh(cursor):
+                        conn.commit()
+                        with self._lock:
+                            self._stats['timer_refreshes'] += 1
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (self._lock_name(),))
+            finally:
+                cursor.close()
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] == 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                self.enabled = False
+                logger.warning(f"{self.leaderboard_table} missing - refresh timer stopped")
+            else:
+                self._timer_failed(e)
+        except Exception as e:
+            self._timer_failed(e)
+        finally:
+            if conn:
+                conn.close()
+
+    def _lock_name(self):
+        return f"{self.leaderboard_table}_refresh"
+
+    def _timer_failed(self, error):
+        with self._lock:
+            self._stats['timer_errors'] += 1
+        logger.error(f"{self.leaderboard_table} refresh failed: {error}")
+
+    # ---------- read path ----------
+    def read(self, cursor, limit=None):
+        """Top `limit` rows by rank: a primary-key range read of at most K rows."""
+        self._ensure_timer()   # cold start: a worker with no saves yet still fills an empty table
+        cursor.execute(f"""
+            SELECT rank_pos AS `rank`, bhaktgan_id, name, count, total_malas, last_spoken_at, city
+            FROM {self.leaderboard_table}
+            WHERE rank_pos <= %s
+            ORDER BY rank_pos
+        """, (min(limit or self.size, self.size),))
+        return cursor.fetchall()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, cutoff=self._cutoff, dirty=self._dirty,
+                        size=self.size, refresh_seconds=self.refresh_seconds)
+
+
+class RankSnapshot:
+    """
+    Sorted (count, bhaktgan_id) keys of every user with count > 0, used to
+    answer "what is my rank" with a binary search instead of a
+    COUNT(*) WHERE count > mine over the progress table.
+
+    Loaded with one ordered scan of the (count, bhaktgan_id) index (no
+    sort, no table rows), streamed into the key array, and reloaded once
+    older than `max_age` seconds. A user's own rank always uses their
+    fresh count; only the other users' counts can be up to `max_age`
+    seconds old.
+
+    Loads never run in a request. A request that finds the snapshot stale
+    starts one background reload on its own connection (single-flight)
+    and answers from the old keys; before a worker's first load has
+    finished, rank_from_index() answers instead. Reloads are driven by
+    rank requests, so a worker nobody asks for a rank never scans.
+    """
+
+    def __init__(self, progress_table, max_age=60, connect=None):
+        self.progress_table = progress_table
+        self.max_age = max_age
+        self.connect = connect     # () -> dedicated connection for background reloads
+        self._keys = array('q')
+        self._loaded_at = None
+        self._reloading = False
+        self._lock = threading.Lock()
+        self._stats = {'loads': 0, 'load_errors': 0, 'index_reads': 0, 'last_load_ms': 0.0}
+
+    @staticmethod
+    def key(count, bhaktgan_id):
+        # Ties on count are ordered by bhaktgan_id, same as the leaderboard
+        return (count << 32) | bhaktgan_id
+
+    def is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age
+
+    def ready(self):
+        return self._loaded_at is not None
+
+    def ensure_fresh(self):
+        """
+        Start a background reload if the snapshot is stale (and none is
+        running). Returns True when a snapshot, possibly stale, can answer.
+        """
+        if self.is_stale() and self.connect is not None:
+            with self._lock:
+                start = not self._reloading
+                self._reloading = True
+            if start:
+                threading.Thread(target=self._reload, name=f"{self.progress_table}-ranks",
+                                 daemon=True).start()
+        return self.ready()
+
+    def _reload(self):
+        conn = None
+        try:
+            conn = self.connect()
+            self.load(conn)
+        except Exception as e:
+            with self._lock:
+                self._stats['load_errors'] += 1
+            logger.error(f"{self.progress_table} rank snapshot load failed: {e}")
+        finally:
+            if conn:
+                conn.close()
+            with self._lock:
+                self._reloading = False
+
+    def load(self, conn):
+        start = time.perf_counter()
+        # Unbuffered tuples: the keys are packed as rows arrive, no 100k-row result list
+        cursor = conn.cursor(pymysql.cursors.SSCursor)
+        try:
+            cursor.execute(f"""
+                SELECT count, bhaktgan_id
+                FROM {self.progress_table}
+                WHERE count > 0
+                ORDER BY count, bhaktgan_id
+            """)
+            keys = array('q', (self.key(count, bhaktgan_id) for count, bhaktgan_id in cursor))
+        finally:
+            cursor.close()
+        self.replace(keys)
+        with self._lock:
+            self._stats['loads'] += 1
+            self._stats['last_load_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    def rank_from_index(self, cursor, count, bhaktgan_id):
+        """(rank or None for count 0, total ranked) from the index, for a worker with no snapshot yet."""
+        cursor.execute(f"""
+            SELECT COUNT(*) AS total,
+                   SUM(count > %s OR (count = %s AND bhaktgan_id > %s)) AS above
+            FROM {self.progress_table}
+            WHERE count > 0
+        """, (count, count, bhaktgan_id))
+        row = cursor.fetchone()
+        with self._lock:
+            self._stats['index_reads'] += 1
+        return (int(row['above'] or 0) + 1 if count > 0 else None), int(row['total'])
+
+    def replace(self, keys):
+        """Swap in a new ascending key array (readers never see a partial one)."""
+        with self._lock:
+            self._keys = keys
+            self._loaded_at = time.monotonic()
+
+    def rank(self, count, bhaktgan_id):
+        """1-based position of (count, bhaktgan_id) among all users, None for count 0."""
+        if count <= 0:
+            return None
+        keys = self._keys
+        return len(keys) - bisect_right(keys, self.key(count, bhaktgan_id)) + 1
+
+    def total(self):
+        return len(self._keys)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, users=len(self._keys), max_age=self.max_age)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 📄 Keyset Pagination on (count, bhaktgan_id)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Every query below is a range read on the (count, bhaktgan_id) index
+# plus a primary-key join per row, so cost follows the page size and not
+# the table size or how deep the page is.
+
+_PAGE_COLUMNS = "hp.bhaktgan_id, hp.name, hp.count, hp.total_malas, hp.last_spoken_at, bg.city"
+
+
+def encode_cursor(row, rank):
+    return f"{row['count']}:{row['bhaktgan_id']}:{rank}"
+
+
+def decode_cursor(value):
+    """(count, bhaktgan_id, rank) from a page cursor; ValueError if malformed."""
+    count, bhaktgan_id, rank = (int(part) for part in value.split(':'))
+    if count < 0 or bhaktgan_id < 0 or rank < 0:
+        raise ValueError(f"Invalid leaderboard cursor: {value}")
+    return count, bhaktgan_id, rank
+
+
+def keyset_page(cursor, progress_table, after_count, after_id, limit):
+    """Rows ranked directly below (after_count, after_id), best first."""
+    cursor.execute(f"""
+        SELECT {_PAGE_COLUMNS}
+        FROM {progress_table} hp
+        JOIN bhaktgan bg ON hp.bhaktgan_id = bg.id
+        WHERE hp.count > 0
+          AND (hp.count < %s OR (hp.count = %s AND hp.bhaktgan_id < %s))
+        ORDER BY hp.count DESC, hp.bhaktgan_id DESC
+        LIMIT %s
+    """, (after_count, after_count, after_id, limit))
+    return cursor.fetchall()
+
+
+def neighbours(cursor, progress_table, count, bhaktgan_id, n):
+    """
+    Up to n users ranked just above and just below a user, in one statement.
+    Returns (above, below), each ordered nearest first.
+    """
+    cursor.execute(f"""
+        (SELECT 'above' AS side, {_PAGE_COLUMNS}
+         FROM {progress_table} hp
+         JOIN bhaktgan bg ON hp.bhaktgan_id = bg.id
+         WHERE hp.count > %s OR (hp.count = %s AND hp.bhaktgan_id > %s)
+         ORDER BY hp.count ASC, hp.bhaktgan_id ASC
+         LIMIT %s)
+        UNION ALL
+        (SELECT 'below' AS side, {_PAGE_COLUMNS}
+         FROM {progress_table} hp
+         JOIN bhaktgan bg ON hp.bhaktgan_id = bg.id
+         WHERE hp.count > 0
+           AND (hp.count < %s OR (hp.count = %s AND hp.bhaktgan_id < %s))
+         ORDER BY hp.count DESC, hp.bhaktgan_id DESC
+         LIMIT %s)
+    """, (count, count, bhaktgan_id, n, count, count, bhaktgan_id, n))
+    above, below = [], []
+    for row in cursor.fetchall():
+        (above if row.pop('side') == 'above' else below).append(row)
+    # UNION ALL keeps no order of its own
+    above.sort(key=lambda r: (r['count'], r['bhaktgan_id']))
+    below.sort(key=lambda r: (r['count'], r['bhaktgan_id']), reverse=True)
+    return above, below
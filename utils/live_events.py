@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+📡 Live Event Broadcaster for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+One in-process publish/subscribe hub per feature, shared by every open
+Server-Sent Events stream and long-poll request in the worker. Saves
+publish a "changed" note on the user's topic; one ticker thread per worker
+publishes the shared payload (server time, global counter) on the
+'global' topic, so that work is done once per tick, not once per stream.
+
+Subscribers only ever hold the latest few events: a slow client drops old
+notes instead of growing memory. Streams block in Condition.wait(), so
+they need a worker class that does not tie up a whole process per
+request (gunicorn gthread or gevent - see gunicorn.conf.py).
+
+Topics are per worker. A save handled by another worker reaches a stream
+through the stream's periodic state refresh instead of a push.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+_broadcasters = []
+
+GLOBAL_TOPIC = 'global'
+
+
+def format_sse(event, data, event_id=None):
+    """One text/event-stream frame."""
+    payload = json.dumps(data, default=_json_default, ensure_ascii=False)
+    frame = f"event: {event}\n"
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    return frame + f"data: {payload}\n\n"
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+class Subscription:
+    """A stream's inbox: the latest `maxlen` events, woken on publish"""
+
+    def __init__(self, topics, maxlen=16):
+        self.topics = tuple(topics)
+        self._events = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, event, data):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append((event, data))
+            self._cond.notify()
+
+    def get(self, timeout):
+        """All queued events, waiting up to `timeout` seconds for the first."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+
+class Broadcaster:
+    """In-process topic hub with a shared ticker"""
+
+    def __init__(self, name, tick_seconds=15.0, tick_func=None):
+        self.name = name
+        self.tick_seconds = tick_seconds
+        self.tick_func = tick_func         # () -> payload published on GLOBAL_TOPIC
+        self._topics = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._last_tick = None
+        self._stats = {
+            'streams_opened': 0,
+            'long_polls': 0,
+            'published': 0,
+            'delivered': 0,
+            'peak_streams': 0,
+            'tick_errors': 0,
+        }
+        self._open = {'stream': 0, 'poll': 0}
+        _broadcasters.append(self)
+
+    # ---------- subscribers ----------
+    def subscribe(self, topics, kind='stream'):
+        self._ensure_ticker()
+        sub = Subscription(list(topics) + [GLOBAL_TOPIC])
+        with self._lock:
+            for topic in sub.topics:
+                self._topics.setdefault(topic, set()).add(sub)
+            self._open[kind] += 1
+            if kind == 'stream':
+                self._stats['streams_opened'] += 1
+                self._stats['peak_streams'] = max(self._stats['peak_streams'], self._open['stream'])
+            else:
+                self._stats['long_polls'] += 1
+        return sub
+
+    def unsubscribe(self, sub, kind='stream'):
+        with self._lock:
+            for topic in sub.topics:
+                subs = self._topics.get(topic)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._topics[topic]
+            self._open[kind] -= 1
+
+    def open_streams(self):
+        with self._lock:
+            return self._open['stream']
+
+    # ---------- publishers ----------
+    def publish(self, topic, event, data=None):
+        """Deliver to every subscriber of `topic` in this worker; returns how many."""
+        with self._lock:
+            subs = list(self._topics.get(topic, ()))
+            self._stats['published'] += 1
+            self._stats['delivered'] += len(subs)
+        for sub in subs:
+            sub.put(event, data)
+        return len(subs)
+
+    def last_tick(self):
+        """Most recent ticker payload (None before the first tick)."""
+        return self._last_tick
+
+    def tick(self):
+        """Build the shared payload once and publish it to everyone."""
+        if self.tick_func is None:
+            return None
+        payload = self.tick_func()
+        self._last_tick = payload
+        self.publish(GLOBAL_TOPIC, 'tick', payload)
+        return payload
+
+    def _ensure_ticker(self):
+        pid = os.getpid()
+        if self.tick_func is None or (self._thread is not None and self._pid == pid):
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name=f"live-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.tick_seconds)
+            with self._lock:
+                idle = not self._topics.get(GLOBAL_TOPIC)
+            if idle:
+                continue  # nobody listening: no DB work
+            try:
+                self.tick()
+            except Exception as e:
+                with self._lock:
+                    self._stats['tick_errors'] += 1
+                logger.error(f"Live ticker for {self.name}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                open_streams=self._open['stream'],
+                open_long_polls=self._open['poll'],
+                topics=len(self._topics),
+                tick_seconds=self.tick_seconds,
+            )
+
+
+def all_stats():
+    return {b.name: b.stats() for b in _broadcasters}
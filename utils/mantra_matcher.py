@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+🎯 Compiled Mantra Word Matcher for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Decides whether a recognized word is the word the mantra expects next.
+Everything that does not depend on the recognized word is built once per
+pattern: the normalized spellings each word accepts (WORD_VARIANTS plus
+the pattern's own spellings, e.g. its Devanagari), the words it must
+never be confused with (shyam / shyama, radhe / krishna) and the
+character bitmasks of the expected word.
+
+match() answers with (matched, score) in one pass:
+
+    - an accepted spelling is a set lookup (score 1.0),
+    - anything else gets a bit-parallel LCS against the expected word,
+      score = 2 * LCS / (len(a) + len(b)) (the measure difflib's ratio()
+      approximates), and is accepted when its indel edit distance stays
+      within the bound the threshold allows - only for words of at least
+      MIN_FUZZY_LENGTH characters that contain no conflicting word.
+
+Normalization keeps Devanagari vowel signs and virama (regex \\w does not
+match them), so श्याम and श्यामा stay different words.
+"""
+
+import re
+from functools import lru_cache
+
+# STRICT spellings - each word has completely distinct variations
+WORD_VARIANTS = {
+    'radhe': ('radhe', 'राधे', 'radhey', 'radhai', 'rade', 'radey'),
+    'krishna': ('krishna', 'कृष्णा', 'कृष्ण', 'krisha', 'krisna', 'krishnaa', 'krsna'),
+    'shyam': ('shyam', 'श्याम', 'sham', 'shaam', 'syam', 'shym'),   # nothing that could be shyama
+    'shyama': ('shyama', 'श्यामा', 'shyamaa'),                       # nothing that could be shyam
+}
+
+# A recognized word containing one of these is never fuzzy-matched to the key
+WORD_CONFLICTS = {
+    'shyam': ('shyama',),
+    'shyama': ('shyam',),
+    'radhe': ('krishna',),
+    'krishna': ('radhe',),
+}
+
+SIMILARITY_THRESHOLD = 0.90   # very high: only near-identical spellings
+MIN_FUZZY_LENGTH = 4
+
+# Punctuation and symbols go; letters, digits and Devanagari marks stay (। and ॥ are punctuation)
+_STRIP = re.compile(r'[^\w\s\u0900-\u0963\u0966-\u097f]')
+_SPACES = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def normalize(word):
+    """Lowercase, strip punctuation and collapse whitespace."""
+    if not word:
+        return ""
+    word = _STRIP.sub('', word.lower())
+    return _SPACES.sub(' ', word).strip()
+
+
+class _ExpectedWord:
+    """Everything match() needs about one expected word."""
+
+    __slots__ = ('word', 'accepted', 'conflicts', 'masks', 'all_bits')
+
+    def __init__(self, word, variants, conflicts):
+        self.word = word
+        self.accepted = frozenset([word] + [normalize(v) for v in variants])
+        self.conflicts = tuple(normalize(c) for c in conflicts)
+        masks = {}
+        for i, ch in enumerate(word):
+            masks[ch] = masks.get(ch, 0) | (1 << i)
+        self.masks = masks
+        self.all_bits = (1 << len(word)) - 1
+
+    def lcs(self, text):
+        """Longest common subsequence length with `text` (Allison-Dix bit-parallel)."""
+        v = self.all_bits
+        masks = self.masks
+        for ch in text:
+            u = v & masks.get(ch, 0)
+            v = (v + u) | (v - u)
+        return len(self.word) - (v & self.all_bits).bit_count()
+
+
+class MantraWordMatcher:
+    """Matcher for the words of one mantra pattern. Immutable once built."""
+
+    def __init__(self, words, variants=None, conflicts=None, spellings=None,
+                 threshold=SIMILARITY_THRESHOLD, min_fuzzy_length=MIN_FUZZY_LENGTH):
+        """`spellings` maps a word to extra spellings it accepts exactly (e.g. its Devanagari)."""
+        self.variants = WORD_VARIANTS if variants is None else variants
+        self.conflicts = WORD_CONFLICTS if conflicts is None else conflicts
+        self.threshold = threshold
+        self.min_fuzzy_length = min_fuzzy_length
+        spellings = spellings or {}
+        self._expected = {}
+        for word in words:
+            entry = self._compile(word, spellings.get(word, ()))
+            self._expected[word] = entry
+            self._expected[entry.word] = entry
+
+    def _compile(self, word, spellings=()):
+        key = normalize(word)
+        variants = tuple(self.variants.get(key, ())) + tuple(s for s in spellings if s)
+        return _ExpectedWord(key, variants, self.conflicts.get(key, ()))
+
+    def match(self, recognized_word, expected_word):
+        """Return (matched, similarity score 0..1) for a recognized word."""
+        expected = self._expected.get(expected_word) or self._compile(expected_word)
+        recognized = normalize(recognized_word)
+        if recognized in expected.accepted:
+            return True, 1.0
+
+        total = len(recognized) + len(expected.word)
+        if not total:
+            return False, 0.0
+        lcs = expected.lcs(recognized)
+        score = 2.0 * lcs / total
+
+        if len(recognized) < self.min_fuzzy_length or len(expected.word) < self.min_fuzzy_length:
+            return False, score
+        if any(conflict in recognized for conflict in expected.conflicts):
+            return False, score
+        # indel distance within the bound the threshold allows
+        max_distance = int((1.0 - self.threshold) * total + 1e-9)
+        return total - 2 * lcs <= max_distance, score
+
+    def is_match(self, recognized_word, expected_word):
+        return self.match(recognized_word, expected_word)[0]
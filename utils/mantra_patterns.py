@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+📿 Database-driven Mantra Patterns for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+A mantra is a row in japa_mantras plus its word groups in
+japa_mantra_words (word, Devanagari, repetitions and optional extra
+spellings, in position order). A group's Devanagari and extra spellings
+are accepted by the word matcher as exact spellings of its word.
+Each worker compiles the active mantra once into an immutable
+CompiledMantra:
+
+    - groups[position - 1] -> (word, devanagari, repetitions)
+    - prefix[position - 1] -> utterances before that group, so the
+      current_word_index shown by the frontend is one addition
+    - round_length, display words and the word matcher
+
+MantraPatternCache serves the compiled mantra from memory. At most once
+per JAPA_PATTERN_CHECK_SECONDS it reads the active mantra's (slug,
+version) - one indexed row - and only recompiles when that changed.
+Editing a mantra therefore means changing its words and bumping
+japa_mantras.version; switching mantras means flipping is_default (or
+setting JAPA_MANTRA_SLUG). Neither needs a deploy.
+
+Until the tables exist (run_japa_mantra_migration.py) the built-in
+pattern from routes/japa.py is served.
+"""
+
+import os
+import time
+import logging
+import threading
+import pymysql
+
+from utils.mantra_matcher import MantraWordMatcher
+
+logger = logging.getLogger(__name__)
+
+JAPA_MANTRA_SLUG = os.getenv("JAPA_MANTRA_SLUG", "")   # empty: the is_default mantra
+JAPA_PATTERN_CHECK_SECONDS = float(os.getenv("JAPA_PATTERN_CHECK_SECONDS", 60))
+
+
+class CompiledMantra:
+    """One mantra pattern compiled into lookup tables. Never mutated after __init__."""
+
+    __slots__ = ('slug', 'name', 'version', 'groups', 'prefix', 'round_length', 'pattern',
+                 'display_words', 'matcher')
+
+    def __init__(self, slug, name, version, pattern):
+        groups = tuple((item['word'], item['devanagari'], int(item['repetitions'])) for item in pattern)
+        if not groups or any(repetitions < 1 for _, _, repetitions in groups):
+            raise ValueError(f"mantra '{slug}' needs at least one word and repetitions >= 1")
+
+        prefix = [0]
+        for _, _, repetitions in groups:
+            prefix.append(prefix[-1] + repetitions)
+
+        self.slug = slug
+        self.name = name
+        self.version = version
+        self.groups = groups
+        self.prefix = tuple(prefix)
+        self.round_length = prefix[-1]
+        self.pattern = tuple({'word': w, 'devanagari': d, 'repetitions': r} for w, d, r in groups)
+        self.display_words = tuple(
+            {
+                'word_order': prefix[i] + rep + 1,
+                'word_english': word,
+                'word_devanagari': devanagari,
+                'is_repetition': rep > 0,
+                'repetition_number': rep + 1,
+                'total_repetitions': repetitions
+            }
+            for i, (word, devanagari, repetitions) in enumerate(groups)
+            for rep in range(repetitions)
+        )
+        # A word's Devanagari and extra spellings (comma-separated in the DB) match it exactly
+        spellings = {}
+        for item in pattern:
+            extra = (item.get('spellings') or '').split(',')
+            spellings.setdefault(item['word'], []).extend(s.strip() for s in [item['devanagari'], *extra])
+        self.matcher = MantraWordMatcher((word for word, _, _ in groups), spellings=spellings)
+
+    def position(self, pattern_position):
+        """Clamp a stored position into the pattern (out of range starts over)."""
+        return pattern_position if 1 <= pattern_position <= len(self.groups) else 1
+
+    def expected(self, pattern_position, repetition_count):
+        """The word expected at (position, repetition)."""
+        position = self.position(pattern_position)
+        word, devanagari, repetitions = self.groups[position - 1]
+        return {
+            'word_english': word,
+            'word_devanagari': devanagari,
+            'repetition_number': repetition_count,
+            'total_repetitions': repetitions,
+            'pattern_position': position,
+            'pattern_index': position - 1
+        }
+
+    def advance(self, pattern_position, repetition_count):
+        """Returns (new_pattern_position, new_repetition_count, completed_round)."""
+        position = self.position(pattern_position)
+        if repetition_count < self.groups[position - 1][2]:
+            return position, repetition_count + 1, False
+        if position == len(self.groups):
+            return 1, 1, True
+        return position + 1, 1, False
+
+    def word_index(self, pattern_position, repetition_count):
+        """1-based index of the current utterance within the round."""
+        return self.prefix[self.position(pattern_position) - 1] + repetition_count
+
+
+class MantraPatternCache:
+    """The active mantra of this worker, recompiled when its version changes"""
+
+    def __init__(self, connect, fallback, slug=JAPA_MANTRA_SLUG, check_seconds=JAPA_PATTERN_CHECK_SECONDS):
+        self.connect = connect              # () -> dedicated connection for the version check
+        self.fallback = fallback            # CompiledMantra served until the tables exist
+        self.slug = slug
+        self.check_seconds = check_seconds
+        self.enabled = True
+        self._current = fallback
+        self._checked_at = None
+        self._check_lock = threading.Lock()
+        self.has_spellings = True           # False until japa_mantra_words.spellings exists
+        self._stats = {'checks': 0, 'compiles': 0, 'check_errors': 0}
+
+    def current(self):
+        """The compiled mantra; checks its version when the interval has passed."""
+        if self.enabled and self._check_due() and self._check_lock.acquire(blocking=False):
+            try:
+                if self._check_due():   # another thread may just have checked
+                    self._check()
+            finally:
+                self._check_lock.release()
+        return self._current
+
+    def _check_due(self):
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_seconds
+
+    def invalidate(self):
+        """Check the version on the next current() call."""
+        self._checked_at = None
+
+    def _check(self):
+        self._checked_at = time.monotonic()
+        self._stats['checks'] += 1
+        conn = None
+        cursor = None
+        try:
+            conn = self.connect()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, slug, name, version
+                FROM japa_mantras
+                WHERE active = 1 AND (slug = %s OR (%s = '' AND is_default = 1))
+                ORDER BY is_default DESC LIMIT 1
+            """, (self.slug, self.slug))
+            row = cursor.fetchone()
+            if row is None:
+                self._current = self.fallback
+                return
+            if (row['slug'], row['version']) == (self._current.slug, self._current.version):
+                return
+
+            pattern = [{'word': w['word_english'], 'devanagari': w['word_devanagari'],
+                        'repetitions': w['repetitions'], 'spellings': w.get('spellings')}
+                       for w in self._read_words(cursor, row['id'])]
+            self._current = CompiledMantra(row['slug'], row['name'], row['version'], pattern)
+            self._stats['compiles'] += 1
+            logger.info(f"Compiled mantra '{row['slug']}' v{row['version']} "
+                        f"({len(pattern)} groups, {self._current.round_length} words)")
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] == 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                self.enabled = False
+                logger.warning("japa_mantras missing - serving the built-in pattern until restart "
+                               "(run run_japa_mantra_migration.py)")
+            else:
+                self._stats['check_errors'] += 1
+                logger.error(f"Mantra pattern check failed: {e}")
+        except Exception as e:
+            # Keep serving the last compiled mantra; try again next interval
+            self._stats['check_errors'] += 1
+            logger.error(f"Mantra pattern check failed: {e}")
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+
+    def _read_words(self, cursor, mantra_id):
+        if self.has_spellings:
+            try:
+                cursor.execute("""
+                    SELECT word_english, word_devanagari, repetitions, spellings
+                    FROM japa_mantra_words
+                    WHERE mantra_id = %s
+                    ORDER BY position
+                """, (mantra_id,))
+                return cursor.fetchall()
+            except (pymysql.err.OperationalError, pymysql.err.ProgrammingError) as e:
+                if e.args[0] != 1054:  # ER_BAD_FIELD_ERROR: add_spellings migration not run yet
+                    raise
+                self.has_spellings = False
+                logger.warning("japa_mantra_words.spellings missing - matching English and "
+                               "Devanagari only (run migrations/add_spellings_to_japa_mantra_words.sql)")
+        cursor.execute("""
+            SELECT word_english, word_devanagari, repetitions
+            FROM japa_mantra_words
+            WHERE mantra_id = %s
+            ORDER BY position
+        """, (mantra_id,))
+        return cursor.fetchall()
+
+    def stats(self):
+        current = self._current
+        return dict(self._stats, enabled=self.enabled, slug=current.slug, version=current.version,
+                    round_length=current.round_length)
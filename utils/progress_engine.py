@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+📿 Mantra Progress Engine for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+One save/state pipeline per mantra progress table (see ProgressTable in
+utils/progress_sync.py). Blueprints parse the session and own the request
+connection; the engine owns everything between the payload and the row:
+
+    state_from_payload()  client save -> state dict (range-checked, IST date clamped)
+    read_state()          one primary-key read + this worker's pending save
+    buffer_save()         write-behind: coalesced per user, flushed in batches
+    save()                multi-row GREATEST() upsert with the IST rollover
+                          folded in, plus the optional rollup / daily history /
+                          global counter in the same transaction
+    apply_ops()           v2 delta ops (utils/progress_sync.py)
+    save_events()         an offline queue folded to one state per IST day
+    after_saved()         ETag invalidation, live push, leaderboard refresh
+
+Every aggregate is optional and checked through its own `enabled` flag, so
+a mantra without a leaderboard or city rollup simply passes None.
+"""
+
+import re
+import logging
+import threading
+from datetime import date as date_cls, datetime
+
+import pymysql
+
+from utils import progress_sync
+from utils.etags import etag_cache
+from utils.write_behind import WriteBehindBuffer
+from utils.rollups import lock_previous
+from utils.counters import words_added
+from utils.leaderboard import decode_cursor, encode_cursor, keyset_page
+
+logger = logging.getLogger(__name__)
+
+_engines = []
+
+# Server gone away / lost connection / can't connect, lock wait timeout, deadlock:
+# worth retrying. PyMySQL raises OperationalError for any unmapped error number
+# too (e.g. 1054 unknown column), and those never succeed on a retry.
+TRANSIENT_DB_ERRNOS = frozenset((2003, 2006, 2013, 1205, 1213))
+
+
+def is_transient_db_error(error):
+    """True for errors a later flush can get past (the row itself is fine)."""
+    if isinstance(error, pymysql.err.InterfaceError):
+        return True
+    return (isinstance(error, pymysql.err.OperationalError)
+            and bool(error.args) and error.args[0] in TRANSIENT_DB_ERRNOS)
+
+
+PROGRESS_TOTAL_FIELDS = ('count', 'total_malas', 'total_pronunciations')
+PROGRESS_TODAY_FIELDS = ('today_words', 'today_pronunciations', 'today_malas', 'todays_count')
+
+
+# The progress columns are signed INT: one out-of-range value fails the whole multi-row upsert
+MAX_PROGRESS_VALUE = 2**31 - 1
+LEADERBOARD_MAX_PAGE = 100
+DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def _progress_int(data, key):
+    value = data.get(key, 0)
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{key} must be an integer")
+    if isinstance(value, bool) or not 0 <= number <= MAX_PROGRESS_VALUE:
+        raise ValueError(f"{key} must be an integer between 0 and {MAX_PROGRESS_VALUE}")
+    return number
+
+
+def _payload_date(value, today):
+    """
+    The client's IST day as YYYY-MM-DD (a trailing time, e.g. an ISO
+    timestamp, is ignored), never later than `today`: one save dated in the
+    future would otherwise pin the row's today_date ahead of every real save.
+    Missing or unparseable dates count as today.
+    """
+    if not isinstance(value, str) or not DATE_RE.match(value):
+        return today
+    try:
+        parsed = date_cls.fromisoformat(value[:10]).isoformat()
+    except ValueError:
+        return today
+    return min(parsed, today)
+
+
+def state_from_payload(data, bhaktgan_id, name, phone, today=None):
+    """
+    Build a progress state dict from the client's camelCase save payload.
+    Raises ValueError for counts the INT columns cannot hold.
+    """
+    return {
+        'bhaktgan_id': bhaktgan_id,
+        'name': name,
+        'phone': phone,
+        'count': _progress_int(data, 'count'),
+        'total_malas': _progress_int(data, 'totalMalas'),
+        'current_mala_pronunciations': _progress_int(data, 'currentMalaPronunciations'),
+        'total_pronunciations': _progress_int(data, 'totalPronunciations'),
+        'today_words': _progress_int(data, 'todayWords'),
+        'today_pronunciations': _progress_int(data, 'todayPronunciations'),
+        'today_malas': _progress_int(data, 'todayMalas'),
+        # IST keeps the date consistent with the rollover in the upsert
+        'today_date': _payload_date(data.get('todayDate'), today or progress_sync.ist_today()),
+        'todays_count': _progress_int(data, 'todaysCount'),
+    }
+
+
+def merge_progress_state(old, new):
+    """
+    Merge two pending saves for the same user the way the upsert would.
+
+    Totals never decrease. Today's fields keep the max within one day,
+    a newer day replaces them and a save from an older day (stale tab)
+    cannot touch them.
+    """
+    merged = dict(new)
+    for field in PROGRESS_TOTAL_FIELDS:
+        merged[field] = max(old[field], new[field])
+    if new['today_date'] == old['today_date']:
+        for field in PROGRESS_TODAY_FIELDS:
+            merged[field] = max(old[field], new[field])
+    elif new['today_date'] < old['today_date']:
+        for field in PROGRESS_TODAY_FIELDS + ('current_mala_pronunciations', 'today_date'):
+            merged[field] = old[field]
+    return merged
+
+
+def fold_progress_events(states):
+    """
+    Collapse an ordered list of saves (e.g. an offline queue) into one state
+    per IST date, oldest date first, each folded with merge_progress_state.
+
+    Every returned state carries the running totals up to its date, so
+    writing them in order lands each day's counts on its own today_date and
+    leaves the row at the latest one.
+    """
+    folded = {}
+    running = None
+    for state in sorted(states, key=lambda s: s['today_date']):  # stable: queue order within a day
+        running = state if running is None else merge_progress_state(running, state)
+        folded[running['today_date']] = running
+    return [folded[day] for day in sorted(folded)]
+
+
+def _today_field_sql(field):
+    return f"""{field} = CASE
+                    WHEN today_date IS NULL THEN VALUES({field})
+                    WHEN today_date = VALUES(today_date) THEN GREATEST(COALESCE({field}, 0), VALUES({field}))
+                    WHEN today_date > VALUES(today_date) THEN {field}
+                    ELSE VALUES({field})
+                END"""
+
+
+class ProgressEngine:
+    """State, save and rollover pipeline for one mantra's progress table"""
+
+    def __init__(self, spec, connect, write_behind=True, flush_interval_ms=500, flush_max_users=200,
+                 leaderboard=None, rollup=None, history=None, counter=None, live=None):
+        self.spec = spec
+        self.connect = connect              # () -> dedicated connection for the flush thread
+        self.write_behind = write_behind
+        self.leaderboard = leaderboard
+        self.rollup = rollup
+        self.history = history
+        self.counter = counter
+        self.live = live
+        self.today_fields = tuple(f for f in PROGRESS_TODAY_FIELDS
+                                  if f != 'today_words' or spec.has_today_words)
+        self.buffer = WriteBehindBuffer(
+            f"{spec.mantra}_save",
+            self._flush,
+            merge_progress_state,
+            flush_interval_ms=flush_interval_ms,
+            max_batch=flush_max_users,
+            is_transient=is_transient_db_error,
+        )
+        self._lock = threading.Lock()
+        self._stats = {
+            'state_reads': 0,
+            'buffered_saves': 0,
+            'save_batches': 0,
+            'rows_saved': 0,
+            'ops_applied': 0,
+            'event_batches': 0,
+        }
+        _engines.append(self)
+
+    @staticmethod
+    def _on(component):
+        return component if component is not None and component.enabled else None
+
+    def _record(self, field, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    # ---------- state ----------
+    def read_state(self, cursor, bhaktgan_id, today=None):
+        """
+        Progress as the state endpoints report it: today's fields from an
+        earlier IST date read as 0, overlaid with a save still waiting in
+        this worker's write-behind buffer. One read, no write - the stored
+        row is rolled over by the next save's upsert.
+        """
+        state = progress_sync.read_state(cursor, self.spec, bhaktgan_id, today or progress_sync.ist_today())
+        for field in PROGRESS_TODAY_FIELDS:
+            state.setdefault(field, 0)  # e.g. guru_mantra_progress has no today_words
+        pending = self.buffer.peek(bhaktgan_id)
+        if pending:
+            state = merge_progress_state(state, pending)
+        self._record('state_reads')
+        return state
+
+    def public_state(self, state):
+        """The fields /api/state returns for this mantra."""
+        fields = ('count', 'total_malas', 'current_mala_pronunciations', 'total_pronunciations',
+                  'last_spoken_at') + self.today_fields[:-1] + ('today_date', 'todays_count')
+        return {field: state[field] for field in fields}
+
+    # ---------- save path ----------
+    def buffer_save(self, state):
+        """Queue a save for the flush thread (write-behind); the state read overlays it."""
+        self.buffer.put(state['bhaktgan_id'], state)
+        self._record('buffered_saves')
+        self.invalidate([state['bhaktgan_id']])
+
+    def upsert(self, cursor, states):
+        """
+        Write one or more progress states with a single INSERT ... ON DUPLICATE KEY UPDATE.
+
+        The IST day rollover is folded into the statement: a save for a newer
+        date replaces today's fields with its own (so each folded day of an
+        offline queue lands on its date), a save for an older date leaves
+        them alone.
+        today_date is assigned last because MySQL evaluates the assignments
+        left to right and the CASEs above must see the stored date.
+        """
+        today_fields = [f for f in self.today_fields if f != 'todays_count']
+        columns = (['bhaktgan_id', 'name', 'phone', 'count', 'total_malas',
+                    'current_mala_pronunciations', 'total_pronunciations']
+                   + today_fields + ['today_date', 'todays_count'])
+        row = "(" + ", ".join(["%s"] * len(columns) + ["NOW()", "NOW()"]) + ")"
+        params = []
+        for s in states:
+            params.extend(s[c] for c in columns)
+
+        today_updates = ",\n                ".join(_today_field_sql(f) for f in self.today_fields)
+        cursor.execute(f"""
+            INSERT INTO {self.spec.table}
+            ({', '.join(columns)}, last_spoken_at, updated_at)
+            VALUES {", ".join([row] * len(states))}
+            ON DUPLICATE KEY UPDATE
+                count = GREATEST(count, VALUES(count)),
+                total_malas = GREATEST(total_malas, VALUES(total_malas)),
+                total_pronunciations = GREATEST(total_pronunciations, VALUES(total_pronunciations)),
+                last_spoken_at = NOW(),
+                updated_at = NOW(),
+                current_mala_pronunciations = CASE
+                    WHEN today_date IS NULL OR today_date = VALUES(today_date) THEN VALUES(current_mala_pronunciations)
+                    WHEN today_date > VALUES(today_date) THEN current_mala_pronunciations
+                    ELSE VALUES(current_mala_pronunciations)
+                END,
+                {today_updates},
+                today_date = GREATEST(COALESCE(today_date, VALUES(today_date)), VALUES(today_date))
+        """, params)
+
+    def save(self, conn, cursor, states):
+        """
+        Upsert progress states and the matching city rollup deltas and global
+        counter increment in one transaction, then commit. A stored day older
+        than today is archived to the daily history first, since the upsert
+        overwrites it, and so is every day of a user but the last when the
+        states hold several (a folded offline queue).
+        """
+        rollup, history, counter = self._on(self.rollup), self._on(self.history), self._on(self.counter)
+        ids = [s['bhaktgan_id'] for s in states]
+        previous = None
+        if rollup or counter:
+            previous = lock_previous(cursor, self.spec.table, ids)
+        today = progress_sync.ist_today()
+        if history:
+            history.archive_rollover(cursor, ids, today)
+            latest = {}
+            for s in states:
+                latest[s['bhaktgan_id']] = max(latest.get(s['bhaktgan_id'], s['today_date']), s['today_date'])
+            history.archive_states(cursor, [s for s in states if s['today_date'] < latest[s['bhaktgan_id']]])
+        self.upsert(cursor, states)
+        if previous is not None:
+            if rollup:
+                rollup.apply(cursor, previous, states)
+            if counter:
+                counter.add(cursor, words_added(previous, states))
+        conn.commit()
+        if self.history is not None:
+            self.history.mark_current(states, today)
+        self._record('save_batches')
+        self._record('rows_saved', len(states))
+
+    def apply_ops(self, conn, cursor, bhaktgan_id, name, phone, client_id, ops):
+        """v2 delta ops (see progress_sync.apply_ops) with this mantra's aggregates; commits."""
+        result = progress_sync.apply_ops(
+            conn, cursor, self.spec, bhaktgan_id, name, phone, client_id, ops,
+            rollup=self._on(self.rollup), history=self._on(self.history), counter=self._on(self.counter),
+        )
+        if result['applied']:
+            self._record('ops_applied', result['applied'])
+            self.after_saved(conn, cursor, [result['state']])
+        return result
+
+    def states_from_events(self, events, bhaktgan_id, name, phone, today):
+        """
+        Offline queue events -> states. Events without todayDate are dated
+        from "at" (epoch ms) in IST; no date may be later than `today`.
+        Raises ValueError.
+        """
+        states = []
+        try:
+            for event in events:
+                if not isinstance(event, dict):
+                    raise ValueError('Each event must be an object')
+                if not event.get('todayDate') and event.get('at') is not None:
+                    at = datetime.fromtimestamp(int(event['at']) / 1000, progress_sync.IST)
+                    event = dict(event, todayDate=at.strftime('%Y-%m-%d'))
+                # A client clock running ahead must not open tomorrow early
+                states.append(state_from_payload(event, bhaktgan_id, name, phone, today))
+        except (TypeError, ValueError, OverflowError, OSError) as e:
+            raise ValueError(f'Invalid event: {e}')
+        return states
+
+    def save_events(self, conn, cursor, bhaktgan_id, states, today):
+        """
+        Save an offline queue (plus any pending write-behind save) as one
+        state per IST day, oldest first, in one transaction. Rows for the
+        same user in one multi-row upsert are applied in order, so each day
+        is rolled over by the next exactly as live saves would.
+
+        Returns (day_states, state) with state as read_state reports it.
+        """
+        pending = self.buffer.pop(bhaktgan_id)
+        try:
+            day_states = fold_progress_events(([pending] if pending else []) + states)
+            self.save(conn, cursor, day_states)
+        except Exception:
+            if pending:
+                self.buffer.requeue([(bhaktgan_id, pending)])
+            raise
+        self._record('event_batches')
+        self.after_saved(conn, cursor, day_states[-1:])
+        state = self.read_state(cursor, bhaktgan_id, today)
+        conn.commit()
+        return day_states, state
+
+    # ---------- leaderboard ----------
+    def leaderboard_page(self, cursor, limit, page_cursor=None):
+        """
+        One keyset page of the leaderboard: (rows without bhaktgan_id,
+        next_cursor or None). The first page comes from the top-K table
+        (as the refresh timer last built it) when it covers `limit` and has
+        been built; otherwise, and for later pages, from the cursor on the
+        (count, bhaktgan_id) index, never with OFFSET. Raises ValueError
+        for a cursor that does not decode.
+        """
+        limit = min(max(1, limit), LEADERBOARD_MAX_PAGE)
+        after = decode_cursor(page_cursor) if page_cursor else None
+
+        rows = None
+        if after is None and self._on(self.leaderboard) and limit <= self.leaderboard.size:
+            try:
+                rows = self.leaderboard.read(cursor, limit) or None   # empty: never built yet
+            except pymysql.err.ProgrammingError as e:
+                if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                    raise
+                rows = None
+
+        if rows is None:
+            # Start above the largest possible INT count for the first page
+            after_count, after_id, rank = after or (MAX_PROGRESS_VALUE + 1, MAX_PROGRESS_VALUE + 1, 0)
+            rows = keyset_page(cursor, self.spec.table, after_count, after_id, limit)
+            for i, row in enumerate(rows, start=1):
+                row['rank'] = rank + i
+
+        next_cursor = encode_cursor(rows[-1], rows[-1]['rank']) if len(rows) == limit else None
+        return [{k: v for k, v in row.items() if k != 'bhaktgan_id'} for row in rows], next_cursor
+
+    # ---------- after commit ----------
+    def state_key(self, bhaktgan_id):
+        """ETag cache key of the user's /api/state response."""
+        return f"{self.spec.mantra}_state:{bhaktgan_id}"
+
+    def stats_key(self, bhaktgan_id):
+        return f"{self.spec.mantra}_stats:{bhaktgan_id}"
+
+    def invalidate(self, bhaktgan_ids):
+        """Saved progress changes these users' state and stats responses."""
+        keys = []
+        for bhaktgan_id in set(bhaktgan_ids):
+            keys += [self.state_key(bhaktgan_id), self.stats_key(bhaktgan_id)]
+        etag_cache.invalidate(*keys)
+
+    def after_saved(self, conn, cursor, states):
+        """
+        Post-commit hook for saved progress: invalidates ETags, wakes the
+        users' live streams and keeps the leaderboard in step. Failures are
+        logged, never raised - the progress rows are already safe.
+        """
+        try:
+            self.invalidate([s['bhaktgan_id'] for s in states])
+            if self.live is not None:
+                for state in states:
+                    self.live.publish(('user', state['bhaktgan_id']), 'changed')
+        except Exception as e:
+            logger.error(f"{self.spec.mantra} post-save notification failed: {e}")
+        if self.leaderboard is None:
+            return
+        # The board itself is rebuilt by the leaderboard's refresh timer, off the request
+        self.leaderboard.note_saves([s['count'] for s in states])
+
+    def _flush(self, items):
+        """WriteBehindBuffer flush function: items are (bhaktgan_id, state) pairs."""
+        conn = self.connect()
+        cursor = None
+        try:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            states = [state for _, state in items]
+            self.save(conn, cursor, states)
+            self.after_saved(conn, cursor, states)
+        finally:
+            if cursor:
+                cursor.close()
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                table=self.spec.table,
+                write_behind=self.write_behind,
+                pending=self.buffer.stats()['depth'],
+                rollup=bool(self._on(self.rollup)),
+                history=bool(self._on(self.history)),
+                counter=bool(self._on(self.counter)),
+                leaderboard=self.leaderboard is not None,
+            )
+
+
+def all_stats():
+    return {engine.spec.mantra: engine.stats() for engine in _engines}
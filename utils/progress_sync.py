@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+🔄 Delta Progress Sync (v2 save protocol) for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+The v1 save endpoints take the client's absolute state and reconcile it
+with GREATEST(). Two tabs or a lost response can silently drop counts
+that way. v2 clients instead send what changed since their last
+acknowledged op:
+
+    POST .../api/v2/save
+    {"client_id": "tab-3f9c", "ops": [
+        {"seq": 41, "words": 10, "pronunciations": 2, "malas": 0},
+        {"seq": 42, "words": 5,  "pronunciations": 1, "malas": 0, "date": "2025-01-06"}
+    ]}
+
+Each device (client_id) has a last applied seq per user and mantra in
+progress_sync_devices. Ops at or below it are acknowledged without being
+applied again, so a retry after a lost response is safe. Everything runs
+in one transaction that locks the device row, and the response carries
+the authoritative totals. The client never has to re-read /api/state.
+
+Ops without a date count towards the current IST day. Ops for an older
+date still add to the lifetime totals, but they only touch today's fields
+if that date is (or becomes) the row's today_date.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone, date as date_cls
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+MAX_OPS_PER_REQUEST = 500
+MAX_DELTA_PER_OP = 10_000   # far above anything a person can chant between two saves
+CLIENT_ID_RE = re.compile(r'[A-Za-z0-9_\-]{1,64}')
+
+
+class ProgressTable:
+    """Which progress table a mantra uses and which optional columns it has"""
+
+    def __init__(self, mantra, table, has_today_words=True, pronunciations_per_mala=108):
+        self.mantra = mantra
+        self.table = table
+        self.has_today_words = has_today_words
+        self.pronunciations_per_mala = pronunciations_per_mala
+
+
+HARIJAP = ProgressTable('harijap', 'harijap_progress', has_today_words=True)
+GURU_MANTRA = ProgressTable('guru_mantra', 'guru_mantra_progress', has_today_words=False)
+
+
+def ist_today():
+    return datetime.now(IST).strftime('%Y-%m-%d')
+
+
+def _non_negative_int(value, field, limit=MAX_DELTA_PER_OP):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0 or value > limit:
+        raise ValueError(f"{field} must be an integer between 0 and {limit}")
+    return value
+
+
+def _parse_date(value, today):
+    if value is None:
+        return today
+    try:
+        parsed = date_cls.fromisoformat(str(value)[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+    if parsed > today:
+        raise ValueError(f"Date {parsed} is in the future (IST today is {today})")
+    return parsed
+
+
+def parse_ops(payload, today=None):
+    """
+    Validate a v2 save body. Returns (client_id, ops) with ops sorted by seq,
+    each a dict {seq, date, words, pronunciations, malas}. Raises ValueError.
+    """
+    today = today or ist_today()
+    if not isinstance(payload, dict):
+        raise ValueError("JSON object expected")
+    client_id = payload.get('client_id')
+    if not isinstance(client_id, str) or not CLIENT_ID_RE.fullmatch(client_id):
+        raise ValueError("client_id must be 1-64 characters of letters, digits, '-' or '_'")
+
+    raw_ops = payload.get('ops')
+    if raw_ops is None:
+        raw_ops = [payload]  # a single op may be sent inline
+    if not isinstance(raw_ops, list) or not raw_ops:
+        raise ValueError("ops must be a non-empty list")
+    if len(raw_ops) > MAX_OPS_PER_REQUEST:
+        raise ValueError(f"At most {MAX_OPS_PER_REQUEST} ops per request")
+
+    ops = []
+    seen = set()
+    for raw in raw_ops:
+        if not isinstance(raw, dict):
+            raise ValueError("Each op must be an object")
+        seq = raw.get('seq')
+        if isinstance(seq, bool) or not isinstance(seq, int) or seq <= 0:
+            raise ValueError("seq must be a positive integer")
+        if seq in seen:
+            raise ValueError(f"Duplicate seq {seq} in one request")
+        seen.add(seq)
+        delta = raw.get('delta', raw)  # {"seq", "delta": {...}} or flat
+        if not isinstance(delta, dict):
+            raise ValueError("delta must be an object")
+        ops.append({
+            'seq': seq,
+            'date': _parse_date(raw.get('date', delta.get('date')), today),
+            'words': _non_negative_int(delta.get('words', 0), 'words'),
+            'pronunciations': _non_negative_int(delta.get('pronunciations', 0), 'pronunciations'),
+            'malas': _non_negative_int(delta.get('malas', 0), 'malas'),
+        })
+    ops.sort(key=lambda op: op['seq'])
+    return client_id, ops
+
+
+def group_by_date(ops):
+    """Sum op deltas per date, oldest date first."""
+    totals = {}
+    for op in ops:
+        t = totals.setdefault(op['date'], {'words': 0, 'pronunciations': 0, 'malas': 0})
+        for field in ('words', 'pronunciations', 'malas'):
+            t[field] += op[field]
+    return sorted(totals.items())
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 🗄️ SQL
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def lock_device(cursor, spec, bhaktgan_id, client_id):
+    """Create-or-lock the device row and return its last applied seq."""
+    cursor.execute("""
+        INSERT INTO progress_sync_devices (mantra, bhaktgan_id, client_id, last_seq)
+        VALUES (%s, %s, %s, 0)
+        ON DUPLICATE KEY UPDATE last_seq = last_seq
+    """, (spec.mantra, bhaktgan_id, client_id))
+    cursor.execute("""
+        SELECT last_seq FROM progress_sync_devices
+        WHERE mantra = %s AND bhaktgan_id = %s AND client_id = %s
+    """, (spec.mantra, bhaktgan_id, client_id))
+    return cursor.fetchone()['last_seq']
+
+
+def _today_delta_sql(column):
+    return f"""{column} = CASE
+                    WHEN today_date IS NULL OR today_date < VALUES(today_date) THEN VALUES({column})
+                    WHEN today_date = VALUES(today_date) THEN COALESCE({column}, 0) + VALUES({column})
+                    ELSE {column}
+                END"""
+
+
+def add_deltas(cursor, spec, bhaktgan_id, name, phone, day, delta):
+    """
+    Add one day's summed deltas to the progress row (created if missing).
+    The IST rollover is part of the statement: a newer date starts today's
+    fields from this delta, an older one leaves them alone.
+    """
+    per_mala = spec.pronunciations_per_mala
+    today_columns = ['today_pronunciations', 'today_malas', 'todays_count']
+    today_values = [delta['pronunciations'], delta['malas'], delta['words']]
+    if spec.has_today_words:
+        today_columns.insert(0, 'today_words')
+        today_values.insert(0, delta['words'])
+
+    columns = (['bhaktgan_id', 'name', 'phone', 'count', 'total_malas',
+                'current_mala_pronunciations', 'total_pronunciations']
+               + today_columns + ['today_date'])
+    values = ([bhaktgan_id, name, phone, delta['words'], delta['malas'],
+               delta['pronunciations'] % per_mala, delta['pronunciations']]
+              + today_values + [day])
+    today_updates = ",\n                ".join(_today_delta_sql(c) for c in today_columns)
+
+    cursor.execute(f"""
+            INSERT INTO {spec.table}
+            ({', '.join(columns)}, last_spoken_at, updated_at)
+            VALUES ({', '.join(['%s'] * len(values))}, NOW(), NOW())
+            ON DUPLICATE KEY UPDATE
+                count = count + VALUES(count),
+                total_malas = total_malas + VALUES(total_malas),
+                total_pronunciations = total_pronunciations + VALUES(total_pronunciations),
+                last_spoken_at = NOW(),
+                updated_at = NOW(),
+                current_mala_pronunciations = CASE
+                    WHEN today_date = VALUES(today_date)
+                        THEN (COALESCE(current_mala_pronunciations, 0) + VALUES(total_pronunciations)) % {per_mala}
+                    WHEN today_date IS NULL OR today_date < VALUES(today_date)
+                        THEN VALUES(current_mala_pronunciations)
+                    ELSE current_mala_pronunciations
+                END,
+                {today_updates},
+                today_date = GREATEST(COALESCE(today_date, VALUES(today_date)), VALUES(today_date))
+        """, values)
+
+
+def read_state(cursor, spec, bhaktgan_id, today):
+    """
+    Progress as the state endpoints report it: today's fields from an
+    earlier IST date read as 0. One primary-key read.
+    """
+    today_columns = ['current_mala_pronunciations', 'today_pronunciations', 'today_malas', 'todays_count']
+    if spec.has_today_words:
+        today_columns.insert(1, 'today_words')
+    cases = ",\n               ".join(
+        f"CASE WHEN today_date = %s THEN {c} ELSE 0 END AS {c}" for c in today_columns
+    )
+    cursor.execute(f"""
+        SELECT count, total_malas, total_pronunciations, last_spoken_at,
+               {cases}
+        FROM {spec.table}
+        WHERE bhaktgan_id = %s
+    """, (today,) * len(today_columns) + (bhaktgan_id,))
+    row = cursor.fetchone() or {}
+    state = {c: row.get(c) or 0 for c in ['count', 'total_malas', 'total_pronunciations'] + today_columns}
+    state['last_spoken_at'] = row.get('last_spoken_at')
+    state['today_date'] = today
+    state['bhaktgan_id'] = bhaktgan_id   # the post-save hooks key on it
+    return state
+
+
+def apply_ops(conn, cursor, spec, bhaktgan_id, name, phone, client_id, ops, today=None, rollup=None,
+              history=None, counter=None):
+    """
+    Apply v2 ops idempotently in one transaction and commit.
+
+    Returns {'applied', 'duplicates', 'last_seq', 'state'}; state is the
+    authoritative progress after the ops.
+    """
+    today = today or ist_today()
+    last_seq = lock_device(cursor, spec, bhaktgan_id, client_id)
+    fresh = [op for op in ops if op['seq'] > last_seq]
+
+    if fresh:
+        groups = group_by_date(fresh)
+        previous = None
+        if rollup is not None:
+            previous = rollup.lock_previous(cursor, [bhaktgan_id])
+        if history is not None:
+            history.archive_rollover(cursor, [bhaktgan_id], today)
+        for i, (day, delta) in enumerate(groups):
+            add_deltas(cursor, spec, bhaktgan_id, name, phone, day, delta)
+            if history is not None and history.enabled and i < len(groups) - 1:
+                # the next group rolls this day over: archive it from the row first
+                history.archive_stored(cursor, [bhaktgan_id], groups[-1][0])
+        if previous is not None:
+            before = previous.get(bhaktgan_id) or {}
+            totals = {
+                'bhaktgan_id': bhaktgan_id,
+                'count': (before.get('count') or 0) + sum(d['words'] for _, d in groups),
+                'total_malas': (before.get('total_malas') or 0) + sum(d['malas'] for _, d in groups),
+            }
+            rollup.apply(cursor, previous, [totals])
+        if counter is not None:
+            counter.add(cursor, {day: delta['words'] for day, delta in groups})
+        last_seq = fresh[-1]['seq']
+        cursor.execute("""
+            UPDATE progress_sync_devices SET last_seq = %s
+            WHERE mantra = %s AND bhaktgan_id = %s AND client_id = %s
+        """, (last_seq, spec.mantra, bhaktgan_id, client_id))
+
+    state = read_state(cursor, spec, bhaktgan_id, today)
+    conn.commit()
+    if history is not None and fresh:
+        history.mark_current([{'bhaktgan_id': bhaktgan_id, 'today_date': groups[-1][0]}], today)
+    return {
+        'applied': len(fresh),
+        'duplicates': len(ops) - len(fresh),
+        'last_seq': last_seq,
+        'state': state,
+    }
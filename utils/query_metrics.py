@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+⏱️ SQL Query Instrumentation for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Every cursor handed out by db_config records statement fingerprint,
+duration, rows and calling endpoint. Per request we keep a summary
+(query count, total DB ms, slowest statement) and warn on N+1 patterns,
+too many queries or slow statements. A bounded top-N table of slow
+fingerprints is kept per worker and can be dumped for inspection.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from flask import g, has_app_context, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 200))         # warn when one statement is slower
+QUERY_WARN_COUNT = int(os.getenv('DB_QUERY_WARN_COUNT', 20))      # warn when a request runs more queries
+N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', 10))  # same fingerprint repeated this often
+SLOW_QUERY_TABLE_SIZE = int(os.getenv('DB_SLOW_QUERY_TABLE_SIZE', 20))
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s')
+_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_LIST_RE = re.compile(r'(\(\s*\?(?:\s*,\s*(?:\?|\w+\(\)))*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*(?:\?|\w+\(\)))*\s*\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Reduce a statement to its shape: literals and placeholders become ?."""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _COMMENT_RE.sub(' ', sql)
+    sql = _STRING_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _VALUES_LIST_RE.sub(r'\1, ...', sql)
+    sql = _IN_LIST_RE.sub('(?...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def current_endpoint():
+    if has_request_context():
+        return request.endpoint or request.path
+    return threading.current_thread().name
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 🐢 Slow Query Table (per worker)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+_slow_queries = {}
+_slow_lock = threading.Lock()
+
+
+def _track_slow(fp, duration_ms, rows, endpoint):
+    with _slow_lock:
+        entry = _slow_queries.get(fp)
+        if entry is None:
+            entry = _slow_queries[fp] = {
+                'fingerprint': fp, 'count': 0, 'total_ms': 0.0,
+                'max_ms': 0.0, 'rows': 0, 'endpoints': Counter(),
+            }
+        entry['count'] += 1
+        entry['total_ms'] += duration_ms
+        entry['max_ms'] = max(entry['max_ms'], duration_ms)
+        entry['rows'] += rows
+        entry['endpoints'][endpoint] += 1
+
+        # Keep the table bounded: prune back to the N slowest fingerprints
+        if len(_slow_queries) > SLOW_QUERY_TABLE_SIZE * 2:
+            keep = sorted(_slow_queries.values(), key=lambda e: e['max_ms'], reverse=True)
+            keep = keep[:SLOW_QUERY_TABLE_SIZE]
+            _slow_queries.clear()
+            _slow_queries.update((e['fingerprint'], e) for e in keep)
+
+
+def dump_slow_queries(limit=SLOW_QUERY_TABLE_SIZE):
+    """Top-N fingerprints by worst latency, for the monitoring endpoint."""
+    with _slow_lock:
+        entries = sorted(_slow_queries.values(), key=lambda e: e['max_ms'], reverse=True)[:limit]
+        return [{
+            'fingerprint': e['fingerprint'],
+            'count': e['count'],
+            'avg_ms': round(e['total_ms'] / e['count'], 2),
+            'max_ms': round(e['max_ms'], 2),
+            'avg_rows': round(e['rows'] / e['count'], 1),
+            'endpoints': dict(e['endpoints'].most_common(5)),
+        } for e in entries]
+
+
+def reset_slow_queries():
+    with _slow_lock:
+        _slow_queries.clear()
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 📋 Per-request Summary
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+class RequestQueryStats:
+    """Query counters for one request, stored on flask.g"""
+
+    def __init__(self):
+        # Captured now: the request context is gone by teardown_appcontext
+        self.endpoint = current_endpoint()
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest = None
+        self.fingerprints = Counter()
+        self.timings = {}
+
+    def add(self, fp, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.fingerprints[fp] += 1
+        self.timings[fp] = self.timings.get(fp, 0.0) + duration_ms
+        if duration_ms >= self.slowest_ms:
+            self.slowest_ms = duration_ms
+            self.slowest = fp
+
+    def summary(self):
+        return {
+            'queries': self.count,
+            'db_ms': round(self.total_ms, 2),
+            'slowest_ms': round(self.slowest_ms, 2),
+            'slowest': self.slowest,
+            'by_statement': {fp: round(ms, 2) for fp, ms in self.timings.items()},
+        }
+
+
+def request_stats():
+    """Stats for the current request, or None outside an app context."""
+    if not has_app_context():
+        return None
+    stats = g.get('_db_query_stats')
+    if stats is None:
+        stats = g._db_query_stats = RequestQueryStats()
+    return stats
+
+
+def record_query(sql, duration_ms, rows):
+    fp = fingerprint(sql)
+    endpoint = current_endpoint()
+    stats = request_stats()
+    if stats is not None:
+        stats.add(fp, duration_ms)
+    _track_slow(fp, duration_ms, rows, endpoint)
+    if duration_ms > SLOW_QUERY_MS:
+        logger.warning(f"Slow query in {endpoint}: {duration_ms:.1f} ms, {rows} rows - {fp[:200]}")
+
+
+class InstrumentedCursorMixin:
+    """Times execute(); executemany() goes through execute() in PyMySQL."""
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            rows = self.rowcount if self.rowcount and self.rowcount > 0 else 0
+            record_query(query, (time.perf_counter() - start) * 1000, rows)
+
+
+_instrumented_classes = {}
+
+
+def instrumented(cursor_class):
+    """Return a subclass of cursor_class with timed execute()."""
+    cls = _instrumented_classes.get(cursor_class)
+    if cls is None:
+        cls = type(f"Instrumented{cursor_class.__name__}", (InstrumentedCursorMixin, cursor_class), {})
+        _instrumented_classes[cursor_class] = cls
+    return cls
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 🔗 Flask Hooks
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def add_server_timing(response):
+    """Expose the request's DB time to browser devtools."""
+    stats = g.get('_db_query_stats')
+    if stats is not None and stats.count:
+        response.headers.add(
+            'Server-Timing', f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"'
+        )
+    return response
+
+
+def report_request_queries(exc=None):
+    stats = g.pop('_db_query_stats', None)
+    if stats is None or not stats.count:
+        return
+    endpoint = stats.endpoint
+    summary = stats.summary()
+    logger.debug(f"DB summary for {endpoint}: {summary}")
+    if stats.count > QUERY_WARN_COUNT:
+        logger.warning(
+            f"{endpoint} ran {stats.count} queries ({summary['db_ms']} ms); slowest {summary['slowest_ms']} ms: {stats.slowest[:200]}"
+        )
+    for fp, repeats in stats.fingerprints.items():
+        if repeats >= N_PLUS_ONE_THRESHOLD:
+            logger.warning(f"Possible N+1 in {endpoint}: statement ran {repeats} times - {fp[:200]}")
+
+
+def init_app(app):
+    app.after_request(add_server_timing)
+    app.teardown_appcontext(report_request_queries)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+🏙️ Incremental City Rollups for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Per-city totals of a progress table (users, count, malas) kept in a small
+rollup table so the city stats endpoint reads one indexed table instead of
+grouping a join of every progress row.
+
+The save path calls lock_previous() before its upsert and apply() after it,
+inside the same transaction. The locked read gives the old count per user,
+so the delta added to the city is exactly what the GREATEST() upsert
+changed. The cost is one extra read and one write per flushed batch, not
+per save. A city renamed in bhaktgan is not followed incrementally;
+reconcile() (run_city_rollup_reconcile.py) recomputes from scratch and
+reports the drift.
+"""
+
+import logging
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_FIELDS = ('user_count', 'total_count', 'total_malas')
+
+
+def lock_previous(cursor, progress_table, bhaktgan_ids):
+    """
+    City and current totals for the users about to be saved, with their
+    progress rows locked until commit (sorted ids: consistent lock order).
+    Shared by every save-path aggregate that needs the pre-upsert values.
+    """
+    ids = sorted(set(bhaktgan_ids))
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(f"""
+        SELECT bg.id AS bhaktgan_id, bg.city, hp.count, hp.total_malas
+        FROM bhaktgan bg
+        LEFT JOIN {progress_table} hp ON hp.bhaktgan_id = bg.id
+        WHERE bg.id IN ({placeholders})
+        ORDER BY bg.id
+        FOR UPDATE OF hp
+    """, ids)
+    return {row['bhaktgan_id']: row for row in cursor.fetchall()}
+
+
+class CityRollup:
+    """Per-city totals of one progress table"""
+
+    def __init__(self, progress_table, rollup_table, enabled=True):
+        self.progress_table = progress_table
+        self.rollup_table = rollup_table
+        self.enabled = enabled
+
+    # ---------- save path ----------
+    def lock_previous(self, cursor, bhaktgan_ids):
+        """Pre-upsert totals of these users, rows locked (see lock_previous())."""
+        return lock_previous(cursor, self.progress_table, bhaktgan_ids)
+
+    def deltas(self, previous, states):
+        """City -> (users, count, malas) added by saving `states` over `previous`."""
+        # Several states for one user (a multi-day batch) count once, at their max
+        latest = {}
+        for state in states:
+            seen = latest.get(state['bhaktgan_id'])
+            latest[state['bhaktgan_id']] = state if seen is None else {
+                'bhaktgan_id': state['bhaktgan_id'],
+                'count': max(seen['count'], state['count']),
+                'total_malas': max(seen['total_malas'], state['total_malas']),
+            }
+
+        totals = {}
+        for state in latest.values():
+            before = previous.get(state['bhaktgan_id'])
+            if not before or not (before['city'] or '').strip():
+                continue
+            is_new = before['count'] is None
+            old_count = before['count'] or 0
+            old_malas = before['total_malas'] or 0
+            delta = (
+                1 if is_new else 0,
+                max(old_count, state['count']) - old_count,
+                max(old_malas, state['total_malas']) - old_malas,
+            )
+            if any(delta):
+                city = before['city']
+                current = totals.get(city, (0, 0, 0))
+                totals[city] = tuple(a + b for a, b in zip(current, delta))
+        return totals
+
+    def apply(self, cursor, previous, states):
+        """
+        Add this batch's deltas to the rollup (one statement; caller commits).
+        If the rollup table does not exist yet the rollup switches itself off
+        for this process instead of failing the save.
+        """
+        totals = self.deltas(previous, states)
+        if not totals:
+            return 0
+        placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(totals))
+        params = []
+        for city, (users, count, malas) in sorted(totals.items()):
+            params.extend((city, users, count, malas))
+        try:
+            cursor.execute(f"""
+                INSERT INTO {self.rollup_table} (city, user_count, total_count, total_malas)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE
+                    user_count = user_count + VALUES(user_count),
+                    total_count = total_count + VALUES(total_count),
+                    total_malas = total_malas + VALUES(total_malas)
+            """, params)
+        except pymysql.err.ProgrammingError as e:
+            if e.args[0] != 1146:  # ER_NO_SUCH_TABLE: migration not run yet
+                raise
+            self.enabled = False
+            logger.warning(f"{self.rollup_table} missing - rollup disabled until restart "
+                           f"(run run_city_rollup_reconcile.py)")
+            return 0
+        return len(totals)
+
+    # ---------- read path ----------
+    def read(self, cursor):
+        """All cities by total count, one read of the rollup's total_count index."""
+        cursor.execute(f"""
+            SELECT city, user_count, total_count, total_malas,
+                   total_count / NULLIF(user_count, 0) AS avg_count
+            FROM {self.rollup_table}
+            ORDER BY total_count DESC
+        """)
+        return cursor.fetchall()
+
+    # ---------- reconciliation ----------
+    def recompute(self, cursor, lock=False):
+        """Totals per city straight from the progress table."""
+        cursor.execute(f"""
+            SELECT bg.city,
+                   COUNT(hp.bhaktgan_id) AS user_count,
+                   COALESCE(SUM(hp.count), 0) AS total_count,
+                   COALESCE(SUM(hp.total_malas), 0) AS total_malas
+            FROM {self.progress_table} hp
+            JOIN bhaktgan bg ON hp.bhaktgan_id = bg.id
+            WHERE bg.city IS NOT NULL AND bg.city != ''
+            GROUP BY bg.city
+            {'LOCK IN SHARE MODE' if lock else ''}
+        """)
+        return {row['city']: tuple(int(row[f]) for f in ROLLUP_FIELDS) for row in cursor.fetchall()}
+
+    def reconcile(self, cursor, apply=True):
+        """
+        Compare the rollup with a full recompute. Returns drift rows
+        {city, expected, actual}; when apply is set the rollup is corrected
+        (caller commits). Progress rows are share-locked meanwhile so no
+        save can slip in between the recompute and the correction.
+        """
+        expected = self.recompute(cursor, lock=apply)
+        cursor.execute(f"SELECT city, user_count, total_count, total_malas FROM {self.rollup_table}")
+        actual = {row['city']: tuple(int(row[f]) for f in ROLLUP_FIELDS) for row in cursor.fetchall()}
+
+        drift = []
+        for city in sorted(set(expected) | set(actual)):
+            want, have = expected.get(city, (0, 0, 0)), actual.get(city, (0, 0, 0))
+            if want != have:
+                drift.append({'city': city, 'expected': dict(zip(ROLLUP_FIELDS, want)),
+                              'actual': dict(zip(ROLLUP_FIELDS, have))})
+
+        if apply and drift:
+            stale = [d['city'] for d in drift if d['city'] not in expected]
+            if stale:
+                placeholders = ", ".join(["%s"] * len(stale))
+                cursor.execute(f"DELETE FROM {self.rollup_table} WHERE city IN ({placeholders})", stale)
+            fixes = [d for d in drift if d['city'] in expected]
+            if fixes:
+                placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(fixes))
+                params = []
+                for d in fixes:
+                    params.extend((d['city'],) + expected[d['city']])
+                cursor.execute(f"""
+                    REPLACE INTO {self.rollup_table} (city, user_count, total_count, total_malas)
+                    VALUES {placeholders}
+                """, params)
+        return drift
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+🎼 Binary Acoustic Template Pack for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+static/js/templates.json carries the mel filterbank and the z-scored
+log-mel frames of every reference repetition as JSON numbers (~3.2 MB),
+which templateMatcher.js has to download and parse before it can match.
+A template pack holds the same data as little-endian arrays that the
+browser maps with typed-array views:
+
+    offset 0   b"MTPK"                      magic
+           4   uint16 version (1), uint16 0
+           8   uint32 header length N
+          12   N bytes of UTF-8 JSON header, space-padded so the data
+               starts 8-byte aligned
+               then the sections named in the header, each 8-byte aligned:
+               melFilterbank  float32 [nMels * nBins]
+               templates      float16 or int8 [sum(frames) * nMels]
+               scales         float32 [numTemplates * nMels] (int8 only)
+
+Header: {"meta": <templates.json meta>, "dtype", "nMels", "nBins",
+"melFilterbank": {"offset"}, "templates": {"offset", "frames": [...]},
+"scales": {"offset"}}. int8 frames are quantized symmetrically per
+template and mel band: value = q * scales[template * nMels + band].
+
+Pure Python (struct), no numpy needed.
+"""
+
+import json
+import struct
+
+MAGIC = b"MTPK"
+VERSION = 1
+ALIGN = 8
+DTYPES = ('float16', 'int8')
+
+
+def _pad(buf, fill=b"\0"):
+    buf.extend(fill * (-len(buf) % ALIGN))
+
+
+def _quantize(frames, n_mels):
+    """Symmetric int8 per mel band of one template: (bytes, scales)."""
+    scales = []
+    for band in range(n_mels):
+        peak = max(abs(frame[band]) for frame in frames)
+        scales.append(peak / 127.0 if peak else 1.0)
+    values = [max(-127, min(127, round(frame[band] / scales[band])))
+              for frame in frames for band in range(n_mels)]
+    return struct.pack(f"<{len(values)}b", *values), scales
+
+
+def build_pack(data, dtype='float16'):
+    """Encode a templates.json document (dict) as a template pack (bytes)."""
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}")
+    filterbank = data['melFilterbank']
+    templates = data['templates']
+    n_mels, n_bins = len(filterbank), len(filterbank[0])
+    if any(len(frame) != n_mels for template in templates for frame in template):
+        raise ValueError(f"every template frame must have nMels={n_mels} values")
+
+    sections = []
+    fb = [v for row in filterbank for v in row]
+    sections.append(('melFilterbank', struct.pack(f"<{len(fb)}f", *fb)))
+
+    if dtype == 'float16':
+        frames = [v for template in templates for frame in template for v in frame]
+        sections.append(('templates', struct.pack(f"<{len(frames)}e", *frames)))
+    else:
+        chunks, scales = [], []
+        for template in templates:
+            chunk, template_scales = _quantize(template, n_mels)
+            chunks.append(chunk)
+            scales.extend(template_scales)
+        sections.append(('templates', b"".join(chunks)))
+        sections.append(('scales', struct.pack(f"<{len(scales)}f", *scales)))
+
+    header = {
+        'meta': data['meta'],
+        'dtype': dtype,
+        'nMels': n_mels,
+        'nBins': n_bins,
+        'melFilterbank': {},
+        'templates': {'frames': [len(t) for t in templates]},
+    }
+    if dtype == 'int8':
+        header['scales'] = {}
+
+    # Offsets depend on the header length and the header holds the offsets:
+    # lay out until the header stops growing.
+    header_len = 0
+    while True:
+        offset = 12 + header_len + (-(12 + header_len) % ALIGN)
+        for name, payload in sections:
+            header[name]['offset'] = offset
+            offset += len(payload) + (-len(payload) % ALIGN)
+        encoded = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(encoded) <= header_len:
+            break
+        header_len = len(encoded)
+
+    out = bytearray(MAGIC + struct.pack("<HHI", VERSION, 0, header_len))
+    out.extend(encoded.ljust(header_len, b" "))
+    _pad(out, b" ")
+    for _, payload in sections:
+        out.extend(payload)
+        _pad(out)
+    return bytes(out)
+
+
+def read_pack(buf):
+    """Decode a template pack back into the templates.json layout (int8 dequantized)."""
+    if buf[:4] != MAGIC:
+        raise ValueError("not a template pack")
+    version, _, header_len = struct.unpack_from("<HHI", buf, 4)
+    if version != VERSION:
+        raise ValueError(f"unsupported template pack version {version}")
+    header = json.loads(bytes(buf[12:12 + header_len]).decode('utf-8'))
+    n_mels, n_bins = header['nMels'], header['nBins']
+
+    fb = struct.unpack_from(f"<{n_mels * n_bins}f", buf, header['melFilterbank']['offset'])
+    filterbank = [list(fb[m * n_bins:(m + 1) * n_bins]) for m in range(n_mels)]
+
+    frame_counts = header['templates']['frames']
+    count = sum(frame_counts) * n_mels
+    if header['dtype'] == 'float16':
+        values = struct.unpack_from(f"<{count}e", buf, header['templates']['offset'])
+        scales = None
+    else:
+        values = struct.unpack_from(f"<{count}b", buf, header['templates']['offset'])
+        scales = struct.unpack_from(f"<{len(frame_counts) * n_mels}f", buf, header['scales']['offset'])
+
+    templates, pos = [], 0
+    for t, frames in enumerate(frame_counts):
+        template = []
+        for _ in range(frames):
+            frame = values[pos:pos + n_mels]
+            if scales is not None:
+                frame = [q * s for q, s in zip(frame, scales[t * n_mels:(t + 1) * n_mels])]
+            template.append(list(frame))
+            pos += n_mels
+        templates.append(template)
+    return {'meta': header['meta'], 'melFilterbank': filterbank, 'templates': templates}
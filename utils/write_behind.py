@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+🗂️ Write-behind Coalescing Buffer for Sadguru Seva Platform
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Keeps the latest state per key in memory and hands it to a flush
+function in batches, either every `flush_interval_ms` or as soon as
+`max_batch` keys are pending. Many saves for the same key between two
+flushes collapse into one row, and many keys collapse into one statement.
+
+A batch that fails is retried one key at a time. Keys that fail on
+their own with an error `is_transient` accepts (e.g. the database is
+down) are requeued; any other failure means the value itself cannot be
+written, so it is dropped and logged instead of blocking every later
+flush.
+
+While a batch is being written its values stay visible to peek(), so a
+read that overlays pending state never falls back to the older row
+between the swap and the commit.
+
+Buffers are per worker process. They flush on interpreter exit and from
+the gunicorn worker_exit hook (see gunicorn.conf.py).
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_buffers = []
+
+
+class WriteBehindBuffer:
+    """Coalesces writes per key and flushes them in batches"""
+
+    def __init__(self, name, flush_func, merge_func=None, flush_interval_ms=500, max_batch=200,
+                 is_transient=None):
+        self.name = name
+        self.flush_func = flush_func          # flush_func([(key, value), ...])
+        self.merge_func = merge_func or (lambda old, new: new)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max_batch
+        self.is_transient = is_transient or (lambda error: True)   # error -> requeue?
+        self._pending = {}
+        self._inflight = {}                   # being written by flush(), until committed or requeued
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'puts': 0,
+            'coalesced': 0,
+            'flushes': 0,
+            'rows_flushed': 0,
+            'flush_errors': 0,
+            'dropped': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+        _buffers.append(self)
+
+    # ---------- producer side ----------
+    def put(self, key, value):
+        """Queue the latest state for key, merged with anything pending."""
+        self._ensure_thread()
+        with self._lock:
+            self._stats['puts'] += 1
+            if key in self._pending:
+                self._stats['coalesced'] += 1
+                value = self.merge_func(self._pending[key], value)
+            self._pending[key] = value
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wakeup.set()
+
+    def peek(self, key):
+        """Pending or in-flight state for key without removing it (None if neither)."""
+        with self._lock:
+            pending = self._pending.get(key)
+            inflight = self._inflight.get(key)
+        if inflight is None or pending is None:
+            return pending if inflight is None else inflight
+        return self.merge_func(inflight, pending)
+
+    def pop(self, key):
+        """Take a key's pending state out of the buffer (None if nothing pending)."""
+        with self._lock:
+            return self._pending.pop(key, None)
+
+    def requeue(self, items):
+        """Put items back after a failed flush without losing newer writes."""
+        with self._lock:
+            for key, value in items:
+                if key in self._pending:
+                    value = self.merge_func(value, self._pending[key])
+                self._pending[key] = value
+
+    # ---------- flushing ----------
+    def flush(self):
+        """Flush everything pending now; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                items = list(self._pending.items())
+                self._inflight = self._pending
+                self._pending = {}
+
+            start = time.perf_counter()
+            written = 0
+            try:
+                for i in range(0, len(items), self.max_batch):
+                    written += self._flush_batch(items[i:i + self.max_batch])
+            finally:
+                with self._lock:
+                    self._inflight = {}   # committed, requeued or dropped by now
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['rows_flushed'] += written
+                self._stats['last_flush_ms'] = elapsed_ms
+                self._stats['total_flush_ms'] += elapsed_ms
+                self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed_ms)
+            return written
+
+    def _flush_batch(self, batch):
+        """Write one batch, falling back to one key at a time; returns rows written."""
+        try:
+            self.flush_func(batch)
+            return len(batch)
+        except Exception as e:
+            with self._lock:
+                self._stats['flush_errors'] += 1
+            if len(batch) == 1 or self.is_transient(e):
+                return self._flush_failed(batch, e)
+            logger.warning(f"Write-behind batch for {self.name} failed, retrying {len(batch)} rows one by one: {e}")
+
+        written = 0
+        for item in batch:
+            try:
+                self.flush_func([item])
+                written += 1
+            except Exception as e:
+                self._flush_failed([item], e)
+        return written
+
+    def _flush_failed(self, items, error):
+        if self.is_transient(error):
+            self.requeue(items)
+            logger.error(f"Write-behind flush for {self.name} failed ({len(items)} rows requeued): {error}")
+        else:
+            with self._lock:
+                self._stats['dropped'] += len(items)
+            logger.error(f"Write-behind flush for {self.name} dropped {[key for key, _ in items]}: {error}")
+        return 0
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            if self._pid != pid:
+                # Forked child: whatever the parent had pending is the parent's to flush
+                self._pending = {}
+                self._inflight = {}
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name=f"write-behind-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind thread for {self.name}: {e}")
+
+    def stats(self):
+        with self._lock:
+            flushes = self._stats['flushes']
+            return dict(
+                self._stats,
+                depth=len(self._pending),
+                last_flush_ms=round(self._stats['last_flush_ms'], 2),
+                max_flush_ms=round(self._stats['max_flush_ms'], 2),
+                avg_flush_ms=round(self._stats['total_flush_ms'] / flushes, 2) if flushes else 0.0,
+                total_flush_ms=round(self._stats['total_flush_ms'], 2),
+                flush_interval_ms=int(self.flush_interval * 1000),
+                max_batch=self.max_batch,
+            )
+
+
+def flush_all():
+    """Flush every buffer in this process (graceful shutdown)."""
+    for buffer in _buffers:
+        if buffer._pid == os.getpid():
+            buffer.flush()
+
+
+def all_stats():
+    return {buffer.name: buffer.stats() for buffer in _buffers}
+
+
+atexit.register(flush_all)